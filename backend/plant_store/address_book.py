@@ -0,0 +1,90 @@
+"""
+Cached, compact address book of a user
+The active addresses are read with one query over the (user, is_active,
+is_default) index, as plain column values rather than serializer output, and
+kept in the Django cache for ADDRESS_BOOK_CACHE_SECONDS under a per-user
+version (see plant_store.cache_versions) bumped on every address write.
+
+set_default_address switches a user's default address atomically; the
+one_default_address_per_user constraint guarantees at most one default.
+"""
+
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .cache_versions import bump_version, get_version
+from .db_retry import retry_on_lock
+from .models import UserAddress
+
+
+ADDRESS_BOOK_FIELDS = [
+    'id', 'address_type', 'full_name', 'phone', 'address_line1', 'address_line2',
+    'city', 'state', 'zip_code', 'country', 'is_default',
+]
+
+
+def _version_key(user_id):
+    return f'address-book-version:{user_id}'
+
+
+def invalidate_address_book(user_id):
+    """Retire every cached address book of a user"""
+    bump_version(_version_key(user_id))
+
+
+def get_address_book(user_id):
+    """
+    Active addresses of a user, default first
+
+    Returns:
+        list: one dict of ADDRESS_BOOK_FIELDS per address
+    """
+    key = f'address-book:{user_id}:{get_version(_version_key(user_id))}'
+    addresses = cache.get(key)
+    if addresses is None:
+        addresses = list(
+            UserAddress.objects
+            .filter(user_id=user_id, is_active=True)
+            .order_by('-is_default', '-created_at')
+            .values(*ADDRESS_BOOK_FIELDS)
+        )
+        cache.set(key, addresses, getattr(settings, 'ADDRESS_BOOK_CACHE_SECONDS', 300))
+    return addresses
+
+
+def set_default_address(user_id, address_id):
+    """
+    Make one of a user's active addresses their only default
+
+    Concurrent calls for the same user are serialized; the last one to commit wins.
+
+    Returns:
+        bool: False if the user has no such active address (nothing is changed)
+    """
+    # IntegrityError: a concurrent swap committed a new default between our two statements
+    found = retry_on_lock(partial(_swap_default, user_id, address_id), retry_on=(IntegrityError,))
+
+    if found:
+        # The swap uses queryset updates, which send no post_save
+        transaction.on_commit(partial(invalidate_address_book, user_id))
+    return found
+
+
+def _swap_default(user_id, address_id):
+    addresses = UserAddress.objects.filter(user_id=user_id)
+    with transaction.atomic():
+        # Row lock on the user serializes swaps on databases with SELECT ... FOR UPDATE;
+        # SQLite serializes them with its write lock
+        list(User.objects.select_for_update().filter(pk=user_id).values_list('pk'))
+        # The partial unique index is checked row by row, so a single
+        # "SET is_default = (id = X)" could trip over the old default depending on
+        # row order: clear the old default first, then set the new one
+        addresses.filter(is_default=True).exclude(id=address_id).update(is_default=False)
+        if not addresses.filter(id=address_id, is_active=True).update(is_default=True):
+            transaction.set_rollback(True)
+            return False
+    return True
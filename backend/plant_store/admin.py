@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.models import User
 from .models import (
     UserProfile, Category, Product, Cart, CartItem, Order, OrderItem, 
-    UserAddress, ContactMessage, CustomerSuggestion, Comment, UserVote
+    UserAddress, ContactMessage, CustomerSuggestion, Comment, UserVote, OutboxEmail, NewsletterCampaign
 )
 
 # Show UserProfile inside the Django User admin
@@ -111,7 +111,7 @@ class OrderAdmin(admin.ModelAdmin):
 	list_display = ['order_number', 'user', 'status', 'payment_status', 'total_amount', 'created_at']
 	list_filter = ['status', 'payment_status', 'created_at']
 	search_fields = ['order_number', 'user__username', 'shipping_city']
-	readonly_fields = ['order_number', 'created_at', 'updated_at']
+	readonly_fields = ['order_number', 'snapshot', 'created_at', 'updated_at']
 	list_editable = ['status', 'payment_status']
 
 @admin.register(OrderItem)
@@ -136,35 +136,31 @@ class ContactMessageAdmin(admin.ModelAdmin):
 
 @admin.register(CustomerSuggestion)
 class CustomerSuggestionAdmin(admin.ModelAdmin):
-	list_display = ['id', 'user', 'content_preview', 'comment_count', 'likes', 'dislikes', 'is_public', 'created_at']
+	list_display = ['id', 'user', 'content_preview', 'comment_count', 'likes', 'dislikes', 'hot_score', 'top_score', 'is_public', 'created_at']
 	list_filter = ['is_public', 'created_at', 'user']
 	search_fields = ['content', 'user__username']
-	readonly_fields = ['created_at', 'updated_at', 'likes', 'dislikes']
+	readonly_fields = ['created_at', 'updated_at', 'likes', 'dislikes', 'comment_count', 'hot_score', 'top_score']
 	
 	def content_preview(self, obj):
 		return obj.content[:80] + '...' if len(obj.content) > 80 else obj.content
 	content_preview.short_description = 'Content Preview'
 	
-	def comment_count(self, obj):
-		return obj.comments.count()
-	comment_count.short_description = 'Comments'
-	
 	def get_queryset(self, request):
-		return super().get_queryset(request).select_related('user').prefetch_related('comments')
+		return super().get_queryset(request).select_related('user')
 
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
-	list_display = ['id', 'user', 'suggestion', 'content_preview', 'parent_comment_info', 'likes', 'dislikes', 'created_at']
+	list_display = ['id', 'user', 'suggestion', 'content_preview', 'parent_comment_info', 'reply_count', 'likes', 'dislikes', 'created_at']
 	list_filter = ['created_at', 'parent_comment', 'suggestion']
 	search_fields = ['content', 'user__username', 'suggestion__content']
-	readonly_fields = ['created_at', 'updated_at', 'likes', 'dislikes']
+	readonly_fields = ['created_at', 'updated_at', 'likes', 'dislikes', 'reply_count']
 	fieldsets = (
 		('Basic Info', {
 			'fields': ('user', 'suggestion', 'content')
 		}),
 		('Reply Settings', {
-			'fields': ('parent_comment',),
+			'fields': ('parent_comment', 'reply_count'),
 			'description': 'Leave empty to reply to the suggestion, or select a comment to reply to it'
 		}),
 		('Votes', {
@@ -207,3 +203,19 @@ class UserVoteAdmin(admin.ModelAdmin):
 	
 	def get_queryset(self, request):
 		return super().get_queryset(request).select_related('user', 'content_type')
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+	list_display = ['subject', 'to', 'status', 'attempts', 'latency_ms', 'next_attempt_at', 'sent_at', 'created_at']
+	list_filter = ['status', 'created_at']
+	search_fields = ['subject', 'to']
+	readonly_fields = ['created_at', 'sent_at', 'latency_ms', 'attempts', 'last_error']
+
+
+@admin.register(NewsletterCampaign)
+class NewsletterCampaignAdmin(admin.ModelAdmin):
+	list_display = ['subject', 'status', 'sent_count', 'failed_count', 'last_user_id', 'started_at', 'completed_at']
+	list_filter = ['status', 'created_at']
+	search_fields = ['subject']
+	readonly_fields = ['status', 'last_user_id', 'sent_count', 'failed_count', 'failed_user_ids', 'created_at', 'started_at', 'completed_at']
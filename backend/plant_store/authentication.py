@@ -0,0 +1,74 @@
+"""
+JWT authentication with a cached user principal
+The user (with its profile) behind a token is kept in the Django cache for
+AUTH_PRINCIPAL_CACHE_SECONDS, so authenticated requests skip the User lookup.
+Entries are keyed by a per-user version (see plant_store.cache_versions) that
+plant_store.signals bumps on user and profile writes.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache_versions import bump_version, get_version
+
+
+def _version_key(user_id):
+    return f'auth:principal-version:{user_id}'
+
+
+def principal_version(user_id):
+    """Current cache version of a user's principal"""
+    return get_version(_version_key(user_id))
+
+
+def invalidate_principal(user_id):
+    """Retire every cached principal of a user"""
+    bump_version(_version_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the token's user (and profile) through the cache"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        key = f'auth:principal:{user_id}:{principal_version(user_id)}'
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('profile').get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            cache.set(key, user, getattr(settings, 'AUTH_PRINCIPAL_CACHE_SECONDS', 60))
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
+
+
+class SessionModeAuthentication(SessionAuthentication):
+    """
+    SessionAuthentication that only applies while settings.API_AUTH_MODE is 'session'
+
+    The mode is read per request rather than when REST_FRAMEWORK is built, so
+    switching it (e.g. with override_settings) switches session auth with it.
+    """
+
+    def authenticate(self, request):
+        if getattr(settings, 'API_AUTH_MODE', 'session') != 'session':
+            return None
+        return super().authenticate(request)
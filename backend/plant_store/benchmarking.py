@@ -0,0 +1,76 @@
+"""
+Benchmark helpers for PlantiFy management commands
+Provides a throwaway database and latency summaries so benchmarks never touch db.sqlite3
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_latencies(samples):
+    """
+    Summarize latency samples given in seconds
+
+    Returns:
+        dict: count, mean, p50, p95, p99 and max, all in milliseconds
+    """
+    millis = [sample * 1000.0 for sample in samples]
+    return {
+        'count': len(millis),
+        'mean': sum(millis) / len(millis) if millis else 0.0,
+        'p50': percentile(millis, 50),
+        'p95': percentile(millis, 95),
+        'p99': percentile(millis, 99),
+        'max': max(millis) if millis else 0.0,
+    }
+
+
+def format_latencies(summary):
+    """One-line rendering of a summarize_latencies() result"""
+    return (
+        f"p50 {summary['p50']:.1f}  p95 {summary['p95']:.1f}  "
+        f"p99 {summary['p99']:.1f}  max {summary['max']:.1f}"
+    )
+
+
+@contextmanager
+def isolated_database(busy_timeout=None):
+    """
+    Run the enclosed block against a freshly migrated SQLite file
+
+    The file lives in a temporary directory and is shared by every thread,
+    so lock contention behaves like the real on-disk database.
+
+    Args:
+        busy_timeout (float): Optional SQLite busy timeout in seconds
+    """
+    tmp_dir = tempfile.mkdtemp(prefix='plantify-bench-')
+    settings_dict = connection.settings_dict
+    settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+    if busy_timeout is not None:
+        settings_dict.setdefault('OPTIONS', {})['timeout'] = busy_timeout
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield settings_dict['NAME']
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
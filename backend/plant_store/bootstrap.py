@@ -0,0 +1,88 @@
+"""
+Components of the storefront bootstrap response (/api/bootstrap/)
+The catalog part (categories and featured products) is the same for every
+visitor, so it is serialized once and cached for BOOTSTRAP_CATALOG_CACHE_SECONDS
+under a version (see plant_store.cache_versions) bumped on category and product writes.
+Image fields in it are MEDIA_URL paths, since no request is at hand when the
+shared copy is built. The per-user parts are built on every call: the cart
+summary is one aggregate query and the profile basics come from the
+(already cached) authenticated user.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce, NullIf
+
+from .cache_versions import bump_version, get_version
+from .models import CartItem, Category, Product, UserProfile
+from .serializers import CategorySerializer, ProductSerializer
+
+
+CATALOG_VERSION_KEY = 'bootstrap:catalog-version'
+
+
+def invalidate_catalog():
+    """Retire the cached catalog snapshot"""
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def catalog_snapshot():
+    """
+    Categories and featured products, serialized as their list endpoints do
+
+    Returns:
+        dict: {'categories': [...], 'featured_products': [...]}
+    """
+    key = f'bootstrap:catalog:{get_version(CATALOG_VERSION_KEY)}'
+    snapshot = cache.get(key)
+    if snapshot is None:
+        featured = (
+            Product.objects.filter(is_active=True, is_featured=True)
+            .select_related('category')
+            .order_by('-created_at')[:getattr(settings, 'BOOTSTRAP_FEATURED_PRODUCTS', 8)]
+        )
+        snapshot = {
+            'categories': CategorySerializer(Category.objects.all(), many=True).data,
+            'featured_products': ProductSerializer(featured, many=True).data,
+        }
+        cache.set(key, snapshot, getattr(settings, 'BOOTSTRAP_CATALOG_CACHE_SECONDS', 300))
+    return snapshot
+
+
+def cart_summary(user):
+    """
+    Item count, quantity and total of a user's cart in one aggregate query
+
+    Returns:
+        dict: item_count, total_quantity and total_price (a string, like CartSerializer)
+    """
+    # Same price rule as CartItem.get_total_price: a sale price of 0 or None means no sale
+    unit_price = Coalesce(NullIf(F('product__sale_price'), Value(0)), F('product__price'))
+    totals = CartItem.objects.filter(cart__user=user).aggregate(
+        item_count=Count('id'),
+        total_quantity=Coalesce(Sum('quantity'), 0),
+        total_price=Coalesce(
+            Sum(F('quantity') * unit_price, output_field=DecimalField(max_digits=12, decimal_places=2)),
+            Value(0), output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+    )
+    totals['total_price'] = f"{totals['total_price']:.2f}"
+    return totals
+
+
+def profile_basics(user):
+    """Name, email and store preferences; CachedJWTAuthentication has already loaded the profile"""
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        profile = None
+    return {
+        'id': user.id,
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        'plant_experience': profile.plant_experience if profile else None,
+        'newsletter_subscription': profile.newsletter_subscription if profile else None,
+    }
@@ -0,0 +1,38 @@
+"""
+Version counters for invalidating groups of cache entries
+A cached value is stored under a key that embeds the current version of its
+group (a user's principal, a user's address book, the shared catalog).
+Bumping the version retires every entry of the group at once, without
+having to know their keys.
+
+Readers take the version before loading from the database, and writers bump
+it only after their transaction commits (transaction.on_commit). A reader
+that loads the old row is then either still on the old version or bumped
+past it; bumping before the commit would let it cache the old row under the
+new version.
+
+With the default local-memory cache each process keeps its own versions;
+point CACHES at a shared backend so a bump reaches every worker.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """Current version stored under key, created on first use"""
+    version = cache.get(key)
+    if version is None:
+        # A fresh, never reused value, so entries stored under an evicted version stay unreachable
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """Move key to a new version, retiring every entry stored under the old one"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
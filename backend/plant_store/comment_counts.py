@@ -0,0 +1,51 @@
+"""
+Denormalized comment counters
+CustomerSuggestion.comment_count counts every comment of a suggestion, replies
+included; Comment.reply_count counts direct replies. Both are adjusted with
+single-statement F() updates from the Comment signals in plant_store.signals,
+and can be rebuilt from the comment table with repair_comment_counts().
+"""
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, CustomerSuggestion
+
+
+def adjust_comment_counts(comment, delta):
+    """Add delta to the counters a comment contributes to"""
+    CustomerSuggestion.objects.filter(pk=comment.suggestion_id).update(
+        comment_count=Greatest(F('comment_count') + delta, Value(0))
+    )
+    if comment.parent_comment_id:
+        Comment.objects.filter(pk=comment.parent_comment_id).update(
+            reply_count=Greatest(F('reply_count') + delta, Value(0))
+        )
+
+
+def _count_of(queryset, key):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{key: OuterRef('pk')})
+            .order_by().values(key).annotate(total=Count('id')).values('total'),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    )
+
+
+def repair_comment_counts():
+    """
+    Recompute every counter from the comment table
+
+    Returns:
+        dict: suggestions and comments whose stored count was wrong and has been fixed
+    """
+    suggestion_counts = _count_of(Comment.objects.all(), 'suggestion_id')
+    reply_counts = _count_of(Comment.objects.all(), 'parent_comment_id')
+    return {
+        'suggestions': CustomerSuggestion.objects.annotate(actual=suggestion_counts)
+        .exclude(comment_count=F('actual')).update(comment_count=suggestion_counts),
+        'comments': Comment.objects.annotate(actual=reply_counts)
+        .exclude(reply_count=F('actual')).update(reply_count=reply_counts),
+    }
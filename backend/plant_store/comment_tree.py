@@ -0,0 +1,62 @@
+"""
+Threaded comment tree builder
+Turns a flat, id-ordered list of a suggestion's comments into nested replies
+in O(n) using a parent-id index, with depth limits and per-level pagination.
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+
+from .serializers import CommentSerializer
+
+
+def index_by_parent(comments):
+    """Map parent comment id (None for top level) to its replies, keeping id order"""
+    children = defaultdict(list)
+    for comment in comments:
+        children[comment.parent_comment_id].append(comment)
+    return children
+
+
+def build_comment_tree(comments, parent_id=None, after=0, limit=20, max_depth=5):
+    """
+    Nest comments under their parents
+
+    Args:
+        comments (list): Comments of one suggestion, ordered by id
+        parent_id (int): Start below this comment instead of at the top level
+        after (int): Only include nodes of the first level with an id above this
+        limit (int): Maximum nodes per level (per parent)
+        max_depth (int): Levels to expand; deeper replies are left for a follow-up request
+
+    Returns:
+        tuple: (nodes, more_after) where more_after is the id to pass as `after`
+        for the next page of the first level, or None when it is complete.
+
+    Every node is a CommentSerializer payload plus `reply_count`, `replies` and
+    `more_replies_after` (the `after` value for fetching further replies with
+    parent=<node id>, or None when all replies are already included).
+    """
+    children = index_by_parent(comments)
+    child_ids = {key: [comment.id for comment in value] for key, value in children.items()}
+
+    def expand(level_parent_id, level_after, depth):
+        siblings = children.get(level_parent_id, [])
+        start = bisect_right(child_ids.get(level_parent_id, []), level_after) if level_after else 0
+        page = siblings[start:start + limit]
+        has_more = len(siblings) - start > limit
+
+        nodes = []
+        for comment, data in zip(page, CommentSerializer(page, many=True).data):
+            reply_count = len(children.get(comment.id, []))
+            data['reply_count'] = reply_count
+            if depth < max_depth:
+                data['replies'], data['more_replies_after'] = expand(comment.id, 0, depth + 1)
+            else:
+                # Depth cut: the client fetches these with parent=<id>&after=0
+                data['replies'] = []
+                data['more_replies_after'] = 0 if reply_count else None
+            nodes.append(data)
+        return nodes, (page[-1].id if has_more else None)
+
+    return expand(parent_id, after, 1)
@@ -0,0 +1,100 @@
+"""
+Negotiated response compression
+CompressionMiddleware compresses responses of at least
+RESPONSE_COMPRESSION_MIN_BYTES with the best encoding the client accepts:
+Brotli when the optional `brotli` package is installed, otherwise gzip.
+Streaming responses (the server-sent event stream) are left alone, since
+compressing them would hold events back in the compressor's buffer.
+Like Django's GZipMiddleware, gzip output is padded with random bytes to
+mitigate BREACH.
+"""
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/javascript', 'application/xml', 'image/svg+xml')
+BROTLI_QUALITY = 5  # quality 11 is far slower for a few percent; 4-6 suits dynamic responses
+
+
+def available_encodings():
+    """Encodings this server can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def accepted_encodings(header):
+    """
+    Parse an Accept-Encoding header
+
+    Returns:
+        dict: lowercased coding -> q value, refused codings (q=0) left out
+    """
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def negotiate_encoding(header):
+    """The available encoding the client prefers, or None"""
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for coding in available_encodings():
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(content, encoding):
+    """Compress bytes with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=100)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress large, compressible responses with br or gzip, as negotiated (sync and async)"""
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+
+        # Set before the size check so caches never mix small and large variants
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024):
+            return response
+
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,43 @@
+"""
+Retrying short database operations that lose a race
+SQLite reports write contention as "database is locked" (or, for shared-cache
+databases, "database table is locked") instead of waiting, and a conditional
+insert can lose to a concurrent one with an IntegrityError. retry_on_lock runs
+such an operation again with jittered exponential backoff.
+"""
+
+import random
+import time
+
+from django.db import OperationalError
+
+
+LOCK_RETRIES = 10
+LOCK_BACKOFF_SECONDS = 0.01
+
+
+def retry_on_lock(operation, retry_on=()):
+    """
+    Call operation() until it gets past a database lock
+
+    Args:
+        operation: callable taking no arguments; each call should be its own transaction
+        retry_on (tuple): further exception types that mean "run it again", e.g. IntegrityError
+
+    Returns:
+        whatever operation() returns
+
+    Raises:
+        The last error once LOCK_RETRIES attempts have failed, and any other error at once
+    """
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return operation()
+        except retry_on:
+            pass
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+        # Jittered so threads that collided do not retry in lockstep
+        time.sleep(LOCK_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+    return operation()
@@ -1,14 +1,154 @@
 """
 Email service for PlantiFy plant store
 Handles sending order confirmation emails and other notifications
+
+Messages are written to the OutboxEmail table and delivered in batches by
+`python manage.py send_queued_emails`, so request threads never talk to SMTP.
 """
 
 import os
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+import time
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
 from django.conf import settings
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from .email_templates import COMPANY_CONTEXT, EmailTemplateService
+from .models import OutboxEmail
+
+
+def queue_email(subject, body, to, html_body=''):
+    """
+    Queue an email for the outbox worker
+    
+    With settings.EMAIL_USE_OUTBOX disabled the message is sent immediately instead.
+    The row is inserted in its own savepoint: callers queue mail from inside their
+    transactions and catch failures, which must not roll back the caller's writes.
+    
+    Args:
+        subject (str): Email subject
+        body (str): Plain-text body
+        to (list): Recipient addresses
+        html_body (str): Optional HTML alternative
+    """
+    if not getattr(settings, 'EMAIL_USE_OUTBOX', True):
+        email = EmailMultiAlternatives(subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to=to)
+        if html_body:
+            email.attach_alternative(html_body, "text/html")
+        email.send()
+        return None
+    
+    with transaction.atomic():
+        return OutboxEmail.objects.create(
+            subject=subject,
+            body=body,
+            html_body=html_body,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=list(to),
+        )
+
+
+def _build_message(outbox_email, connection):
+    """Turn an OutboxEmail row into an EmailMultiAlternatives bound to connection"""
+    email = EmailMultiAlternatives(
+        subject=outbox_email.subject,
+        body=outbox_email.body,
+        from_email=outbox_email.from_email,
+        to=outbox_email.to,
+        connection=connection
+    )
+    if outbox_email.html_body:
+        email.attach_alternative(outbox_email.html_body, "text/html")
+    return email
+
+
+def _schedule_retry(outbox_email, error, max_attempts, backoff_seconds):
+    """Record a failed attempt and back off exponentially, giving up after max_attempts"""
+    outbox_email.attempts += 1
+    outbox_email.last_error = str(error)
+    if outbox_email.attempts >= max_attempts:
+        outbox_email.status = 'failed'
+    else:
+        delay = backoff_seconds * 2 ** (outbox_email.attempts - 1)
+        outbox_email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    outbox_email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+    return outbox_email.status
+
+
+def drain_outbox(batch_size=50, max_attempts=5, backoff_seconds=30, lease_seconds=300, connection=None):
+    """
+    Deliver one batch of due outbox emails over a single SMTP session
+    
+    Args:
+        batch_size (int): Maximum number of messages to claim
+        max_attempts (int): Attempts before a message is marked failed
+        backoff_seconds (int): Base retry delay, doubled on every failure
+        lease_seconds (int): How long a claimed batch stays invisible to other workers
+        connection: Optional pre-opened email backend to reuse across batches
+    
+    Returns:
+        dict: sent, retried and failed counts plus per-message latencies in seconds
+    """
+    stats = {'sent': 0, 'retried': 0, 'failed': 0, 'latencies': []}
+    now = timezone.now()
+    due_ids = list(
+        OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=now)
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not due_ids:
+        return stats
+    
+    # Lease the batch so a concurrent worker (or a crashed one) cannot double-send it
+    lease_until = now + timedelta(seconds=lease_seconds)
+    OutboxEmail.objects.filter(id__in=due_ids, status='pending', next_attempt_at__lte=now).update(next_attempt_at=lease_until)
+    batch = list(OutboxEmail.objects.filter(id__in=due_ids, status='pending', next_attempt_at=lease_until))
+    
+    owns_connection = connection is None
+    if owns_connection:
+        connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for outbox_email in batch:
+            outcome = _schedule_retry(outbox_email, e, max_attempts, backoff_seconds)
+            stats['failed' if outcome == 'failed' else 'retried'] += 1
+        return stats
+    
+    try:
+        for outbox_email in batch:
+            started = time.perf_counter()
+            try:
+                connection.send_messages([_build_message(outbox_email, connection)])
+            except Exception as e:
+                outcome = _schedule_retry(outbox_email, e, max_attempts, backoff_seconds)
+                stats['failed' if outcome == 'failed' else 'retried'] += 1
+                # The session may be unusable after an SMTP error; start a fresh one
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    pass
+                continue
+            
+            latency = time.perf_counter() - started
+            outbox_email.status = 'sent'
+            outbox_email.attempts += 1
+            outbox_email.sent_at = timezone.now()
+            outbox_email.latency_ms = latency * 1000.0
+            outbox_email.save(update_fields=['status', 'attempts', 'sent_at', 'latency_ms'])
+            stats['sent'] += 1
+            stats['latencies'].append(latency)
+    finally:
+        if owns_connection:
+            connection.close()
+    
+    return stats
+
+
+def _amount(value):
+    """Amount text without a currency sign; the templates add the ₹ themselves"""
+    return str(value).strip().lstrip('₹').strip() if value is not None else 'N/A'
 
 
 class EmailService:
@@ -25,50 +165,33 @@ class EmailService:
             customer_name (str): Customer's name
         """
         try:
-            # Prepare email context
+            # Prepare email context (company details come from COMPANY_CONTEXT)
             context = {
                 'customer_name': customer_name,
                 'order_number': order_data.get('order_number', 'N/A'),
                 'order_date': datetime.now().strftime('%B %d, %Y'),
-                'total_amount': order_data.get('total_amount', 'N/A'),
+                'subtotal': _amount(order_data.get('subtotal', 'N/A')),
+                'gst_amount': _amount(order_data.get('gst_amount', 'N/A')),
+                'total_amount': _amount(order_data.get('total_amount', 'N/A')),
                 'payment_method': order_data.get('payment_method', 'N/A'),
                 'shipping_address': order_data.get('shipping_address', 'N/A'),
-                'items': order_data.get('items', []),
-                
-                # Company information
-                'company_address': '123 Garden Street, Green City, GC 12345',
-                'company_email': 'plantify.orders@gmail.com',
-                'company_phone': '+91 98765 43210',
-                'website_url': 'http://localhost:3000',
-                'support_url': 'http://localhost:3000/support',
-                'privacy_url': 'http://localhost:3000/privacy',
+                # The storefront's order page posts item prices already formatted as "₹1,234.00"
+                'items': [
+                    {**item, 'price': _amount(item.get('price')), 'total': _amount(item.get('total'))}
+                    for item in order_data.get('items', [])
+                ],
                 'order_tracking_url': f"http://localhost:3000/orders/{order_data.get('order_number', '')}",
-                'store_url': 'http://localhost:3000/store',
             }
             
-            # Render HTML email template
-            html_content = render_to_string('emails/order_confirmation.html', context)
-            
-            # Create plain text version
-            text_content = strip_tags(html_content)
+            # Render HTML and plain text versions from their own templates
+            text_content, html_content = EmailTemplateService.render('order_confirmation', context, COMPANY_CONTEXT)
             
             # Create email message
             subject = f'Order Confirmation - #{order_data.get("order_number", "N/A")} - PlantiFy'
             
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[customer_email]
-            )
-            
-            # Attach HTML version
-            email.attach_alternative(html_content, "text/html")
-            
-            # Send email
-            email.send()
+            queue_email(subject, text_content, [customer_email], html_body=html_content)
             
-            print(f"✅ Order confirmation email sent successfully to {customer_email}")
+            print(f"✅ Order confirmation email queued for {customer_email}")
             return True
             
         except Exception as e:
@@ -99,16 +222,9 @@ class EmailService:
             The PlantiFy Team
             """
             
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[customer_email]
-            )
-            
-            email.send()
+            queue_email(subject, message, [customer_email])
             
-            print(f"✅ Welcome email sent successfully to {customer_email}")
+            print(f"✅ Welcome email queued for {customer_email}")
             return True
             
         except Exception as e:
@@ -141,16 +257,9 @@ class EmailService:
             The PlantiFy Team
             """
             
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[customer_email]
-            )
-            
-            email.send()
+            queue_email(subject, message, [customer_email])
             
-            print(f"✅ Password reset email sent successfully to {customer_email}")
+            print(f"✅ Password reset email queued for {customer_email}")
             return True
             
         except Exception as e:
@@ -163,26 +272,14 @@ class EmailService:
         try:
             subject = f"New Contact Message: {contact_message.get_subject_display()} - PlantiFy"
             
-            # Render HTML template
-            html_content = render_to_string('emails/contact_notification.html', {
+            # Render HTML and plain text versions
+            text_content, html_content = EmailTemplateService.render('contact_notification', {
                 'contact_message': contact_message
             })
             
-            # Create plain text version
-            text_content = strip_tags(html_content)
-            
-            # Create email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[admin_email]
-            )
-            
-            email.attach_alternative(html_content, "text/html")
-            email.send()
+            queue_email(subject, text_content, [admin_email], html_body=html_content)
             
-            print(f"✅ Contact notification email sent to admin: {admin_email}")
+            print(f"✅ Contact notification email queued for admin: {admin_email}")
             return True
             
         except Exception as e:
@@ -201,30 +298,14 @@ class EmailService:
             print(f"🔍 DEBUG: Contact message object: {contact_message}")
             print(f"🔍 DEBUG: Contact message email field: {contact_message.email}")
             
-            # Render HTML template
-            html_content = render_to_string('emails/contact_confirmation.html', {
+            # Render HTML and plain text versions
+            text_content, html_content = EmailTemplateService.render('contact_confirmation', {
                 'contact_message': contact_message
             })
             
-            # Create plain text version
-            text_content = strip_tags(html_content)
-            
-            # Create email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[customer_email]
-            )
-            
-            # Debug: Print email details
-            print(f"🔍 DEBUG: Email 'to' field: {email.to}")
-            print(f"🔍 DEBUG: Email 'from' field: {email.from_email}")
-            
-            email.attach_alternative(html_content, "text/html")
-            email.send()
+            queue_email(subject, text_content, [customer_email], html_body=html_content)
             
-            print(f"✅ Contact confirmation email sent to customer: {customer_email}")
+            print(f"✅ Contact confirmation email queued for customer: {customer_email}")
             return True
             
         except Exception as e:
@@ -0,0 +1,64 @@
+"""
+Email template service for PlantiFy
+Keeps compiled email templates in memory and renders the HTML and plain-text
+parts from their own templates, layering the per-message context on top of
+the static company context instead of copying it for every email.
+"""
+
+from django.template import Context
+from django.template.loader import get_template
+
+
+# Company details shared by every customer-facing email; built once at import
+COMPANY_CONTEXT = {
+    'company_address': '123 Garden Street, Green City, GC 12345',
+    'company_email': 'plantify.orders@gmail.com',
+    'company_phone': '+91 98765 43210',
+    'website_url': 'http://localhost:3000',
+    'support_url': 'http://localhost:3000/support',
+    'privacy_url': 'http://localhost:3000/privacy',
+    'store_url': 'http://localhost:3000/store',
+}
+
+
+class EmailTemplateService:
+    """Render `emails/<name>.html` and `emails/<name>.txt` from cached compiled templates"""
+
+    _compiled = {}
+
+    @classmethod
+    def get_template(cls, template_name):
+        """Return the compiled template, loading it on first use"""
+        template = cls._compiled.get(template_name)
+        if template is None:
+            template = cls._compiled[template_name] = get_template(template_name).template
+        return template
+
+    @classmethod
+    def render(cls, name, context, static_context=None):
+        """
+        Render both parts of an email
+
+        Args:
+            name (str): Template base name, e.g. 'order_confirmation'
+            context (dict): Per-message context
+            static_context (dict): Shared context the per-message values are layered over
+
+        Returns:
+            tuple: (text_content, html_content)
+        """
+        html_content = cls._render(f'emails/{name}.html', context, static_context, autoescape=True)
+        text_content = cls._render(f'emails/{name}.txt', context, static_context, autoescape=False)
+        return text_content, html_content
+
+    @classmethod
+    def clear(cls):
+        """Drop compiled templates, e.g. after editing them in a running process"""
+        cls._compiled.clear()
+
+    @classmethod
+    def _render(cls, template_name, context, static_context, autoescape):
+        # Context layers dicts without copying, so the static part is never rebuilt
+        render_context = Context(static_context, autoescape=autoescape)
+        render_context.update(context)
+        return cls.get_template(template_name).render(render_context)
@@ -0,0 +1,143 @@
+"""
+Live community events
+In-process publish/subscribe for small delta events (new suggestions, new or
+deleted comments, vote counts) that the community page receives over
+server-sent events instead of re-polling the suggestion list.
+
+The backend is pluggable through settings.LIVE_EVENTS_BACKEND. The default
+InMemoryBackend only reaches subscribers of the same process, so either run a
+single ASGI worker or plug in a backend built on a shared broker that
+implements the same publish()/subscribe() interface.
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# Sent when a subscriber has missed events and must reload the feed
+RESET_EVENT = {'id': None, 'type': 'reset', 'data': {}}
+
+
+class Subscription:
+    """One listener's queue of pending events; bound to the event loop it was created on"""
+
+    def __init__(self, backend, backlog, queue_size):
+        self.backend = backend
+        self.loop = asyncio.get_running_loop()
+        self.pending = deque(backlog)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    async def next(self, timeout=None):
+        """Next event, or None if nothing arrived within timeout seconds"""
+        if self.pending:
+            return self.pending.popleft()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def deliver(self, event):
+        # Runs on self.loop; a listener that fell behind is told to reload instead of blocking publishers
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET_EVENT)
+
+    def close(self):
+        self.backend.unsubscribe(self)
+
+
+class InMemoryBackend:
+    """
+    Per-process event fan-out with a short replay history
+
+    publish() may be called from any thread; subscribe() must be called from
+    the event loop that will consume the subscription.
+    """
+
+    def __init__(self, history_size=500, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._last_id = 0
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._last_id += 1
+            event = {'id': self._last_id, 'type': event_type, 'data': data}
+            self._history.append(event)
+            # Scheduled under the lock so every subscriber sees events in id order
+            for subscription in list(self._subscribers):
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+                except RuntimeError:
+                    # The subscriber's loop has shut down without closing it
+                    self._subscribers.discard(subscription)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """
+        Start listening
+
+        Args:
+            last_event_id (int): Last event the client saw; newer events still in
+                the history are replayed, and a reset event is sent if some are gone.
+        """
+        with self._lock:
+            backlog = []
+            if last_event_id is not None:
+                oldest = self._history[0]['id'] if self._history else self._last_id + 1
+                if last_event_id > self._last_id or oldest > last_event_id + 1:
+                    backlog.append(RESET_EVENT)
+                backlog.extend(event for event in self._history if event['id'] > last_event_id)
+            subscription = Subscription(self, backlog, self.queue_size)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend_class = import_string(getattr(settings, 'LIVE_EVENTS_BACKEND', 'plant_store.live.InMemoryBackend'))
+                _backend = backend_class()
+    return _backend
+
+
+def publish_event(event_type, data):
+    """Publish once the current transaction commits (immediately outside of one)"""
+    transaction.on_commit(lambda: get_backend().publish(event_type, data))
+
+
+def format_sse(event):
+    """Encode an event as a text/event-stream frame"""
+    lines = []
+    if event['id'] is not None:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'], cls=DjangoJSONEncoder, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def user_payload(user):
+    return {'username': user.username, 'first_name': user.first_name}
@@ -0,0 +1,45 @@
+"""
+Freeze a snapshot for orders placed before order snapshots existed
+
+Best-effort: the line items keep what was stored at checkout (OrderItem's
+product_name, unit_price and total_price, plus the order's own totals and
+shipping details), but the nested product and category details can only be
+taken as they are now. Run it once after deploying the snapshot migration;
+until an order is backfilled, its detail page renders the live data without
+storing it. Orders that already have a snapshot are never touched.
+
+Usage: python manage.py backfill_order_snapshots --batch-size 200
+"""
+
+from django.core.management.base import BaseCommand
+
+from plant_store.models import Order
+from plant_store.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = 'Store a snapshot for every order that has none yet (best-effort for legacy orders)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Orders serialized per query batch')
+
+    def handle(self, *args, **options):
+        frozen = 0
+        orders = (
+            Order.objects.filter(snapshot__isnull=True)
+            .select_related('user__profile')
+            .prefetch_related('items__product__category')
+            .order_by('pk')
+        )
+        last_pk = 0
+        while True:
+            batch = list(orders.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            for order in batch:
+                if order.freeze_snapshot(OrderSerializer(order).data) is not None:
+                    frozen += 1
+            last_pk = batch[-1].pk
+            self.stdout.write(f'  {frozen} orders frozen')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {frozen} order snapshots'))
@@ -0,0 +1,139 @@
+"""
+Serialization and wire-size benchmark for the API's JSON output
+
+Seeds a catalog and a community board into a throwaway database, then for
+ProductListView and CustomerSuggestionListCreateView measures, over --repeat
+runs:
+
+  * the view itself (queries + DRF serializers), which both renderers share
+  * rendering the same data with DRF's stdlib JSONRenderer and with ORJSONRenderer
+  * the body size uncompressed, gzip-compressed and Brotli-compressed (when the
+    optional brotli package is installed), with the compression time
+
+Usage: python manage.py benchmark_api_rendering --products 500 --suggestions 200 --repeat 20
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from plant_store import views
+from plant_store.benchmarking import isolated_database, summarize_latencies
+from plant_store.compression import available_encodings, compress
+from plant_store.models import Category, Comment, CustomerSuggestion, Product, UserProfile
+from plant_store.renderers import ORJSONRenderer
+
+
+ENDPOINTS = [
+    ('ProductListView', views.ProductListView, '/plant_store/api/products/'),
+    ('CustomerSuggestionListCreateView', views.CustomerSuggestionListCreateView, '/plant_store/api/suggestions/'),
+]
+
+
+def timed(func, repeat):
+    """Run func repeat times; return its last result and the median time in ms"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return result, summarize_latencies(samples)['p50']
+
+
+class Command(BaseCommand):
+    help = 'Compare stdlib vs orjson rendering time and gzip/br wire bytes for the product and suggestion lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500, help='Seeded products')
+        parser.add_argument('--suggestions', type=int, default=200, help='Seeded public suggestions')
+        parser.add_argument('--comments', type=int, default=3, help='Comments per suggestion')
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (the median is reported)')
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.seed(options['products'], options['suggestions'], options['comments'])
+            reports = [self.measure(label, view, path, options['repeat']) for label, view, path in ENDPOINTS]
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"API rendering: {options['products']} products, {options['suggestions']} suggestions "
+            f"x {options['comments']} comments, median of {options['repeat']} runs"
+        ))
+        for report in reports:
+            self.stdout.write(f"  {report['label']}")
+            self.stdout.write(f"    view (queries + serializers): {report['view_ms']:8.2f} ms")
+            self.stdout.write(f"    render stdlib json           : {report['stdlib_ms']:8.2f} ms")
+            self.stdout.write(
+                f"    render orjson                : {report['orjson_ms']:8.2f} ms "
+                f"({report['stdlib_ms'] / report['orjson_ms'] if report['orjson_ms'] else 0:.1f}x faster, "
+                f"{'identical' if report['identical'] else 'DIFFERENT'} output)"
+            )
+            self.stdout.write(f"    wire bytes identity          : {report['bytes']:8d}")
+            for encoding in ('gzip', 'br'):
+                if encoding not in report['compressed']:
+                    self.stdout.write(f"    wire bytes {encoding:<18}: not available (pip install brotli)")
+                    continue
+                size, elapsed = report['compressed'][encoding]
+                self.stdout.write(
+                    f"    wire bytes {encoding:<18}: {size:8d} ({size / report['bytes']:.1%}, {elapsed:.2f} ms to compress)"
+                )
+
+    def seed(self, product_count, suggestion_count, comments_per_suggestion):
+        category = Category.objects.create(name='Benchmark Plants', description='Seeded by benchmark_api_rendering')
+        Product.objects.bulk_create([
+            Product(
+                name=f'Bench Plant {index}',
+                description='A hardy, easy-care houseplant that tolerates low light and irregular watering.',
+                category=category,
+                plant_type='tropical',
+                care_level='easy',
+                light_requirements='bright indirect',
+                water_needs='moderate',
+                price=Decimal('199.00') + index,
+                sale_price=Decimal('149.00') + index if index % 3 == 0 else None,
+                stock_quantity=100,
+                sku=f'BENCH-{index:05d}',
+            )
+            for index in range(product_count)
+        ])
+
+        users = User.objects.bulk_create([
+            User(username=f'bench_render_{index}', email=f'bench_render_{index}@example.com') for index in range(20)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+        suggestions = CustomerSuggestion.objects.bulk_create([
+            CustomerSuggestion(user=users[index % len(users)], content=f'Please stock more variegated plants ({index})')
+            for index in range(suggestion_count)
+        ])
+        Comment.objects.bulk_create([
+            Comment(suggestion=suggestion, user=users[(index + line) % len(users)], content='Seconded, especially monsteras!')
+            for index, suggestion in enumerate(suggestions)
+            for line in range(comments_per_suggestion)
+        ])
+
+    def measure(self, label, view_class, path, repeat):
+        view = view_class.as_view()
+        factory = APIRequestFactory()
+        response, view_ms = timed(lambda: view(factory.get(path)), repeat)
+        data = response.data
+
+        stdlib_body, stdlib_ms = timed(lambda: JSONRenderer().render(data), repeat)
+        orjson_body, orjson_ms = timed(lambda: ORJSONRenderer().render(data), repeat)
+
+        compressed = {}
+        for encoding in available_encodings():
+            body, elapsed = timed(lambda: compress(orjson_body, encoding), repeat)
+            compressed[encoding] = (len(body), elapsed)
+
+        return {
+            'label': label,
+            'view_ms': view_ms,
+            'stdlib_ms': stdlib_ms,
+            'orjson_ms': orjson_ms,
+            'identical': stdlib_body == orjson_body,
+            'bytes': len(orjson_body),
+            'compressed': compressed,
+        }
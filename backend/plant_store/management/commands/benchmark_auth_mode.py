@@ -0,0 +1,115 @@
+"""
+Database cost of the two API authentication modes
+
+For API_AUTH_MODE 'session' and 'jwt' it performs --logins logins through
+UserLoginView, then --requests JWT-authenticated profile reads with the same
+client (cookies included, like a browser), and counts the SQL statements each
+step issues, split into reads and writes per table.
+
+Both modes update auth_user.last_login on login; what stateless mode saves is
+the django_session traffic, so that is what the summary line compares.
+
+Password hashing is switched to a fast hasher: it costs the same in both modes
+and is irrelevant to the statement counts.
+
+Usage: python manage.py benchmark_auth_mode --logins 20 --requests 50
+"""
+
+import re
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from plant_store.benchmarking import isolated_database
+from plant_store.models import UserProfile
+
+
+PASSWORD = 'benchmark-password'
+TABLE_PATTERN = re.compile(r'(?:FROM|INTO|UPDATE)\s+"(\w+)"', re.IGNORECASE)
+WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def mode_settings(mode):
+    """Settings overrides equivalent to starting the server with PLANTIFY_API_AUTH_MODE=mode"""
+    return {
+        'API_AUTH_MODE': mode,
+        'PASSWORD_HASHERS': ['django.contrib.auth.hashers.MD5PasswordHasher'],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Count the database reads and writes per login and per request in session vs stateless JWT mode'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20, help='Logins per mode')
+        parser.add_argument('--requests', type=int, default=50, help='Authenticated requests per mode')
+
+    def handle(self, *args, **options):
+        reports = {}
+        with isolated_database():
+            for mode in ('session', 'jwt'):
+                with override_settings(**mode_settings(mode)):
+                    reports[mode] = self.run_mode(mode, options['logins'], options['requests'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Auth mode cost: {options['logins']} logins, {options['requests']} authenticated requests"
+        ))
+        for mode, report in reports.items():
+            self.stdout.write(f'  API_AUTH_MODE={mode!r}')
+            for step in ('login', 'request'):
+                stats = report[step]
+                self.stdout.write(
+                    f"    per {step:<8}: {stats['writes'] / stats['count']:.2f} writes, "
+                    f"{stats['reads'] / stats['count']:.2f} reads"
+                    + (f"   (writes by table: {self.format_tables(stats['write_tables'], stats['count'])})"
+                       if stats['write_tables'] else '')
+                )
+        saved = (
+            reports['session']['login']['write_tables']['django_session']
+            - reports['jwt']['login']['write_tables']['django_session']
+        ) / options['logins']
+        self.stdout.write(self.style.SUCCESS(f'  Stateless mode saves {saved:.2f} session writes per login'))
+
+    def format_tables(self, tables, count):
+        return ', '.join(f'{table} {total / count:.2f}' for table, total in sorted(tables.items()))
+
+    def run_mode(self, mode, logins, requests):
+        username = f'bench_auth_{mode}'
+        user = User.objects.create_user(username=username, password=PASSWORD)
+        UserProfile.objects.create(user=user)
+
+        client = Client()
+        login_url = reverse('plant_store:user_login')
+        token = None
+        with CaptureQueriesContext(connection) as login_queries:
+            for _ in range(logins):
+                response = client.post(login_url, {'username': username, 'password': PASSWORD}, content_type='application/json')
+                token = response.json()['access_token']
+
+        profile_url = reverse('plant_store:profile_detail')
+        with CaptureQueriesContext(connection) as request_queries:
+            for _ in range(requests):
+                client.get(profile_url, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        return {
+            'login': self.classify(login_queries.captured_queries, logins),
+            'request': self.classify(request_queries.captured_queries, requests),
+        }
+
+    def classify(self, queries, count):
+        writes, reads, write_tables = 0, 0, Counter()
+        for query in queries:
+            sql = query['sql'].lstrip()
+            verb = sql.split(None, 1)[0].upper()
+            if verb in WRITE_VERBS:
+                writes += 1
+                match = TABLE_PATTERN.search(sql)
+                write_tables[match.group(1) if match else '?'] += 1
+            elif verb == 'SELECT':
+                reads += 1
+        return {'count': count, 'writes': writes, 'reads': reads, 'write_tables': write_tables}
@@ -0,0 +1,163 @@
+"""
+Concurrent checkout benchmark for OrderCreateView
+
+Seeds users, carts and products into a throwaway SQLite database, fires N
+checkouts from a thread pool through the DRF test client and reports
+throughput, latency percentiles and "database is locked" failures.
+
+Usage: python manage.py benchmark_checkout --checkouts 200 --concurrency 8
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from plant_store.benchmarking import format_latencies, isolated_database, summarize_latencies
+from plant_store.models import Cart, CartItem, Category, Product, UserProfile
+
+
+SHIPPING_PAYLOAD = {
+    'shipping_address': '12 Fern Lane',
+    'shipping_city': 'Pune',
+    'shipping_state': 'MH',
+    'shipping_zip': '411001',
+    'shipping_country': 'India',
+    'contact_phone': '9876543210',
+    'payment_method': 'cod',
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent checkouts against OrderCreateView on a throwaway SQLite database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkouts', type=int, default=200, help='Number of checkouts (one seeded user each)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent client threads')
+        parser.add_argument('--items-per-cart', type=int, default=3, help='Cart lines per seeded user')
+        parser.add_argument('--products', type=int, default=20, help='Number of seeded products')
+        parser.add_argument('--db-timeout', type=float, default=5.0, help='SQLite busy timeout in seconds')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        with isolated_database(busy_timeout=options['db_timeout']):
+            tokens = self.seed(options['checkouts'], options['products'], options['items_per_cart'])
+            report = self.run(tokens, options['concurrency'])
+
+        report.update({
+            'checkouts': options['checkouts'],
+            'concurrency': options['concurrency'],
+            'items_per_cart': options['items_per_cart'],
+            'db_timeout': options['db_timeout'],
+        })
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def seed(self, user_count, product_count, items_per_cart):
+        """Create products plus one user, profile and filled cart per checkout; return JWTs"""
+        category = Category.objects.create(name='Benchmark Plants')
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Bench Plant {index}',
+                description='Seeded by benchmark_checkout',
+                category=category,
+                price=Decimal('199.00') + index,
+                stock_quantity=1000000,
+                sku=f'BENCH-{index:05d}',
+            )
+            for index in range(product_count)
+        ])
+
+        users = User.objects.bulk_create([
+            User(username=f'bench_user_{index}', email=f'bench_user_{index}@example.com')
+            for index in range(user_count)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+        carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=products[(index + line) % len(products)], quantity=1 + line)
+            for index, cart in enumerate(carts)
+            for line in range(items_per_cart)
+        ])
+
+        return [str(RefreshToken.for_user(user).access_token) for user in users]
+
+    def run(self, tokens, concurrency):
+        """Drive one checkout per token from a thread pool and collect outcomes"""
+        url = reverse('plant_store:order_create')
+        local = threading.local()
+        outcomes = []
+        outcomes_lock = threading.Lock()
+
+        def checkout(token):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = APIClient()
+            started = time.perf_counter()
+            try:
+                response = client.post(url, SHIPPING_PAYLOAD, format='json', HTTP_AUTHORIZATION=f'Bearer {token}')
+                elapsed = time.perf_counter() - started
+                if response.status_code == 201:
+                    outcome = 'ok'
+                elif 'database is locked' in str(response.data.get('error', '')):
+                    outcome = 'locked'
+                else:
+                    outcome = 'error'
+            except Exception as e:
+                # Commit-time lock errors escape the view's own try/except
+                elapsed = time.perf_counter() - started
+                outcome = 'locked' if isinstance(e, OperationalError) and 'locked' in str(e) else 'error'
+            finally:
+                # Mirror CONN_MAX_AGE=0: each request gets its own connection
+                connections.close_all()
+            with outcomes_lock:
+                outcomes.append((outcome, elapsed))
+
+        # OrderCreateView prints debug lines and django.request logs every 500;
+        # silence both so the report stays readable
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(checkout, tokens))
+                wall_time = time.perf_counter() - started
+        finally:
+            request_logger.setLevel(previous_level)
+
+        succeeded = [elapsed for outcome, elapsed in outcomes if outcome == 'ok']
+        return {
+            'succeeded': len(succeeded),
+            'lock_timeouts': sum(1 for outcome, _ in outcomes if outcome == 'locked'),
+            'other_errors': sum(1 for outcome, _ in outcomes if outcome == 'error'),
+            'wall_time_s': wall_time,
+            'throughput_per_s': len(succeeded) / wall_time if wall_time else 0.0,
+            'latency_ms': summarize_latencies([elapsed for _, elapsed in outcomes]),
+        }
+
+    def print_report(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Checkout benchmark: {report['checkouts']} checkouts, concurrency {report['concurrency']}, "
+            f"{report['items_per_cart']} items/cart, busy timeout {report['db_timeout']}s"
+        ))
+        self.stdout.write(f"  succeeded     : {report['succeeded']}")
+        self.stdout.write(f"  lock timeouts : {report['lock_timeouts']}")
+        self.stdout.write(f"  other errors  : {report['other_errors']}")
+        self.stdout.write(f"  wall time     : {report['wall_time_s']:.2f} s")
+        self.stdout.write(f"  throughput    : {report['throughput_per_s']:.1f} checkouts/s")
+        self.stdout.write(f"  latency (ms)  : {format_latencies(report['latency_ms'])}")
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark for order confirmation e-mail rendering
+
+Compares the previous render_to_string + strip_tags path with
+EmailTemplateService (cached compiled templates, layered static context and a
+dedicated plain-text template) and reports renders per second.
+
+Usage: python manage.py benchmark_email_templates --renders 2000 --items 5
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from plant_store.email_templates import COMPANY_CONTEXT, EmailTemplateService
+
+
+class Command(BaseCommand):
+    help = 'Measure order confirmation renders per second, legacy path vs EmailTemplateService'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=2000, help='Renders per variant')
+        parser.add_argument('--items', type=int, default=5, help='Order lines in the sample order')
+
+    def handle(self, *args, **options):
+        context = {
+            'customer_name': 'Bench Customer',
+            'order_number': 'ORD-20250101000000000',
+            'order_date': 'January 01, 2025',
+            'subtotal': '1,000.00',
+            'gst_amount': '80.00',
+            'total_amount': '1,080.00',
+            'payment_method': 'cod',
+            'shipping_address': '12 Fern Lane, Pune, MH 411001, India',
+            'items': [
+                {'name': f'Plant {index}', 'quantity': 1, 'price': '₹200.00', 'total': '₹200.00'}
+                for index in range(options['items'])
+            ],
+            'order_tracking_url': 'http://localhost:3000/orders/ORD-20250101000000000',
+        }
+
+        def legacy():
+            # What send_order_confirmation_email did before: rebuild the full
+            # context, render via the loader and strip tags for the text part
+            html_content = render_to_string('emails/order_confirmation.html', {**context, **COMPANY_CONTEXT})
+            return strip_tags(html_content), html_content
+
+        def cached():
+            return EmailTemplateService.render('order_confirmation', context, COMPANY_CONTEXT)
+
+        renders = options['renders']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Order confirmation rendering: {renders} renders, {options['items']} items"
+        ))
+        results = {}
+        for label, render in (('render_to_string + strip_tags', legacy), ('EmailTemplateService', cached)):
+            render()  # warm template caches
+            started = time.perf_counter()
+            for _ in range(renders):
+                render()
+            elapsed = time.perf_counter() - started
+            results[label] = renders / elapsed
+            self.stdout.write(f"  {label:<30}: {results[label]:,.0f} renders/s ({elapsed * 1000.0 / renders:.3f} ms each)")
+
+        speedup = results['EmailTemplateService'] / results['render_to_string + strip_tags']
+        self.stdout.write(f"  speedup                       : {speedup:.2f}x")
@@ -0,0 +1,147 @@
+"""
+E-mail throughput benchmark against the bundled local SMTP sink
+
+Sends a mix of order confirmations and contact notifications through
+EmailService from a thread pool, twice:
+
+  * inline   - EMAIL_USE_OUTBOX off, one SMTP connection per message
+  * outbox   - request threads only queue; drain_outbox() delivers the
+               batch over one reused connection per --batch-size messages
+
+Usage: python manage.py benchmark_email_throughput --messages 200 --concurrency 8 --handshake-delay-ms 20
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+
+from plant_store.benchmarking import format_latencies, isolated_database, summarize_latencies
+from plant_store.email_service import EmailService, drain_outbox
+from plant_store.models import ContactMessage, OutboxEmail
+from plant_store.smtp_sink import SMTPSink
+
+
+SAMPLE_ORDER = {
+    'order_number': 'ORD-BENCH',
+    'subtotal': '₹1,000.00',
+    'gst_amount': '₹80.00',
+    'total_amount': '₹1,080.00',
+    'payment_method': 'cod',
+    'shipping_address': '12 Fern Lane, Pune, MH 411001, India',
+    'items': [
+        {'name': f'Plant {index}', 'quantity': 1, 'price': '₹200.00', 'total': '₹200.00'}
+        for index in range(5)
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure e-mail throughput through EmailService with and without SMTP connection reuse'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help='Messages per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent sender threads')
+        parser.add_argument('--batch-size', type=int, default=50, help='Outbox messages per SMTP session')
+        parser.add_argument('--handshake-delay-ms', type=float, default=20.0,
+                            help='Simulated per-connection handshake cost of a remote SMTP server')
+
+    def handle(self, *args, **options):
+        sink = SMTPSink(('127.0.0.1', 0), handshake_delay=options['handshake_delay_ms'] / 1000.0)
+        sink.start_in_thread()
+        smtp_settings = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': sink.port,
+            'EMAIL_USE_TLS': False,
+            'EMAIL_HOST_USER': '',
+            'EMAIL_HOST_PASSWORD': '',
+        }
+        try:
+            with isolated_database(), override_settings(**smtp_settings):
+                contact_message = ContactMessage.objects.create(
+                    name='Bench Customer', email='bench@example.com', subject='general',
+                    message='Benchmark contact message body.'
+                )
+                jobs = [self.make_job(index, contact_message) for index in range(options['messages'])]
+
+                # EmailService prints a line per message; keep the report readable
+                with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                    inline = self.run_inline(sink, jobs, options['concurrency'])
+                    outbox = self.run_outbox(sink, jobs, options['concurrency'], options['batch_size'])
+        finally:
+            sink.shutdown()
+            sink.server_close()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"E-mail throughput: {options['messages']} messages, concurrency {options['concurrency']}, "
+            f"handshake {options['handshake_delay_ms']:.0f} ms"
+        ))
+        for label, report in (('inline, connection per message', inline), ('outbox, reused connection', outbox)):
+            self.stdout.write(f"  {label}")
+            self.stdout.write(f"    delivered        : {report['delivered']} over {report['connections']} SMTP connections")
+            self.stdout.write(f"    throughput       : {report['throughput']:.1f} msg/s")
+            self.stdout.write(f"    caller latency   : {format_latencies(report['caller_latency'])} ms")
+            if 'send_latency' in report:
+                self.stdout.write(f"    send latency     : {format_latencies(report['send_latency'])} ms")
+
+    def make_job(self, index, contact_message):
+        """Alternate order confirmations and contact notifications"""
+        if index % 2:
+            return lambda: EmailService.send_contact_notification_email(contact_message, 'plantify.orders@gmail.com')
+        return lambda: EmailService.send_order_confirmation_email(SAMPLE_ORDER, f'bench{index}@example.com', 'Bench')
+
+    def timed_pool(self, jobs, concurrency):
+        """Run jobs from a thread pool; return (wall seconds, per-job latencies)"""
+        def run(job):
+            started = time.perf_counter()
+            try:
+                job()
+            finally:
+                connections.close_all()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(run, jobs))
+        return time.perf_counter() - started, latencies
+
+    def run_inline(self, sink, jobs, concurrency):
+        messages_before, connections_before = sink.message_count, sink.connection_count
+        with override_settings(EMAIL_USE_OUTBOX=False):
+            wall, latencies = self.timed_pool(jobs, concurrency)
+        delivered = sink.message_count - messages_before
+        return {
+            'delivered': delivered,
+            'connections': sink.connection_count - connections_before,
+            'throughput': delivered / wall if wall else 0.0,
+            'caller_latency': summarize_latencies(latencies),
+        }
+
+    def run_outbox(self, sink, jobs, concurrency, batch_size):
+        messages_before, connections_before = sink.message_count, sink.connection_count
+        OutboxEmail.objects.all().delete()
+        with override_settings(EMAIL_USE_OUTBOX=True):
+            enqueue_wall, latencies = self.timed_pool(jobs, concurrency)
+
+        send_latencies = []
+        started = time.perf_counter()
+        while True:
+            stats = drain_outbox(batch_size=batch_size)
+            if not (stats['sent'] + stats['retried'] + stats['failed']):
+                break
+            send_latencies.extend(stats['latencies'])
+        drain_wall = time.perf_counter() - started
+
+        delivered = sink.message_count - messages_before
+        return {
+            'delivered': delivered,
+            'connections': sink.connection_count - connections_before,
+            'throughput': delivered / drain_wall if drain_wall else 0.0,
+            'caller_latency': summarize_latencies(latencies),
+            'send_latency': summarize_latencies(send_latencies),
+        }
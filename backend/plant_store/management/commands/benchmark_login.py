@@ -0,0 +1,138 @@
+"""
+Login throughput benchmark: inline hashing vs the async hashing pool
+
+Runs the same number of logins, with the project's real password hasher, twice:
+
+  * sync   - UserLoginView from --concurrency threads, each blocked for the
+             whole PBKDF2 run like a sync worker
+  * async  - async_user_login with --concurrency concurrent requests on one
+             event loop; hashing runs in the bounded password hashing pool
+
+Throughput is also reported per CPU core so runs on different machines compare.
+Hashing is CPU-bound, so logins per core stay roughly the same; what changes is
+that cheap requests no longer wait behind logins. Each scenario therefore also
+sends one category-list probe per login and reports the probes' latency. All
+requests are submitted at once and latency counts from submission, so time
+spent queued for a worker is included.
+
+Usage: python manage.py benchmark_login --logins 48 --concurrency 8
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from plant_store.benchmarking import format_latencies, isolated_database, summarize_latencies
+from plant_store.models import UserProfile
+
+
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput with inline PBKDF2 and with the async hashing pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=48, help='Logins per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent logins (threads or tasks)')
+
+    def handle(self, *args, **options):
+        logins, concurrency = options['logins'], options['concurrency']
+        cores = os.cpu_count() or 1
+
+        # One account per concurrent caller, all from one address, so the benchmark
+        # measures hashing rather than the per-account/per-IP limits
+        limits = {'PASSWORD_HASH_MAX_PER_IP': concurrency, 'PASSWORD_HASH_MAX_PER_ACCOUNT': concurrency}
+        with isolated_database(busy_timeout=30), override_settings(**limits):
+            password_hash = make_password(PASSWORD)  # hashed once, shared by every account
+            usernames = [f'bench_login_{index}' for index in range(concurrency)]
+            for username in usernames:
+                user = User.objects.create(username=username, password=password_hash)
+                UserProfile.objects.create(user=user)
+            # Logins interleaved with cheap probe requests (None)
+            jobs = [job for index in range(logins) for job in (usernames[index % concurrency], None)]
+
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                sync_report = self.run_sync(jobs, concurrency)
+                async_report = self.run_async(jobs, concurrency)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Login throughput: {logins} logins, concurrency {concurrency}, {cores} CPU core(s)'
+        ))
+        for label, report in (('sync view, inline hashing', sync_report), ('async view, hashing pool', async_report)):
+            self.stdout.write(f'  {label}')
+            self.stdout.write(f"    succeeded      : {report['ok']} (refused {report['refused']}, failed {report['failed']})")
+            self.stdout.write(
+                f"    throughput     : {report['throughput']:.2f} logins/s "
+                f"({report['throughput'] / cores:.2f} per core)"
+            )
+            self.stdout.write(f"    login latency  : {format_latencies(report['latency'])} ms")
+            self.stdout.write(f"    probe latency  : {format_latencies(report['probe_latency'])} ms")
+
+    def report(self, wall, results):
+        logins = [(status_code, latency) for kind, status_code, latency in results if kind == 'login']
+        statuses = [status_code for status_code, _ in logins]
+        ok = statuses.count(200)
+        return {
+            'ok': ok,
+            'refused': sum(1 for status_code in statuses if status_code in (429, 503)),
+            'failed': sum(1 for status_code in statuses if status_code not in (200, 429, 503)),
+            'throughput': ok / wall if wall else 0.0,
+            'latency': summarize_latencies([latency for _, latency in logins]),
+            'probe_latency': summarize_latencies([latency for kind, _, latency in results if kind == 'probe']),
+        }
+
+    def run_sync(self, jobs, concurrency):
+        login_url = reverse('plant_store:user_login')
+        probe_url = reverse('plant_store:category_list')
+
+        def request(username):
+            # Probes queue for the same worker threads as logins, as on a sync server
+            try:
+                if username is None:
+                    return 'probe', Client().get(probe_url).status_code, time.perf_counter() - started
+                response = Client().post(
+                    login_url, {'username': username, 'password': PASSWORD}, content_type='application/json'
+                )
+                return 'login', response.status_code, time.perf_counter() - started
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(request, jobs))
+        return self.report(time.perf_counter() - started, results)
+
+    def run_async(self, jobs, concurrency):
+        login_url = reverse('plant_store:user_login_async')
+        probe_url = reverse('plant_store:category_list')
+
+        async def main():
+            gate = asyncio.Semaphore(concurrency)
+
+            async def request(username):
+                if username is None:
+                    response = await AsyncClient().get(probe_url)
+                    return 'probe', response.status_code, time.perf_counter() - started
+                async with gate:
+                    response = await AsyncClient().post(
+                        login_url, {'username': username, 'password': PASSWORD}, content_type='application/json'
+                    )
+                    return 'login', response.status_code, time.perf_counter() - started
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(request(username) for username in jobs))
+            return time.perf_counter() - started, results
+
+        wall, results = asyncio.run(main())
+        return self.report(wall, results)
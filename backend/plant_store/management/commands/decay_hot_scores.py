@@ -0,0 +1,38 @@
+"""
+Periodic re-ageing of suggestion hot scores
+
+Hot scores fall as suggestions age, even without new votes or comments, so
+this should run every few minutes (cron, systemd timer or --loop).
+
+Usage:
+    python manage.py decay_hot_scores              # one pass, then exit
+    python manage.py decay_hot_scores --loop       # re-age every --interval seconds
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from plant_store.ranking import decay_hot_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute time-decayed hot scores of recent customer suggestions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Suggestions re-scored per query')
+        parser.add_argument('--loop', action='store_true', help='Keep re-ageing instead of exiting after one pass')
+        parser.add_argument('--interval', type=float, default=300.0, help='Seconds between passes for --loop')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                stats = decay_hot_scores(batch_size=options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Hot scores: {stats['refreshed']} re-scored, {stats['expired']} expired"
+                ))
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,21 @@
+"""
+Rebuild denormalized comment counters from the comment table
+
+Needed after bulk imports or raw SQL that bypass the Comment signals.
+
+Usage: python manage.py repair_comment_counts
+"""
+
+from django.core.management.base import BaseCommand
+
+from plant_store.comment_counts import repair_comment_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute CustomerSuggestion.comment_count and Comment.reply_count'
+
+    def handle(self, *args, **options):
+        fixed = repair_comment_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Fixed {fixed['suggestions']} suggestion and {fixed['comments']} comment counters"
+        ))
@@ -0,0 +1,42 @@
+"""
+Run the local SMTP sink so e-mail can be exercised without a real mail server
+
+Usage:
+    python manage.py run_smtp_sink --port 1025
+
+Then use EMAIL_HOST = '127.0.0.1', EMAIL_PORT = 1025, EMAIL_USE_TLS = False and
+an empty EMAIL_HOST_USER in settings.
+"""
+
+from django.core.management.base import BaseCommand
+
+from plant_store.smtp_sink import SMTPSink
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMTP server that accepts and counts every message'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--handshake-delay-ms', type=float, default=0.0,
+                            help='Simulated per-connection handshake cost of a remote server')
+
+    def handle(self, *args, **options):
+        def on_message(mail_from, recipients, size):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"Message from {mail_from} to {', '.join(recipients)} ({size} bytes)")
+
+        sink = SMTPSink(
+            (options['host'], options['port']),
+            handshake_delay=options['handshake_delay_ms'] / 1000.0,
+            on_message=on_message,
+        )
+        self.stdout.write(self.style.SUCCESS(f"SMTP sink listening on {options['host']}:{sink.port} (Ctrl+C to stop)"))
+        try:
+            sink.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.server_close()
+        self.stdout.write(f"Received {sink.message_count} messages over {sink.connection_count} connections")
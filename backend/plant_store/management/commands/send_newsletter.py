@@ -0,0 +1,182 @@
+"""
+Resumable newsletter sender
+
+Streams subscribed users in id order, sends in batches over one reused SMTP
+connection, paces delivery to --rate messages per second and checkpoints the
+campaign after every batch, so re-running after a crash resumes where it stopped.
+Recipients whose message failed are kept on the campaign and retried first by
+the next run, including a run of a campaign that otherwise completed.
+
+Usage: python manage.py send_newsletter <campaign_id> --batch-size 100 --rate 10
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.template import Context, Template
+from django.utils import timezone
+
+from plant_store.models import NewsletterCampaign
+
+
+class Command(BaseCommand):
+    help = 'Send a newsletter campaign to subscribed users, resuming from its last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_id', type=int)
+        parser.add_argument('--batch-size', type=int, default=100, help='Recipients per checkpoint')
+        parser.add_argument('--rate', type=float, default=0, help='Maximum messages per second (0 = unlimited)')
+        parser.add_argument('--restart', action='store_true', help='Discard the checkpoint and send to everyone again')
+
+    def handle(self, *args, **options):
+        try:
+            campaign = NewsletterCampaign.objects.get(pk=options['campaign_id'])
+        except NewsletterCampaign.DoesNotExist:
+            raise CommandError(f"Newsletter campaign {options['campaign_id']} does not exist")
+
+        if options['restart']:
+            campaign.last_user_id = campaign.sent_count = campaign.failed_count = 0
+            campaign.failed_user_ids = []
+            campaign.status = 'draft'
+        elif campaign.status == 'completed' and not campaign.failed_user_ids:
+            raise CommandError('Campaign already completed; use --restart to send it again')
+
+        # Connect before touching the campaign, so an unreachable server leaves it as it was
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            raise CommandError(f"Could not connect to the mail server: {e}")
+
+        if campaign.last_user_id:
+            self.stdout.write(f"Resuming campaign {campaign.pk} after user id {campaign.last_user_id}")
+        campaign.status = 'sending'
+        campaign.started_at = campaign.started_at or timezone.now()
+        campaign.save(update_fields=['status', 'started_at', 'last_user_id', 'sent_count', 'failed_count', 'failed_user_ids'])
+
+        # Compile once; each recipient only renders
+        text_template = Template(campaign.body)
+        html_template = Template(campaign.html_body) if campaign.html_body else None
+
+        subscribers = (
+            User.objects.filter(is_active=True, profile__newsletter_subscription=True)
+            .exclude(email='')
+            .order_by('id')
+            .values_list('id', 'email', 'first_name', 'username')
+        )
+        retries = subscribers.filter(id__in=campaign.failed_user_ids)
+        recipients = subscribers.filter(id__gt=campaign.last_user_id).iterator(chunk_size=options['batch_size'])
+        if campaign.failed_user_ids:
+            self.stdout.write(f"Retrying {len(campaign.failed_user_ids)} recipient(s) that failed before")
+
+        # Failed in this run; at the end it replaces the campaign's list, which drops
+        # earlier failures that have since unsubscribed
+        self.failed_ids = set()
+        pacer = _Pacer(options['rate'])
+        started = time.perf_counter()
+        sent = 0
+        try:
+            # Earlier failures first; they do not move the last_user_id checkpoint
+            for batch in _batches(retries, options['batch_size']):
+                sent += self.send_batch(campaign, batch, text_template, html_template, connection, pacer, advance=False)
+            for batch in _batches(recipients, options['batch_size']):
+                sent += self.send_batch(campaign, batch, text_template, html_template, connection, pacer)
+        finally:
+            connection.close()
+
+        NewsletterCampaign.objects.filter(pk=campaign.pk).update(
+            status='completed', completed_at=timezone.now(),
+            failed_user_ids=sorted(self.failed_ids), failed_count=len(self.failed_ids),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Campaign {campaign.pk}: {sent} sent, {len(self.failed_ids)} failed in {elapsed:.1f} s "
+            f"({sent / elapsed if elapsed else 0.0:.1f} msg/s)"
+        ))
+        if self.failed_ids:
+            self.stdout.write(f"Run the command again to retry the {len(self.failed_ids)} failed recipient(s)")
+
+    def send_batch(self, campaign, batch, text_template, html_template, connection, pacer, advance=True):
+        """
+        Send one batch over the shared connection, then checkpoint the campaign
+
+        Args:
+            advance: move the last_user_id checkpoint past the batch (False when retrying earlier failures)
+
+        Returns:
+            int: messages sent
+        """
+        sent = 0
+        for user_id, email, first_name, username in batch:
+            context = Context({'name': first_name or username}, autoescape=False)
+            message = EmailMultiAlternatives(
+                subject=campaign.subject,
+                body=text_template.render(context),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[email],
+                connection=connection
+            )
+            if html_template is not None:
+                message.attach_alternative(html_template.render(Context({'name': first_name or username})), "text/html")
+
+            pacer.wait()
+            try:
+                connection.send_messages([message])
+                sent += 1
+            except Exception as e:
+                self.failed_ids.add(user_id)
+                self.stderr.write(f"Failed to send to user {user_id}: {e}")
+                # Start a fresh session in case the SMTP connection dropped
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    pass
+
+        # Failures from earlier runs that are not retried yet stay on the list
+        pending = set(campaign.failed_user_ids) - {user_id for user_id, *_ in batch}
+        campaign.failed_user_ids = sorted(pending | self.failed_ids)
+        checkpoint = {'last_user_id': batch[-1][0]} if advance else {}
+        NewsletterCampaign.objects.filter(pk=campaign.pk).update(
+            sent_count=F('sent_count') + sent,
+            failed_user_ids=campaign.failed_user_ids,
+            failed_count=len(campaign.failed_user_ids),
+            **checkpoint
+        )
+        self.stdout.write(
+            f"  checkpoint: user id {batch[-1][0]} ({sent} sent, {len(batch) - sent} failed in batch)"
+        )
+        return sent
+
+
+def _batches(rows, size):
+    """Group an iterable into lists of at most `size` rows"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Pacer:
+    """Spaces calls so they never exceed `rate` per second (0 disables pacing)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_at = time.perf_counter()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
@@ -0,0 +1,56 @@
+"""
+Outbox worker: delivers queued OutboxEmail rows over reused SMTP sessions
+
+With EMAIL_USE_OUTBOX on (the default) this worker is the only thing that sends
+mail: run it with --loop alongside the web server in every deployment.
+
+Usage:
+    python manage.py send_queued_emails            # drain everything due, then exit
+    python manage.py send_queued_emails --loop     # keep polling for new mail
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from plant_store.benchmarking import format_latencies, summarize_latencies
+from plant_store.email_service import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending outbox e-mails in batches over one SMTP connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Messages per SMTP session')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Attempts before a message is marked failed')
+        parser.add_argument('--backoff', type=int, default=30, help='Base retry delay in seconds, doubled per failure')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the outbox is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Polling interval in seconds for --loop')
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retried': 0, 'failed': 0}
+        try:
+            while True:
+                stats = drain_outbox(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    backoff_seconds=options['backoff'],
+                )
+                processed = stats['sent'] + stats['retried'] + stats['failed']
+                if processed:
+                    for key in totals:
+                        totals[key] += stats[key]
+                    self.stdout.write(
+                        f"Batch: {stats['sent']} sent, {stats['retried']} retrying, {stats['failed']} failed; "
+                        f"latency (ms) {format_latencies(summarize_latencies(stats['latencies']))}"
+                    )
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox drained: {totals['sent']} sent, {totals['retried']} retrying, {totals['failed']} failed"
+        ))
@@ -0,0 +1,55 @@
+"""
+Middleware for the stateless (JWT-only) API mode
+With settings.API_AUTH_MODE = 'jwt', requests whose path starts with one of
+STATELESS_API_PATH_PREFIXES get an empty, never-persisted session and skip
+CSRF checks: no django_session lookup or write happens for them. Admin and
+other pages keep regular sessions. In the default 'session' mode both classes
+behave exactly like the Django middleware they replace.
+"""
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+
+def is_stateless_api_request(request):
+    """True if the request is an API call served without session state"""
+    if getattr(settings, 'API_AUTH_MODE', 'session') != 'jwt':
+        return False
+    return request.path_info.startswith(tuple(getattr(settings, 'STATELESS_API_PATH_PREFIXES', ())))
+
+
+class APISessionMiddleware(SessionMiddleware):
+    """SessionMiddleware that leaves stateless API requests without a stored session"""
+
+    def process_request(self, request):
+        if is_stateless_api_request(request):
+            # No session key: reading it never touches the database, and it is never saved
+            request.session = self.SessionStore()
+            request.stateless_api = True
+            return
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        if getattr(request, 'stateless_api', False):
+            return response
+        return super().process_response(request, response)
+
+
+class APICsrfViewMiddleware(CsrfViewMiddleware):
+    """CsrfViewMiddleware that skips stateless API requests (bearer tokens are not sent by browsers automatically)"""
+
+    def process_request(self, request):
+        if is_stateless_api_request(request):
+            return None
+        return super().process_request(request)
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_stateless_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+    def process_response(self, request, response):
+        if is_stateless_api_request(request):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:37
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_store', '0009_order_customer_email_order_payment_method'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='snapshot',
+            field=models.JSONField(blank=True, editable=False, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_store', '0012_contactmessage_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsletterCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField(help_text='Plain-text body; Django template syntax, {{ name }} is the recipient name')),
+                ('html_body', models.TextField(blank=True, help_text='Optional HTML body, same template syntax')),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('sending', 'Sending'), ('completed', 'Completed')], default='draft', max_length=10)),
+                ('last_user_id', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Newsletter Campaign',
+                'verbose_name_plural': 'Newsletter Campaigns',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_top_score(apps, schema_editor):
+    # Hot scores are time-dependent; the first decay_hot_scores run fills them in
+    CustomerSuggestion = apps.get_model('plant_store', 'CustomerSuggestion')
+    CustomerSuggestion.objects.update(top_score=models.F('likes') - models.F('dislikes'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_store', '0013_newslettercampaign'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customersuggestion',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customersuggestion',
+            name='top_score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='customersuggestion',
+            index=models.Index(fields=['is_public', '-hot_score'], name='suggestion_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customersuggestion',
+            index=models.Index(fields=['is_public', '-top_score', '-created_at'], name='suggestion_top_idx'),
+        ),
+        migrations.RunPython(backfill_top_score, migrations.RunPython.noop),
+    ]
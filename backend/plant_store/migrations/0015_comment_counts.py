@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:50
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    CustomerSuggestion = apps.get_model('plant_store', 'CustomerSuggestion')
+    Comment = apps.get_model('plant_store', 'Comment')
+
+    def count_of(key):
+        return Coalesce(
+            Subquery(
+                Comment.objects.filter(**{key: OuterRef('pk')})
+                .order_by().values(key).annotate(total=Count('id')).values('total'),
+                output_field=models.IntegerField()
+            ),
+            Value(0)
+        )
+
+    CustomerSuggestion.objects.update(comment_count=count_of('suggestion_id'))
+    Comment.objects.update(reply_count=count_of('parent_comment_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_store', '0014_suggestion_ranking'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customersuggestion',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
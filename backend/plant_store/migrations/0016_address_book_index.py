@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_store', '0015_comment_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='useraddress',
+            index=models.Index(fields=['user', 'is_active', 'is_default'], name='address_book_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def keep_newest_default(apps, schema_editor):
+    # Earlier concurrent "set default" calls could leave several defaults; keep the newest
+    UserAddress = apps.get_model('plant_store', 'UserAddress')
+    seen = set()
+    for address in UserAddress.objects.filter(is_default=True).order_by('user_id', '-updated_at', '-id'):
+        if address.user_id in seen:
+            UserAddress.objects.filter(pk=address.pk).update(is_default=False)
+        seen.add(address.user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_store', '0016_address_book_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_newest_default, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='useraddress',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('user',), name='one_default_address_per_user'),
+        ),
+    ]
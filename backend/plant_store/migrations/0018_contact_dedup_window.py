@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_store', '0017_one_default_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactmessage',
+            name='dedup_window',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='contactmessage',
+            constraint=models.UniqueConstraint(fields=('content_hash', 'dedup_window'), name='one_contact_message_per_window'),
+        ),
+    ]
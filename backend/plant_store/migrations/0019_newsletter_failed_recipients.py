@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_store', '0018_contact_dedup_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newslettercampaign',
+            name='failed_user_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -1,8 +1,13 @@
-from django.db import models
+import hashlib
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import User as DjangoUser
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
+from .db_retry import retry_on_lock
+
 # Create your models here.
 
 class UserProfile(models.Model):
@@ -79,12 +84,30 @@ class UserAddress(models.Model):
 		return f"{self.user.username} - {self.address_type} - {self.city}"
 	
 	def save(self, *args, **kwargs):
-		# Ensure only one default address per user
-		if self.is_default:
-			UserAddress.objects.filter(user=self.user, is_default=True).update(is_default=False)
-		super().save(*args, **kwargs)
+		# Only one default address per user (enforced by one_default_address_per_user)
+		if not self.is_default:
+			return super().save(*args, **kwargs)
+		# IntegrityError: another default was committed between our two statements (possible
+		# where the database has no row locks); the next attempt clears that one as well
+		retry_on_lock(lambda: self._save_as_default(*args, **kwargs), retry_on=(IntegrityError,))
+	
+	def _save_as_default(self, *args, **kwargs):
+		"""Clear the user's old default and save this address, in one transaction"""
+		with transaction.atomic():
+			# Same user row lock as address_book.set_default_address, so concurrent swaps take turns
+			list(DjangoUser.objects.select_for_update().filter(pk=self.user_id).values_list('pk'))
+			UserAddress.objects.filter(user_id=self.user_id, is_default=True).exclude(pk=self.pk).update(is_default=False)
+			super().save(*args, **kwargs)
 	
 	class Meta:
+		indexes = [
+			models.Index(fields=['user', 'is_active', 'is_default'], name='address_book_idx'),
+		]
+		constraints = [
+			models.UniqueConstraint(
+				fields=['user'], condition=models.Q(is_default=True), name='one_default_address_per_user'
+			),
+		]
 		verbose_name = "User Address"
 		verbose_name_plural = "User Addresses"
 		ordering = ['-is_default', '-created_at']
@@ -252,13 +275,25 @@ class Order(models.Model):
 		('cod', 'Cash on Delivery'),
 	], default='cod')
 	
+	# Serialized copy of the order taken at checkout and never rewritten
+	snapshot = models.JSONField(blank=True, null=True, editable=False, encoder=DjangoJSONEncoder)
+	
 	# Timestamps
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 	
+	# Columns that keep changing after checkout and are overlaid on the snapshot
+	SNAPSHOT_LIVE_FIELDS = ('status', 'payment_status', 'updated_at')
+	
 	def __str__(self):
 		return f"Order {self.order_number} by {self.user.username}"
 	
+	def freeze_snapshot(self, data):
+		"""Store the serialized order once; an existing snapshot is never overwritten"""
+		if Order.objects.filter(pk=self.pk, snapshot__isnull=True).update(snapshot=data):
+			self.snapshot = data
+		return self.snapshot
+	
 	def save(self, *args, **kwargs):
 		"""Auto-generate order number if not provided"""
 		if not self.order_number:
@@ -312,6 +347,8 @@ class ContactMessage(models.Model):
 	email = models.EmailField()
 	subject = models.CharField(max_length=50, choices=SUBJECT_CHOICES)
 	message = models.TextField()
+	content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # Used to drop repeated submissions
+	dedup_window = models.BigIntegerField(null=True, blank=True, editable=False)  # CONTACT_DEDUP_WINDOW_SECONDS slot the message was sent in
 	created_at = models.DateTimeField(auto_now_add=True)
 	is_read = models.BooleanField(default=False)
 	status = models.CharField(max_length=20, choices=[
@@ -325,9 +362,29 @@ class ContactMessage(models.Model):
 		ordering = ['-created_at']
 		verbose_name = 'Contact Message'
 		verbose_name_plural = 'Contact Messages'
+		constraints = [
+			# Concurrent identical submissions can both miss the duplicate check; only one gets stored
+			models.UniqueConstraint(fields=['content_hash', 'dedup_window'], name='one_contact_message_per_window'),
+		]
 	
 	def __str__(self):
 		return f"{self.name} - {self.subject} ({self.created_at.strftime('%Y-%m-%d')})"
+	
+	@staticmethod
+	def compute_content_hash(name, email, subject, message):
+		"""SHA-256 over the normalized submission, so resubmits of the same form match"""
+		normalized = '\x1f'.join([
+			' '.join(name.split()).lower(),
+			email.strip().lower(),
+			subject,
+			' '.join(message.split()),
+		])
+		return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+	
+	def save(self, *args, **kwargs):
+		if not self.content_hash:
+			self.content_hash = self.compute_content_hash(self.name, self.email, self.subject, self.message)
+		super().save(*args, **kwargs)
 
 
 class CustomerSuggestion(models.Model):
@@ -342,11 +399,22 @@ class CustomerSuggestion(models.Model):
 	likes = models.PositiveIntegerField(default=0)
 	dislikes = models.PositiveIntegerField(default=0)
 	
+	# Maintained by plant_store.signals; repair with the repair_comment_counts command
+	comment_count = models.PositiveIntegerField(default=0)
+	
+	# Ranking, maintained by plant_store.ranking on votes/comments and by decay_hot_scores
+	hot_score = models.FloatField(default=0)
+	top_score = models.IntegerField(default=0)  # likes - dislikes
+	
 	def __str__(self):
 		return f"Suggestion by {self.user.username} on {self.created_at.strftime('%Y-%m-%d')}"
 	
 	class Meta:
 		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['is_public', '-hot_score'], name='suggestion_hot_idx'),
+			models.Index(fields=['is_public', '-top_score', '-created_at'], name='suggestion_top_idx'),
+		]
 		verbose_name = 'Customer Suggestion'
 		verbose_name_plural = 'Customer Suggestions'
 
@@ -364,6 +432,9 @@ class Comment(models.Model):
 	likes = models.PositiveIntegerField(default=0)
 	dislikes = models.PositiveIntegerField(default=0)
 	
+	# Direct replies, maintained by plant_store.signals
+	reply_count = models.PositiveIntegerField(default=0)
+	
 	def __str__(self):
 		return f"Comment by {self.user.username} on {self.created_at.strftime('%Y-%m-%d')}"
 	
@@ -394,3 +465,71 @@ class UserVote(models.Model):
 	
 	def __str__(self):
 		return f"{self.user.username} {self.vote_type}d {self.content_object}"
+
+
+class OutboxEmail(models.Model):
+	"""Outgoing e-mail queued by request threads and delivered by the send_queued_emails worker"""
+	STATUS_CHOICES = [
+		('pending', 'Pending'),
+		('sent', 'Sent'),
+		('failed', 'Failed'),
+	]
+	
+	subject = models.CharField(max_length=255)
+	body = models.TextField()  # Plain-text part
+	html_body = models.TextField(blank=True)
+	from_email = models.CharField(max_length=255)
+	to = models.JSONField(default=list)  # List of recipient addresses
+	
+	# Delivery state
+	status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+	attempts = models.PositiveIntegerField(default=0)
+	next_attempt_at = models.DateTimeField(default=timezone.now)
+	last_error = models.TextField(blank=True)
+	latency_ms = models.FloatField(blank=True, null=True)  # Time spent in send_messages for the successful attempt
+	
+	created_at = models.DateTimeField(auto_now_add=True)
+	sent_at = models.DateTimeField(blank=True, null=True)
+	
+	def __str__(self):
+		return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+	
+	class Meta:
+		ordering = ['id']
+		indexes = [
+			models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+		]
+		verbose_name = 'Outbox Email'
+		verbose_name_plural = 'Outbox Emails'
+
+
+class NewsletterCampaign(models.Model):
+	"""Newsletter sent to subscribed users by the send_newsletter command"""
+	STATUS_CHOICES = [
+		('draft', 'Draft'),
+		('sending', 'Sending'),
+		('completed', 'Completed'),
+	]
+	
+	subject = models.CharField(max_length=255)
+	body = models.TextField(help_text='Plain-text body; Django template syntax, {{ name }} is the recipient name')
+	html_body = models.TextField(blank=True, help_text='Optional HTML body, same template syntax')
+	status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
+	
+	# Checkpoint: recipients are processed in user id order, so a crashed run resumes after this id
+	last_user_id = models.PositiveIntegerField(default=0)
+	sent_count = models.PositiveIntegerField(default=0)
+	failed_count = models.PositiveIntegerField(default=0)
+	failed_user_ids = models.JSONField(default=list, blank=True)  # Recipients still owed the newsletter; retried on the next run
+	
+	created_at = models.DateTimeField(auto_now_add=True)
+	started_at = models.DateTimeField(blank=True, null=True)
+	completed_at = models.DateTimeField(blank=True, null=True)
+	
+	def __str__(self):
+		return f"{self.subject} ({self.status})"
+	
+	class Meta:
+		ordering = ['-created_at']
+		verbose_name = 'Newsletter Campaign'
+		verbose_name_plural = 'Newsletter Campaigns'
@@ -0,0 +1,70 @@
+"""
+Account onboarding
+Every account consists of a User, its UserProfile and a Cart. They are created
+together in one transaction, one account at a time for registration and in
+bulk batches for imports.
+"""
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Cart, UserProfile
+
+
+DEFAULT_PLANT_EXPERIENCE = 'beginner'
+
+
+def create_registered_user(validated_data, password_hash):
+    """
+    Create a user with profile and cart atomically
+
+    Username and email are normalized the way UserManager.create_user does it.
+
+    Args:
+        validated_data (dict): username, email and optional first_name/last_name
+        password_hash (str): Output of make_password(); hashing is left to the
+            caller so it happens outside the transaction
+
+    Returns:
+        User: The new user
+    """
+    with transaction.atomic():
+        user = User.objects.create(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data.get('email', '')),
+            first_name=validated_data.get('first_name', ''),
+            last_name=validated_data.get('last_name', ''),
+            password=password_hash
+        )
+        UserProfile.objects.create(user=user, plant_experience=DEFAULT_PLANT_EXPERIENCE)
+        Cart.objects.create(user=user)
+    return user
+
+
+def bulk_create_accounts(rows):
+    """
+    Create users, profiles and carts for a batch in one transaction
+
+    Args:
+        rows (list): dicts with username, email, password (already hashed) and
+            optional first_name/last_name; usernames must not exist yet
+
+    Returns:
+        list: The created users, with primary keys
+    """
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(
+                username=row['username'],
+                email=User.objects.normalize_email(row.get('email', '')),
+                first_name=row.get('first_name', ''),
+                last_name=row.get('last_name', ''),
+                password=row['password']
+            )
+            for row in rows
+        ])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, plant_experience=DEFAULT_PLANT_EXPERIENCE) for user in users
+        ])
+        Cart.objects.bulk_create([Cart(user=user) for user in users])
+    return users
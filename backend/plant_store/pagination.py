@@ -0,0 +1,103 @@
+"""
+Pagination classes for PlantiFy API endpoints
+"""
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class SuggestionFeedPagination(CursorPagination):
+    """
+    Cursor pagination for the community feed; no COUNT query, stable under inserts
+
+    DRF's cursor records only the first ordering field and steps over rows that
+    share it with an offset, which stops working past offset_cutoff. Hot and top
+    scores tie all the time (every unvoted suggestion scores 0), so here the
+    cursor position is the pair (first field, id) and the next page starts with
+    a keyset filter on both. Orderings must end with the id in the same direction
+    as their first field.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('-created_at', '-id')
+    position_separator = '|'
+
+    def get_ordering(self, request, queryset, view):
+        # The feed view picks the ordering from its ?sort= parameter
+        if hasattr(view, 'get_feed_ordering'):
+            return view.get_feed_ordering()
+        return super().get_ordering(request, queryset, view)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return f'{super()._get_position_from_instance(instance, ordering)}{self.position_separator}{instance.pk}'
+
+    def position_filter(self, position, before):
+        """Rows after (or, with before=True, ahead of) a cursor position in self.ordering"""
+        order = self.ordering[0]
+        attr = order.lstrip('-')
+        lookup = 'lt' if before != order.startswith('-') else 'gt'
+        value, separator, pk = position.rpartition(self.position_separator)
+        if not separator:
+            # Cursor issued before positions carried the id: first field only, as DRF does
+            return Q(**{f'{attr}__{lookup}': position})
+        return Q(**{f'{attr}__{lookup}': value}) | Q(**{attr: value, f'pk__{lookup}': int(pk)})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset with the position filter on (first field, id)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self.position_filter(current_position, before=reverse))
+            except (ValueError, TypeError, DjangoValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # One extra row tells whether another page follows
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # A reverse query returns the page back to front
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
@@ -0,0 +1,26 @@
+"""
+orjson-based JSON parser for the API
+Request bodies in UTF-8 (every JSON client) are decoded by orjson; other
+declared charsets go through DRF's JSONParser. Numbers arrive as int/float;
+DecimalField converts floats via their shortest repr, so prices round-trip.
+"""
+
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser, get_encoding
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """Drop-in JSONParser that parses with orjson"""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        if get_encoding(parser_context).lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
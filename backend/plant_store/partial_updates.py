@@ -0,0 +1,57 @@
+"""
+Helpers for PATCH endpoints that write only the columns that changed
+Validated values are compared with the instance, the differing ones are
+assigned and saved with update_fields, and the caller answers with the diff
+instead of the whole re-serialized object.
+"""
+
+
+def assign_changes(instance, values):
+    """
+    Assign the values that differ from the instance's current ones
+
+    Args:
+        instance: model instance to update in place
+        values (dict): validated field values, e.g. a serializer's validated_data
+
+    Returns:
+        list: names of the fields that were changed
+    """
+    changed = []
+    for name, value in values.items():
+        if getattr(instance, name) != value:
+            setattr(instance, name, value)
+            changed.append(name)
+    return changed
+
+
+def save_changes(instance, changed):
+    """
+    Save only the changed columns (plus auto_now timestamps); does nothing when nothing changed
+
+    Returns:
+        bool: whether a write was issued
+    """
+    if not changed:
+        return False
+    # auto_now fields are only refreshed when they are part of update_fields
+    timestamps = [
+        field.name for field in instance._meta.concrete_fields
+        if getattr(field, 'auto_now', False) and field.name not in changed
+    ]
+    instance.save(update_fields=[*changed, *timestamps])
+    return True
+
+
+def represent_changes(serializer, instance, changed):
+    """
+    Render the changed fields the way the serializer would
+
+    Returns:
+        dict: field name -> representation of its new value
+    """
+    diff = {}
+    for name in changed:
+        value = getattr(instance, name)
+        diff[name] = None if value is None else serializer.fields[name].to_representation(value)
+    return diff
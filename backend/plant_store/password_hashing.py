@@ -0,0 +1,128 @@
+"""
+Off-thread password hashing for the async authentication views
+PBKDF2 is the most expensive step of login, registration and password change.
+hashlib releases the GIL while it runs, so a small dedicated thread pool hashes
+in parallel while the event loop keeps serving other requests.
+
+The pool is bounded (PASSWORD_HASH_WORKERS threads, PASSWORD_HASH_MAX_PENDING
+queued or running hashes), and every caller holds a slot per account and per
+client IP for the duration of its hashing, so one attacker cannot monopolize
+the pool: excess attempts are refused with HashingBusy instead of queued.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+class HashingBusy(Exception):
+    """Raised when a hash would exceed the pool or a per-account/per-IP limit"""
+
+    def __init__(self, message, status_code=429, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Allows at most `limit` simultaneous holders of each key"""
+
+    def __init__(self, limit, message):
+        self.limit = limit
+        self.message = message
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    @contextmanager
+    def slot(self, key):
+        with self._lock:
+            if self._counts.get(key, 0) >= self.limit:
+                raise HashingBusy(self.message)
+            self._counts[key] = self._counts.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._counts[key] -= 1
+                if not self._counts[key]:
+                    del self._counts[key]
+
+
+class PasswordHasherPool:
+    """Bounded thread pool for check_password/make_password"""
+
+    def __init__(self, workers, max_pending):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HashingBusy('Authentication service is busy, please retry', status_code=503)
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def check(self, password, encoded):
+        """check_password() without the rehash setter, which would touch the database"""
+        return await self.run(check_password, password, encoded)
+
+    async def make(self, password):
+        return await self.run(make_password, password)
+
+
+_pool = None
+_limiters = None
+_setup_lock = threading.Lock()
+
+
+def get_hasher_pool():
+    """The process-wide hashing pool, created from settings on first use"""
+    global _pool
+    if _pool is None:
+        with _setup_lock:
+            if _pool is None:
+                workers = getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+                max_pending = getattr(settings, 'PASSWORD_HASH_MAX_PENDING', None) or workers * 16
+                _pool = PasswordHasherPool(workers, max_pending)
+    return _pool
+
+
+def _get_limiters():
+    global _limiters
+    if _limiters is None:
+        with _setup_lock:
+            if _limiters is None:
+                _limiters = (
+                    ConcurrencyLimiter(
+                        getattr(settings, 'PASSWORD_HASH_MAX_PER_ACCOUNT', 2),
+                        'Too many simultaneous attempts for this account'
+                    ),
+                    ConcurrencyLimiter(
+                        getattr(settings, 'PASSWORD_HASH_MAX_PER_IP', 8),
+                        'Too many simultaneous attempts from this address'
+                    ),
+                )
+    return _limiters
+
+
+@contextmanager
+def hashing_slots(account=None, ip=None):
+    """Hold an account slot and an IP slot while hashing; raises HashingBusy if either is full"""
+    account_limiter, ip_limiter = _get_limiters()
+    with ExitStack() as stack:
+        if account:
+            stack.enter_context(account_limiter.slot(account.lower()))
+        if ip:
+            stack.enter_context(ip_limiter.slot(ip))
+        yield
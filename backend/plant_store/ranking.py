@@ -0,0 +1,107 @@
+"""
+Hot and top ranking for customer suggestions
+Scores are stored on CustomerSuggestion so the "hot" and "top" feeds are plain
+index range reads. Votes and comments refresh one row with a single UPDATE that
+reads the counters inside the statement; decay_hot_scores() re-ages the recent
+rows periodically because a hot score also drops as time passes without events.
+"""
+
+from datetime import timedelta
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import CustomerSuggestion
+
+
+# hot = (likes - dislikes + COMMENT_WEIGHT * comments) / (age in hours + 2) ** HOT_GRAVITY
+HOT_GRAVITY = 1.5
+COMMENT_WEIGHT = 2
+# Older suggestions drop out of the hot feed and are left at a score of 0
+HOT_WINDOW = timedelta(days=7)
+
+TOP_WINDOWS = {
+    'day': timedelta(days=1),
+    'week': timedelta(days=7),
+    'month': timedelta(days=30),
+    'all': None,
+}
+
+
+def age_divisor(created_at, now=None):
+    """Time-decay denominator of the hot score"""
+    now = now or timezone.now()
+    age_hours = max((now - created_at).total_seconds(), 0) / 3600
+    return (age_hours + 2) ** HOT_GRAVITY
+
+
+def hot_score(likes, dislikes, comment_count, created_at, now=None):
+    """Hot score of one suggestion from its counters"""
+    now = now or timezone.now()
+    if now - created_at > HOT_WINDOW:
+        return 0.0
+    return (likes - dislikes + COMMENT_WEIGHT * comment_count) / age_divisor(created_at, now)
+
+
+def refresh_ranking(suggestion_id, now=None):
+    """
+    Recompute hot and top score of one suggestion after a vote or comment
+
+    The score is evaluated by the database from the counters as committed, so
+    concurrent refreshes cannot write back stale counts.
+
+    Returns:
+        bool: False if the suggestion does not exist
+    """
+    now = now or timezone.now()
+    suggestion = CustomerSuggestion.objects.filter(pk=suggestion_id)
+    created_at = suggestion.values_list('created_at', flat=True).first()
+    if created_at is None:
+        return False
+
+    if now - created_at > HOT_WINDOW:
+        hot = Value(0.0)
+    else:
+        points = F('likes') - F('dislikes') + COMMENT_WEIGHT * F('comment_count')
+        hot = Cast(points, FloatField()) / Value(age_divisor(created_at, now))
+    suggestion.update(top_score=F('likes') - F('dislikes'), hot_score=hot)
+    return True
+
+
+def decay_hot_scores(batch_size=500, now=None):
+    """
+    Re-age hot scores of suggestions inside HOT_WINDOW and zero those that left it
+
+    A vote landing between the read and the write of a batch can be overwritten
+    by a slightly older value; the next event or decay pass corrects it.
+
+    Returns:
+        dict: refreshed (rows re-scored) and expired (rows reset to 0)
+    """
+    now = now or timezone.now()
+    cutoff = now - HOT_WINDOW
+    expired = CustomerSuggestion.objects.filter(created_at__lt=cutoff).exclude(hot_score=0).update(hot_score=0)
+
+    refreshed = 0
+    last_id = 0
+    recent = CustomerSuggestion.objects.filter(created_at__gte=cutoff)
+    while True:
+        rows = list(
+            recent.filter(id__gt=last_id).order_by('id')
+            .values('id', 'likes', 'dislikes', 'created_at', 'comment_count')[:batch_size]
+        )
+        if not rows:
+            break
+        CustomerSuggestion.objects.bulk_update([
+            CustomerSuggestion(
+                id=row['id'],
+                hot_score=hot_score(row['likes'], row['dislikes'], row['comment_count'], row['created_at'], now),
+                top_score=row['likes'] - row['dislikes'],
+            )
+            for row in rows
+        ], ['hot_score', 'top_score'])
+        refreshed += len(rows)
+        last_id = rows[-1]['id']
+
+    return {'refreshed': refreshed, 'expired': expired}
@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import UserProfile, Category, Product, Cart, CartItem, Order, OrderItem, UserAddress, ContactMessage, CustomerSuggestion, Comment
+from .voting import with_pending_votes
+from .sparse_fields import SparseFieldsetMixin
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for UserProfile model"""
 	user = serializers.PrimaryKeyRelatedField(read_only=True)
 	
@@ -13,7 +15,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
 		read_only_fields = ['created_at', 'updated_at']
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for Django User model"""
 	profile = UserProfileSerializer(read_only=True)
 	
@@ -23,7 +25,7 @@ class UserSerializer(serializers.ModelSerializer):
 		read_only_fields = ['id', 'date_joined']
 
 
-class UserAddressSerializer(serializers.ModelSerializer):
+class UserAddressSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for UserAddress model"""
 	user = UserSerializer(read_only=True)
 	
@@ -33,7 +35,7 @@ class UserAddressSerializer(serializers.ModelSerializer):
 		read_only_fields = ['created_at', 'updated_at']
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for Category model"""
 	class Meta:
 		model = Category
@@ -41,7 +43,7 @@ class CategorySerializer(serializers.ModelSerializer):
 		read_only_fields = ['created_at']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for Product model"""
 	category = CategorySerializer(read_only=True)
 	
@@ -51,7 +53,7 @@ class ProductSerializer(serializers.ModelSerializer):
 		read_only_fields = ['created_at', 'updated_at']
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for CartItem model"""
 	product = ProductSerializer(read_only=True)
 	total_price = serializers.SerializerMethodField()
@@ -66,7 +68,7 @@ class CartItemSerializer(serializers.ModelSerializer):
 		read_only_fields = ['added_at', 'total_price']
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for Cart model"""
 	items = CartItemSerializer(many=True, read_only=True)
 	total_price = serializers.ReadOnlyField()
@@ -77,10 +79,9 @@ class CartSerializer(serializers.ModelSerializer):
 		read_only_fields = ['created_at', 'updated_at', 'total_price']
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for OrderItem model"""
 	product = ProductSerializer(read_only=True)
-	product_name = serializers.CharField(source='product.name', read_only=True)
 	product_image = serializers.SerializerMethodField()
 	product_category = serializers.CharField(source='product.category.name', read_only=True)
 	
@@ -95,14 +96,14 @@ class OrderItemSerializer(serializers.ModelSerializer):
 		fields = '__all__'
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	"""Serializer for Order model"""
 	items = OrderItemSerializer(many=True, read_only=True)
 	user = UserSerializer(read_only=True)
 	
 	class Meta:
 		model = Order
-		fields = '__all__'
+		exclude = ['snapshot']
 		read_only_fields = ['order_number', 'created_at', 'updated_at']
 
 
@@ -114,10 +115,6 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 	class Meta:
 		model = User
 		fields = ['username', 'email', 'password']
-	
-	def create(self, validated_data):
-		user = User.objects.create_user(**validated_data)
-		return user
 
 
 class LoginSerializer(serializers.Serializer):
@@ -144,21 +141,70 @@ class ContactMessageSerializer(serializers.ModelSerializer):
 		return value
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	user = UserSerializer(read_only=True)
 	
 	class Meta:
 		model = Comment
-		fields = ['id', 'user', 'content', 'created_at', 'updated_at', 'parent_comment', 'likes', 'dislikes']
-		read_only_fields = ['id', 'created_at', 'updated_at']
+		fields = ['id', 'user', 'content', 'created_at', 'updated_at', 'parent_comment', 'likes', 'dislikes', 'reply_count']
+		read_only_fields = ['id', 'created_at', 'updated_at', 'reply_count']
+	
+	def to_representation(self, instance):
+		return with_pending_votes(super().to_representation(instance), instance)
 
 
-class CustomerSuggestionSerializer(serializers.ModelSerializer):
+class CustomerSuggestionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	user = UserSerializer(read_only=True)
 	comments = CommentSerializer(many=True, read_only=True)
 	
 	class Meta:
 		model = CustomerSuggestion
-		fields = ['id', 'user', 'content', 'created_at', 'updated_at', 'is_public', 'likes', 'dislikes', 'comments']
-		read_only_fields = ['id', 'created_at', 'updated_at']
-
+		fields = ['id', 'user', 'content', 'created_at', 'updated_at', 'is_public', 'likes', 'dislikes', 'comment_count', 'comments']
+		read_only_fields = ['id', 'created_at', 'updated_at', 'comment_count']
+	
+	def to_representation(self, instance):
+		return with_pending_votes(super().to_representation(instance), instance)
+
+
+
+class CommunityFeedSerializer(CustomerSuggestionSerializer):
+	"""
+	Feed entry: a suggestion with its first comments inline and a cursor for the rest
+	
+	When the view puts `my_votes` (see voting.votes_for) in the context, the
+	suggestion and each inline comment also carry the requesting user's `user_vote`.
+	"""
+	comments = serializers.SerializerMethodField()
+	more_comments_after = serializers.SerializerMethodField()
+	
+	class Meta(CustomerSuggestionSerializer.Meta):
+		fields = CustomerSuggestionSerializer.Meta.fields + ['more_comments_after']
+	
+	def to_representation(self, instance):
+		data = super().to_representation(instance)
+		my_votes = self.context.get('my_votes')
+		if my_votes is not None:
+			data['user_vote'] = my_votes.get(('suggestion', instance.id))
+		return data
+	
+	def get_comments(self, obj):
+		# inline_comments is prefetched with one extra row to detect "more"
+		limit = self.context['inline_comments']
+		comments = CommentSerializer(obj.inline_comments[:limit], many=True).data
+		my_votes = self.context.get('my_votes')
+		if my_votes is not None:
+			for comment in comments:
+				comment['user_vote'] = my_votes.get(('comment', comment['id']))
+		return comments
+	
+	def get_more_comments_after(self, obj):
+		"""
+		`after` cursor for the comments page when more exist, else None
+		
+		That is the id of the last inline comment, or 0 (start from the first
+		comment) when ?comments=0 put none inline.
+		"""
+		limit = self.context['inline_comments']
+		if len(obj.inline_comments) > limit:
+			return obj.inline_comments[limit - 1].id if limit else 0
+		return None
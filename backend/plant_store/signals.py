@@ -0,0 +1,97 @@
+"""
+Model signal receivers for plant_store
+"""
+
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .address_book import invalidate_address_book
+from .authentication import invalidate_principal
+from .bootstrap import invalidate_catalog
+from .comment_counts import adjust_comment_counts
+from .live import publish_event, user_payload
+from .models import Category, Comment, CustomerSuggestion, Product, UserAddress, UserProfile
+from .ranking import refresh_ranking
+
+
+def _on_public_suggestion(comment):
+    # The live stream is anonymous: comments on private suggestions must not reach it
+    return CustomerSuggestion.objects.filter(pk=comment.suggestion_id, is_public=True).exists()
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        adjust_comment_counts(instance, 1)
+        if not _on_public_suggestion(instance):
+            return
+        publish_event('comment.created', {
+            'id': instance.id,
+            'suggestion_id': instance.suggestion_id,
+            'parent_comment_id': instance.parent_comment_id,
+            'content': instance.content,
+            'user': user_payload(instance.user),
+            'created_at': instance.created_at,
+        })
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, **kwargs):
+    # Cascaded replies each send their own post_delete, so every comment is subtracted once
+    adjust_comment_counts(instance, -1)
+    # New comments refresh the ranking in CommentCreateView; deletions can come from anywhere (admin, cascades)
+    refresh_ranking(instance.suggestion_id)
+    if _on_public_suggestion(instance):
+        publish_event('comment.deleted', {'id': instance.id, 'suggestion_id': instance.suggestion_id})
+
+
+@receiver(post_save, sender=CustomerSuggestion)
+def announce_new_suggestion(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.is_public:
+        publish_event('suggestion.created', {
+            'id': instance.id,
+            'content': instance.content,
+            'user': user_payload(instance.user),
+            'created_at': instance.created_at,
+        })
+
+
+@receiver(post_delete, sender=CustomerSuggestion)
+def announce_deleted_suggestion(sender, instance, **kwargs):
+    if instance.is_public:
+        publish_event('suggestion.deleted', {'id': instance.id})
+
+
+# Cache versions are bumped once the write commits (see plant_store.cache_versions)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, update_fields=None, **kwargs):
+    # Covers password changes, deactivation and account edits; a login only touches last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(partial(invalidate_principal, instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_principal(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_principal, instance.user_id))
+
+
+@receiver(post_save, sender=UserAddress)
+@receiver(post_delete, sender=UserAddress)
+def invalidate_user_address_book(sender, instance, **kwargs):
+    # Also covers the other addresses whose is_default UserAddress.save() clears
+    transaction.on_commit(partial(invalidate_address_book, instance.user_id))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_bootstrap_catalog(sender, **kwargs):
+    transaction.on_commit(invalidate_catalog)
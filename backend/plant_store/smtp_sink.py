@@ -0,0 +1,107 @@
+"""
+Local SMTP sink for offline e-mail testing and benchmarks
+
+A small threaded SMTP server that accepts every message and only counts it.
+It speaks just enough SMTP for smtplib and Django's SMTP backend (no TLS or
+AUTH), so point EMAIL_HOST/EMAIL_PORT at it with EMAIL_USE_TLS = False and an
+empty EMAIL_HOST_USER.
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """One SMTP session: greeting, commands, DATA bodies until QUIT"""
+
+    def handle(self):
+        server = self.server
+        server.record_connection()
+        if server.handshake_delay:
+            # Stand-in for the TCP/TLS/greeting cost of a real remote server
+            time.sleep(server.handshake_delay)
+        self.reply('220 plantify-sink ESMTP ready')
+
+        mail_from, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command = line.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = command.split(' ', 1)[0].upper()
+
+            if verb == 'EHLO':
+                self.reply('250-plantify-sink', '250-8BITMIME', '250 SMTPUTF8')
+            elif verb == 'HELO':
+                self.reply('250 plantify-sink')
+            elif verb == 'MAIL':
+                mail_from, recipients = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command[8:].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(data_line)
+                server.record_message(mail_from, recipients, size)
+                self.reply('250 OK: queued')
+            elif verb in ('RSET', 'NOOP'):
+                mail_from, recipients = None, []
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+
+    def reply(self, *lines):
+        self.wfile.write(''.join(f'{line}\r\n' for line in lines).encode('utf-8'))
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Threaded SMTP server that discards messages and keeps counters
+
+    Args:
+        address (tuple): (host, port); port 0 picks a free port
+        handshake_delay (float): Seconds to wait before the greeting of each connection
+        on_message (callable): Optional callback(mail_from, recipients, size)
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 1025), handshake_delay=0.0, on_message=None):
+        super().__init__(address, _SMTPSinkHandler)
+        self.handshake_delay = handshake_delay
+        self.on_message = on_message
+        self.message_count = 0
+        self.connection_count = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record_connection(self):
+        with self._lock:
+            self.connection_count += 1
+
+    def record_message(self, mail_from, recipients, size):
+        with self._lock:
+            self.message_count += 1
+            self.bytes_received += size
+        if self.on_message is not None:
+            self.on_message(mail_from, recipients, size)
+
+    def start_in_thread(self):
+        """Serve from a daemon thread; call shutdown() and server_close() when done"""
+        thread = threading.Thread(target=self.serve_forever, name='smtp-sink', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,195 @@
+"""
+Sparse fieldsets and depth control for the API serializers
+
+Two query parameters shape a response:
+
+  * ?fields=id,name,category.name   only these fields; dotted names select
+                                    fields of a nested object
+  * ?expand=category,items.product  nested objects rendered in full; any other
+                                    nested to-one object is reduced to its id
+                                    and nested lists are left out
+
+Without ?expand= nesting is unchanged, so existing clients see the same
+payloads. The requested shape also drives the queryset: sparse_queryset()
+walks the fields that will actually be rendered and adds the select_related /
+prefetch_related lookups they need, and nothing for the skipped ones.
+"""
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def parse_paths(value):
+    """
+    Turn "a,b.c,b.d" into the tree {'a': {}, 'b': {'c': {}, 'd': {}}}
+
+    Returns:
+        dict or None: None when the parameter was not given
+    """
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in filter(None, path.strip().split('.')):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def sparse_fieldset(request):
+    """The fieldset requested by ?fields= and ?expand=, or None when neither was given"""
+    fields = parse_paths(request.query_params.get('fields'))
+    expand = parse_paths(request.query_params.get('expand'))
+    if fields is None and expand is None:
+        return None
+    return {'fields': fields, 'expand': expand}
+
+
+def _nested(field):
+    """The serializer rendered by a field, or None for plain fields"""
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that applies a sparse fieldset
+
+    The top-level serializer reads it from context['sparse_fieldset'] (see
+    sparse_fieldset); nested serializers that use the mixin receive their part
+    of it from their parent.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = getattr(self, '_sparse_fieldset', None)
+        if fieldset is None and self._is_top_level():
+            fieldset = self.context.get('sparse_fieldset')
+        if fieldset is None:
+            return fields
+        return self._apply_fieldset(fields, fieldset['fields'], fieldset['expand'])
+
+    def _is_top_level(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def _apply_fieldset(self, fields, only, expand):
+        if only is not None:
+            unknown = set(only) - set(fields)
+            if unknown:
+                raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+            fields = {name: field for name, field in fields.items() if name in only}
+
+        if expand is not None:
+            unknown = {name for name in expand if name not in fields or _nested(fields[name]) is None}
+            if unknown:
+                raise ValidationError({'expand': f"Not expandable: {', '.join(sorted(unknown))}"})
+
+        shaped = {}
+        for name, field in fields.items():
+            nested = _nested(field)
+            if nested is None:
+                shaped[name] = field
+                continue
+
+            sub_fields = (only or {}).get(name) or None
+            if expand is not None and name not in expand and sub_fields is None:
+                collapsed = self._collapse(name, field)
+                if collapsed is not None:
+                    shaped[name] = collapsed
+                continue
+
+            if isinstance(nested, SparseFieldsetMixin):
+                nested._sparse_fieldset = {
+                    'fields': sub_fields,
+                    'expand': None if expand is None else expand.get(name, {}),
+                }
+            shaped[name] = field
+        return shaped
+
+    def _collapse(self, name, field):
+        """An unexpanded to-one object becomes its id, read from the row itself; lists are left out"""
+        if isinstance(field, serializers.ListSerializer):
+            return None
+        source = field.source or name
+        model = getattr(getattr(self, 'Meta', None), 'model', None)
+        try:
+            model_field = model._meta.get_field(source)
+        except Exception:
+            return None
+        if not (model_field.is_relation and model_field.concrete):
+            return None  # reverse one-to-one: no column to read the id from
+        return serializers.ReadOnlyField(source=model_field.attname)
+
+
+def _relation_lookups(model, attrs):
+    """
+    Follow source attributes through model relations
+
+    Returns:
+        tuple: (the relation names followed, whether any of them is to-many, the model reached)
+    """
+    path, many = [], False
+    for attr in attrs:
+        try:
+            model_field = model._meta.get_field(attr)
+        except Exception:
+            break
+        if not model_field.is_relation or getattr(model_field, 'attname', None) == attr != model_field.name:
+            break
+        path.append(attr)
+        many = many or model_field.one_to_many or model_field.many_to_many
+        model = model_field.related_model
+    return path, many, model
+
+
+def _collect_lookups(serializer, model, prefix, in_prefetch, select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        nested = _nested(field)
+        relational = nested is not None or isinstance(field, serializers.ManyRelatedField)
+        # A plain field only needs the relations in front of its last attribute
+        attrs = field.source_attrs if relational else field.source_attrs[:-1]
+        path, many, related_model = _relation_lookups(model, attrs)
+        if not path:
+            continue
+        lookup = prefix + '__'.join(path)
+        (prefetch if in_prefetch or many else select).add(lookup)
+        if nested is not None and isinstance(nested, serializers.ModelSerializer):
+            _collect_lookups(nested, related_model, lookup + '__', in_prefetch or many, select, prefetch)
+
+
+def sparse_queryset(queryset, serializer):
+    """
+    Add the select_related/prefetch_related lookups the serializer's rendered fields need
+
+    Args:
+        queryset: queryset of the serializer's model
+        serializer: serializer instance carrying the request context (many=True is fine)
+
+    Raises:
+        ValidationError: ?fields= or ?expand= names an unknown field
+    """
+    select, prefetch = set(), set()
+    _collect_lookups(_nested(serializer) or serializer, queryset.model, '', False, select, prefetch)
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*sorted(prefetch))
+    return queryset
+
+
+class SparseFieldsetViewMixin:
+    """Generic view mixin: passes ?fields=/?expand= to the serializer and shapes the queryset to match"""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fieldset'] = sparse_fieldset(self.request)
+        return context
+
+    def filter_queryset(self, queryset):
+        return sparse_queryset(super().filter_queryset(queryset), self.get_serializer())
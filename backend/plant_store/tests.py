@@ -1,3 +1,1433 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from contextlib import redirect_stdout
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Cart, CartItem, Category, ContactMessage, NewsletterCampaign, Order, OrderItem, OutboxEmail, Product, UserAddress, UserProfile, CustomerSuggestion, Comment, UserVote
+from . import live
+from .address_book import set_default_address
+from .authentication import SessionModeAuthentication, principal_version
+from .comment_counts import repair_comment_counts
+from .email_service import drain_outbox
+from .pagination import SuggestionFeedPagination
+from .parsers import ORJSONParser
+from .password_hashing import hashing_slots
+from .ranking import decay_hot_scores
+from .renderers import ORJSONRenderer
+from .throttling import ContactFormThrottle
+from .voting import cast_vote, vote_buffer
+
+
+def make_user(username):
+    user = User.objects.create(username=username, email=f'{username}@example.com')
+    UserProfile.objects.create(user=user)
+    return user
+
+
+class CommunityFeedTests(TestCase):
+    """Cursor-paginated feed with capped inline comments"""
+
+    @classmethod
+    def setUpTestData(cls):
+        authors = [make_user(f'author{index}') for index in range(6)]
+        cls.suggestions = []
+        for index in range(5):
+            suggestion = CustomerSuggestion.objects.create(user=authors[index], content=f'Suggestion {index}')
+            for comment_index in range(5):
+                Comment.objects.create(
+                    suggestion=suggestion,
+                    user=authors[(index + comment_index) % len(authors)],
+                    content=f'Comment {comment_index}'
+                )
+            cls.suggestions.append(suggestion)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('plant_store:suggestions_feed')
+
+    def test_query_budget_is_constant(self):
+        # One query for suggestions (+ authors and profiles), one for all inline comments
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'comments': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 5)
+
+        for index in range(5, 15):
+            CustomerSuggestion.objects.create(user=self.suggestions[0].user, content=f'Extra {index}')
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'comments': 2})
+
+    def test_inline_comments_are_capped_with_more_cursor(self):
+        response = self.client.get(self.url, {'comments': 2})
+        entry = response.data['results'][0]
+        self.assertEqual(len(entry['comments']), 2)
+        self.assertEqual(entry['more_comments_after'], entry['comments'][-1]['id'])
+
+        more = self.client.get(
+            reverse('plant_store:suggestion_comments_page', args=[entry['id']]),
+            {'after': entry['more_comments_after'], 'limit': 10}
+        )
+        self.assertEqual(len(more.data['results']), 3)
+        self.assertIsNone(more.data['next_after'])
+
+    def test_no_inline_comments_cursor_starts_at_the_first_comment(self):
+        entry = self.client.get(self.url, {'comments': 0}).data['results'][0]
+        self.assertEqual(entry['comments'], [])
+        self.assertEqual(entry['more_comments_after'], 0)
+
+        more = self.client.get(
+            reverse('plant_store:suggestion_comments_page', args=[entry['id']]),
+            {'after': entry['more_comments_after'], 'limit': 10}
+        )
+        self.assertEqual([comment['content'] for comment in more.data['results']], [f'Comment {index}' for index in range(5)])
+
+        bare = CustomerSuggestion.objects.create(user=self.suggestions[0].user, content='No comments yet')
+        entry = self.client.get(self.url, {'comments': 0}).data['results'][0]
+        self.assertEqual((entry['id'], entry['more_comments_after']), (bare.id, None))
+
+    def test_cursor_walks_every_suggestion_once(self):
+        seen = []
+        response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            seen.extend(entry['id'] for entry in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, [suggestion.id for suggestion in reversed(self.suggestions)])
+
+
+class CommentTreeTests(TestCase):
+    """Threaded comment endpoint built from a single query"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('threader')
+        cls.suggestion = CustomerSuggestion.objects.create(user=cls.user, content='Thread me')
+        cls.root = Comment.objects.create(suggestion=cls.suggestion, user=cls.user, content='root')
+        cls.reply = Comment.objects.create(suggestion=cls.suggestion, user=cls.user, content='reply', parent_comment=cls.root)
+        cls.deep = Comment.objects.create(suggestion=cls.suggestion, user=cls.user, content='deep', parent_comment=cls.reply)
+        cls.second_root = Comment.objects.create(suggestion=cls.suggestion, user=cls.user, content='second root')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('plant_store:suggestion_comment_tree', args=[self.suggestion.id])
+
+    def test_tree_loads_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        roots = response.data['results']
+        self.assertEqual([node['id'] for node in roots], [self.root.id, self.second_root.id])
+        self.assertEqual(roots[0]['replies'][0]['id'], self.reply.id)
+        self.assertEqual(roots[0]['replies'][0]['replies'][0]['id'], self.deep.id)
+
+    def test_depth_and_level_pagination(self):
+        response = self.client.get(self.url, {'depth': 1, 'limit': 1})
+        root = response.data['results'][0]
+        self.assertEqual(root['replies'], [])
+        self.assertEqual(root['reply_count'], 1)
+        self.assertEqual(root['more_replies_after'], 0)
+        self.assertEqual(response.data['next_after'], self.root.id)
+
+        response = self.client.get(self.url, {'parent': self.root.id, 'after': 0})
+        self.assertEqual(response.data['results'][0]['id'], self.reply.id)
+
+        response = self.client.get(self.url, {'after': self.root.id})
+        self.assertEqual([node['id'] for node in response.data['results']], [self.second_root.id])
+
+
+def run_in_parallel(calls):
+    """Start every call on its own thread at the same moment and wait for all of them"""
+    barrier = threading.Barrier(len(calls))
+    errors = []
+
+    def run(call):
+        try:
+            barrier.wait()
+            call()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=run, args=(call,)) for call in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class ParallelVotingTests(TransactionTestCase):
+    """Concurrent votes must leave counters equal to the recorded UserVote rows"""
+
+    def setUp(self):
+        self.users = [make_user(f'voter{index}') for index in range(12)]
+        self.suggestion = CustomerSuggestion.objects.create(user=self.users[0], content='Vote on me')
+        self.comment = Comment.objects.create(suggestion=self.suggestion, user=self.users[0], content='And me')
+
+    def assert_counts_match_votes(self, obj, likes, dislikes):
+        obj.refresh_from_db()
+        self.assertEqual((obj.likes, obj.dislikes), (likes, dislikes))
+        votes = UserVote.objects.filter(object_id=obj.id, content_type__model=obj._meta.model_name)
+        self.assertEqual(votes.filter(vote_type='like').count(), likes)
+        self.assertEqual(votes.filter(vote_type='dislike').count(), dislikes)
+
+    def test_parallel_likes_are_all_counted(self):
+        suggestions = CustomerSuggestion.objects.filter(is_public=True)
+        errors = run_in_parallel([
+            lambda user=user: cast_vote(suggestions, self.suggestion.id, user, 'like')
+            for user in self.users
+        ])
+        self.assertEqual(errors, [])
+        self.assert_counts_match_votes(self.suggestion, 12, 0)
+
+    def test_parallel_mixed_votes_stay_exact(self):
+        comments = Comment.objects.all()
+        for user in self.users[:6]:
+            cast_vote(comments, self.comment.id, user, 'like')
+
+        calls = []
+        for user in self.users[:3]:
+            calls.append(lambda user=user: cast_vote(comments, self.comment.id, user, 'like'))  # toggle off
+        for user in self.users[3:6]:
+            calls.append(lambda user=user: cast_vote(comments, self.comment.id, user, 'dislike'))  # switch
+        for user in self.users[6:]:
+            calls.append(lambda user=user: cast_vote(comments, self.comment.id, user, 'dislike'))  # new
+        self.assertEqual(run_in_parallel(calls), [])
+        self.assert_counts_match_votes(self.comment, 0, 9)
+
+    def test_duplicate_request_from_one_user_applies_once(self):
+        suggestions = CustomerSuggestion.objects.filter(is_public=True)
+        user = self.users[1]
+        errors = run_in_parallel([
+            lambda: cast_vote(suggestions, self.suggestion.id, user, 'dislike')
+            for _ in range(4)
+        ])
+        self.assertEqual(errors, [])
+        # Four toggles by the same user end with no vote, and the counter agrees
+        self.assert_counts_match_votes(self.suggestion, 0, 0)
+
+
+class MyVotesTests(TestCase):
+    """Batch lookup of the caller's votes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('page_viewer')
+        cls.suggestions = [CustomerSuggestion.objects.create(user=cls.user, content=f'S{index}') for index in range(3)]
+        cls.comment = Comment.objects.create(suggestion=cls.suggestions[0], user=cls.user, content='C')
+        cast_vote(CustomerSuggestion.objects.all(), cls.suggestions[1].id, cls.user, 'like')
+        cast_vote(Comment.objects.all(), cls.comment.id, cls.user, 'dislike')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_one_query_for_a_page_of_ids(self):
+        ids = ','.join(str(suggestion.id) for suggestion in self.suggestions)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('plant_store:my_votes'), {'suggestions': ids, 'comments': self.comment.id})
+        self.assertEqual(response.data, {
+            'suggestions': {str(self.suggestions[1].id): 'like'},
+            'comments': {str(self.comment.id): 'dislike'},
+        })
+
+    def test_feed_includes_user_vote_on_request(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('plant_store:suggestions_feed'), {'include': 'my_votes'})
+        by_id = {entry['id']: entry for entry in response.data['results']}
+        self.assertEqual(by_id[self.suggestions[1].id]['user_vote'], 'like')
+        self.assertIsNone(by_id[self.suggestions[2].id]['user_vote'])
+        self.assertEqual(by_id[self.suggestions[0].id]['comments'][0]['user_vote'], 'dislike')
+
+
+class SuggestionRankingTests(TestCase):
+    """Stored hot/top scores drive the ranked feeds"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.voters = [make_user(f'ranker{index}') for index in range(3)]
+        cls.fresh = CustomerSuggestion.objects.create(user=cls.voters[0], content='Fresh')
+        cls.older = CustomerSuggestion.objects.create(user=cls.voters[0], content='Older')
+        cls.stale = CustomerSuggestion.objects.create(user=cls.voters[0], content='Stale')
+        now = timezone.now()
+        CustomerSuggestion.objects.filter(pk=cls.older.pk).update(created_at=now - timedelta(days=2))
+        CustomerSuggestion.objects.filter(pk=cls.stale.pk).update(created_at=now - timedelta(days=20))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('plant_store:suggestions_feed')
+
+    def vote(self, suggestion, users, action='like'):
+        for user in users:
+            self.client.force_authenticate(user)
+            self.client.post(reverse('plant_store:suggestion_like_dislike', args=[suggestion.id]), {'action': action})
+        self.client.force_authenticate(None)
+
+    def feed_ids(self, **params):
+        return [entry['id'] for entry in self.client.get(self.url, params).data['results']]
+
+    def test_votes_and_comments_update_scores(self):
+        self.vote(self.older, self.voters)
+        self.vote(self.fresh, self.voters[:1])
+        self.older.refresh_from_db()
+        self.fresh.refresh_from_db()
+        self.assertEqual(self.older.top_score, 3)
+        self.assertGreater(self.fresh.hot_score, self.older.hot_score)  # age outweighs two extra likes
+
+        self.client.force_authenticate(self.voters[1])
+        self.client.post(reverse('plant_store:comment_create', args=[self.fresh.id]), {'content': 'Great idea'})
+        hot_before = self.fresh.hot_score
+        self.fresh.refresh_from_db()
+        self.assertGreater(self.fresh.hot_score, hot_before)
+
+        Comment.objects.filter(suggestion=self.fresh).delete()
+        self.fresh.refresh_from_db()
+        self.assertAlmostEqual(self.fresh.hot_score, hot_before, places=4)  # only the age moved on
+
+    @mock.patch.object(SuggestionFeedPagination, 'offset_cutoff', 2)
+    def test_tied_scores_page_by_id(self):
+        # Unvoted suggestions all score 0; stepping over ties by offset breaks past offset_cutoff
+        extra = [CustomerSuggestion.objects.create(user=self.voters[1], content=f'Tie {index}') for index in range(6)]
+        expected = sorted([self.fresh.id, self.older.id] + [suggestion.id for suggestion in extra], reverse=True)
+        for sort in ('hot', 'top'):
+            pages = [self.client.get(self.url, {'sort': sort, 'page_size': 3})]
+            while pages[-1].data['next'] and len(pages) < 5:  # bounded: a broken cursor repeats pages
+                pages.append(self.client.get(pages[-1].data['next']))
+            seen = [entry['id'] for page in pages for entry in page.data['results']]
+            self.assertEqual(seen, expected)
+
+            back = self.client.get(pages[1].data['previous'])
+            self.assertEqual([entry['id'] for entry in back.data['results']], expected[:3])
+
+        bad_position = base64.b64encode(b'p=not-a-score|1').decode()
+        self.assertEqual(self.client.get(self.url, {'sort': 'hot', 'cursor': bad_position}).status_code, 404)
+
+    def test_hot_and_top_feeds(self):
+        self.vote(self.stale, self.voters)
+        self.vote(self.older, self.voters[:2])
+        self.vote(self.fresh, self.voters[:1], 'dislike')
+
+        self.assertEqual(self.feed_ids(sort='hot'), [self.older.id, self.fresh.id])
+        self.assertEqual(self.feed_ids(sort='top'), [self.older.id, self.fresh.id])
+        self.assertEqual(self.feed_ids(sort='top', window='all'), [self.stale.id, self.older.id, self.fresh.id])
+        self.assertEqual(self.client.get(self.url, {'sort': 'best'}).status_code, 400)
+
+    def test_decay_reages_recent_and_expires_old(self):
+        self.vote(self.fresh, self.voters)
+        CustomerSuggestion.objects.filter(pk=self.stale.pk).update(hot_score=5)
+        self.fresh.refresh_from_db()
+
+        stats = decay_hot_scores(now=timezone.now() + timedelta(hours=12))
+        self.assertEqual(stats, {'refreshed': 2, 'expired': 1})
+        hot_before = self.fresh.hot_score
+        self.fresh.refresh_from_db()
+        self.stale.refresh_from_db()
+        self.assertLess(self.fresh.hot_score, hot_before)
+        self.assertEqual(self.stale.hot_score, 0)
+
+
+class CommentCountTests(TestCase):
+    """Denormalized comment_count and reply_count"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('counter')
+        cls.suggestion = CustomerSuggestion.objects.create(user=cls.user, content='Count my comments')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_and_delete_keep_counts(self):
+        root_id = self.client.post(reverse('plant_store:comment_create', args=[self.suggestion.id]), {'content': 'root'}).data['id']
+        reply_id = self.client.post(reverse('plant_store:comment_reply', args=[root_id]), {'content': 'reply'}).data['id']
+        self.client.post(reverse('plant_store:comment_reply', args=[reply_id]), {'content': 'deeper'})
+        self.suggestion.refresh_from_db()
+        self.assertEqual(self.suggestion.comment_count, 3)
+        self.assertEqual(Comment.objects.get(pk=root_id).reply_count, 1)
+
+        # Deleting the root cascades to both replies
+        Comment.objects.get(pk=root_id).delete()
+        self.suggestion.refresh_from_db()
+        self.assertEqual(self.suggestion.comment_count, 0)
+
+    def test_feed_shows_count_without_loading_comments(self):
+        for index in range(4):
+            Comment.objects.create(suggestion=self.suggestion, user=self.user, content=f'C{index}')
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('plant_store:suggestions_feed'), {'comments': 1})
+        self.assertEqual(response.data['results'][0]['comment_count'], 4)
+
+    def test_repair_fixes_drifted_counters(self):
+        root = Comment.objects.create(suggestion=self.suggestion, user=self.user, content='root')
+        Comment.objects.bulk_create([
+            Comment(suggestion=self.suggestion, user=self.user, content='bulk', parent_comment=root)
+        ])  # bulk_create skips the signals
+        self.assertEqual(repair_comment_counts(), {'suggestions': 1, 'comments': 1})
+        self.suggestion.refresh_from_db()
+        root.refresh_from_db()
+        self.assertEqual((self.suggestion.comment_count, root.reply_count), (2, 1))
+
+
+class LiveEventTests(TestCase):
+    """Delta events published on writes and streamed over SSE"""
+
+    def setUp(self):
+        self.backend = live.InMemoryBackend(history_size=3)
+        live._backend = self.backend
+        self.user = make_user('streamer')
+        self.url = reverse('plant_store:suggestion_events')
+
+    def tearDown(self):
+        live._backend = None
+
+    def published(self):
+        return [(event['type'], event['data']) for event in self.backend._history]
+
+    def test_writes_publish_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            suggestion = CustomerSuggestion.objects.create(user=self.user, content='Live!')
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(suggestion=suggestion, user=self.user, content='First')
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_vote(CustomerSuggestion.objects.all(), suggestion.id, self.user, 'like')
+
+        events = self.published()
+        self.assertEqual([event_type for event_type, _ in events], ['suggestion.created', 'comment.created', 'vote'])
+        self.assertEqual(events[1][1]['suggestion_id'], suggestion.id)
+        self.assertEqual(events[2][1], {'kind': 'suggestion', 'id': suggestion.id, 'likes': 1, 'dislikes': 0})
+        self.assertEqual(comment.id, events[1][1]['id'])
+
+    def test_private_suggestion_activity_is_not_streamed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            suggestion = CustomerSuggestion.objects.create(user=self.user, content='Just for staff', is_public=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(suggestion=suggestion, user=self.user, content='Secret reply')
+        with self.captureOnCommitCallbacks(execute=True):
+            cast_vote(Comment.objects.all(), comment.id, self.user, 'like')
+        with self.captureOnCommitCallbacks(execute=True):
+            result = cast_vote(CustomerSuggestion.objects.all(), suggestion.id, self.user, 'like')
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            suggestion.delete()
+
+        self.assertEqual(self.published(), [])
+        self.assertEqual(result, {'message': 'Liked successfully', 'likes': 1, 'dislikes': 0, 'user_vote': 'like'})
+
+    async def test_stream_pushes_events_and_replays_missed_ones(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = response.streaming_content
+        self.assertEqual(await anext(frames), b'retry: 3000\n\n')
+
+        self.backend.publish('vote', {'kind': 'comment', 'id': 7, 'likes': 2, 'dislikes': 0})
+        self.assertEqual(
+            await anext(frames),
+            b'id: 1\nevent: vote\ndata: {"kind":"comment","id":7,"likes":2,"dislikes":0}\n\n'
+        )
+        await frames.aclose()
+
+        for index in range(3):
+            self.backend.publish('comment.deleted', {'id': index, 'suggestion_id': 1})
+        # Event 2 is still in the history: replay 3 and 4 only
+        response = await self.async_client.get(self.url, headers={'Last-Event-ID': '2'})
+        frames = response.streaming_content
+        await anext(frames)
+        self.assertTrue((await anext(frames)).startswith(b'id: 3\n'))
+        self.assertTrue((await anext(frames)).startswith(b'id: 4\n'))
+        await frames.aclose()
+
+        # Event 1 fell out of the history: the client must reload
+        response = await self.async_client.get(self.url, headers={'Last-Event-ID': '0'})
+        frames = response.streaming_content
+        await anext(frames)
+        self.assertEqual(await anext(frames), b'event: reset\ndata: {}\n\n')
+        await frames.aclose()
+
+    def test_wsgi_requests_are_refused(self):
+        self.assertEqual(self.client.get(self.url).status_code, 501)
+
+
+@override_settings(VOTE_COUNTER_BUFFER_MS=60000)
+class BufferedVotingTests(TransactionTestCase):
+    """Buffered mode: votes recorded at once, counters written in one UPDATE per flush"""
+
+    def setUp(self):
+        self.users = [make_user(f'burst{index}') for index in range(8)]
+        self.suggestion = CustomerSuggestion.objects.create(user=self.users[0], content='Going viral')
+
+    def tearDown(self):
+        vote_buffer.flush()
+
+    def test_burst_is_merged_for_readers_and_flushed_once(self):
+        suggestions = CustomerSuggestion.objects.filter(is_public=True)
+        errors = run_in_parallel([
+            lambda user=user: cast_vote(suggestions, self.suggestion.id, user, 'like')
+            for user in self.users
+        ])
+        self.assertEqual(errors, [])
+        cast_vote(suggestions, self.suggestion.id, self.users[0], 'dislike')  # switch one vote
+
+        self.suggestion.refresh_from_db()
+        self.assertEqual((self.suggestion.likes, self.suggestion.dislikes), (0, 0))
+        entry = APIClient().get(reverse('plant_store:suggestions_feed')).data['results'][0]
+        self.assertEqual((entry['likes'], entry['dislikes']), (7, 1))
+
+        with self.assertNumQueries(3):  # BEGIN, one UPDATE for the whole burst, COMMIT
+            self.assertEqual(vote_buffer.flush(), 1)
+        self.suggestion.refresh_from_db()
+        self.assertEqual((self.suggestion.likes, self.suggestion.dislikes, self.suggestion.top_score), (7, 1, 6))
+        self.assertEqual(UserVote.objects.filter(object_id=self.suggestion.id).count(), 8)
+
+    @override_settings(VOTE_COUNTER_BUFFER_MS=20)
+    def test_timer_flushes_in_background(self):
+        result = cast_vote(CustomerSuggestion.objects.all(), self.suggestion.id, self.users[1], 'like')
+        self.assertEqual(result['likes'], 1)
+        deadline = time.monotonic() + 2
+        while vote_buffer and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.suggestion.refresh_from_db()
+        self.assertEqual(self.suggestion.likes, 1)
+
+    @override_settings(VOTE_COUNTER_BUFFER_MS=60000)
+    def test_failed_flush_keeps_the_deltas_and_schedules_a_retry(self):
+        cast_vote(CustomerSuggestion.objects.all(), self.suggestion.id, self.users[1], 'like')
+        with mock.patch('plant_store.voting.Greatest', side_effect=DatabaseError('disk I/O error')):
+            with self.assertLogs('plant_store.voting', 'ERROR'):
+                vote_buffer._flush_in_background()
+        self.assertEqual(vote_buffer.pending(CustomerSuggestion, self.suggestion.id)['likes'], 1)
+        self.assertIsNotNone(vote_buffer._timer)
+
+        self.assertEqual(vote_buffer.flush(), 1)
+        self.assertEqual(vote_buffer.pending(CustomerSuggestion, self.suggestion.id), {})
+        self.suggestion.refresh_from_db()
+        self.assertEqual(self.suggestion.likes, 1)
+
+
+class CachedPrincipalTests(TestCase):
+    """JWT requests resolve the user from the cache until it changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('cached')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = reverse('plant_store:my_votes')  # no ids: the view itself runs no query
+        ContentType.objects.get_for_models(CustomerSuggestion, Comment)  # warm the per-process cache
+
+    def assert_user_queries(self, count):
+        with self.assertNumQueries(count):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_second_request_skips_user_lookup(self):
+        self.assert_user_queries(1)
+        self.assert_user_queries(0)
+
+    def test_password_and_profile_changes_invalidate(self):
+        self.assert_user_queries(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('a-new-password')
+            self.user.save()
+        self.assert_user_queries(1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.phone = '9999999999'
+            self.user.profile.save()
+        self.assert_user_queries(1)
+        self.assert_user_queries(0)
+
+    def test_deactivated_user_is_rejected_at_once(self):
+        self.assert_user_queries(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.user.pk).save(update_fields=['last_login'])
+        self.assert_user_queries(0)  # a login does not evict the principal
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_invalidation_waits_for_the_commit(self):
+        self.assert_user_queries(1)
+        version = principal_version(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.is_active = False
+            self.user.save()
+        # Until the write commits, readers stay on the old version (and the old row)
+        self.assertEqual(principal_version(self.user.pk), version)
+        self.assert_user_queries(0)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertNotEqual(principal_version(self.user.pk), version)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_profile_writes_do_not_restore_stale_cached_columns(self):
+        self.user.set_password('old-password')
+        self.user.save()
+        writes = [
+            (self.client.put, reverse('plant_store:profile_update'), {'first_name': 'Cached'}),
+            (self.client.post, reverse('plant_store:profile_change_password'),
+             {'current_password': 'old-password', 'new_password': 'new-password'}),
+        ]
+        for send, url, payload in writes:
+            self.assert_user_queries(1)
+            # Written where this process's cache is not invalidated (e.g. by another worker)
+            User.objects.filter(pk=self.user.pk).update(is_staff=True, email='moved@example.com')
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(send(url, payload, format='json').status_code, 200)
+            user = User.objects.get(pk=self.user.pk)
+            self.assertEqual((user.email, user.is_staff), ('moved@example.com', True))
+            User.objects.filter(pk=self.user.pk).update(is_staff=False, email=self.user.email)
+
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.first_name, 'Cached')
+        self.assertTrue(user.check_password('new-password'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncAuthTests(TestCase):
+    """Async register/login/change-password with off-thread hashing"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('gardener')
+        self.user.set_password('old-secret')
+        self.user.save()
+
+    async def login(self, password, username='gardener'):
+        return await self.async_client.post(
+            reverse('plant_store:user_login_async'),
+            {'username': username, 'password': password},
+            content_type='application/json'
+        )
+
+    async def test_login_matches_sync_view(self):
+        response = await self.login('old-secret')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['user']['username'], 'gardener')
+        self.assertIn('access_token', body)
+
+        self.assertEqual((await self.login('wrong')).status_code, 401)
+        self.assertEqual((await self.login('old-secret', username='nobody')).status_code, 401)
+
+    async def test_register_then_change_password(self):
+        response = await self.async_client.post(
+            reverse('plant_store:user_register_async'),
+            {'username': 'sprout', 'email': 'sprout@example.com', 'password': 'first-pass'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        user = await User.objects.select_related('profile').aget(username='sprout')
+        self.assertTrue(user.check_password('first-pass'))
+        self.assertTrue(await user.carts.aexists())
+
+        token = RefreshToken.for_user(user).access_token
+        url = reverse('plant_store:profile_change_password_async')
+        headers = {'Authorization': f'Bearer {token}'}
+        response = await self.async_client.post(
+            url, {'current_password': 'nope', 'new_password': 'x'}, content_type='application/json', headers=headers
+        )
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.post(
+            url, {'current_password': 'first-pass', 'new_password': 'second-pass'},
+            content_type='application/json', headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        await user.arefresh_from_db()
+        self.assertTrue(user.check_password('second-pass'))
+
+    async def test_concurrent_attempts_per_account_are_limited(self):
+        with hashing_slots(account='gardener'), hashing_slots(account='GARDENER'):
+            response = await self.login('old-secret')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual((await self.login('old-secret')).status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AuthModeTests(TestCase):
+    """Stateless JWT mode keeps API requests away from django_session"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('stateless')
+        self.user.set_password('secret-pass')
+        self.user.save()
+
+    def login(self):
+        return self.client.post(
+            reverse('plant_store:user_login'), {'username': 'stateless', 'password': 'secret-pass'},
+            content_type='application/json'
+        )
+
+    def test_session_mode_keeps_session_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('sessionid', response.cookies)
+        self.assertEqual(Session.objects.count(), 1)
+
+    @override_settings(API_AUTH_MODE='jwt')
+    def test_jwt_mode_writes_no_session(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertEqual(Session.objects.count(), 0)
+
+        # Unsafe API calls need no CSRF token, and still no session is stored
+        client = APIClient(enforce_csrf_checks=True)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access_token']}")
+        suggestion = CustomerSuggestion.objects.create(user=self.user, content='No cookies here')
+        response = client.post(reverse('plant_store:suggestion_like_dislike', args=[suggestion.id]), {'action': 'like'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Session.objects.count(), 0)
+
+    @override_settings(API_AUTH_MODE='jwt')
+    def test_jwt_mode_still_records_the_login(self):
+        logged_in = mock.Mock()
+        user_logged_in.connect(logged_in)
+        self.addCleanup(user_logged_in.disconnect, logged_in)
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        self.assertEqual(logged_in.call_count, 1)
+
+        last_login = self.user.last_login
+        response = self.client.post(
+            reverse('plant_store:user_login_async'), {'username': 'stateless', 'password': 'secret-pass'},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.last_login, last_login)
+        self.assertEqual(logged_in.call_count, 2)
+
+    @override_settings(API_AUTH_MODE='jwt')
+    def test_admin_keeps_sessions_and_csrf(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        response = client.post('/admin/login/', {'username': 'stateless', 'password': 'secret-pass'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_session_authentication_follows_the_mode_at_runtime(self):
+        request = Request(APIRequestFactory().get('/plant_store/api/profile/'))
+        request._request.user = self.user
+        authenticator = SessionModeAuthentication()
+        self.assertEqual(authenticator.authenticate(request), (self.user, None))
+        with override_settings(API_AUTH_MODE='jwt'):
+            self.assertIsNone(authenticator.authenticate(request))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class OnboardingTests(TestCase):
+    """Atomic registration and bulk import"""
+
+    def test_failed_registration_leaves_nothing_behind(self):
+        client = APIClient()
+        client.raise_request_exception = False
+        with mock.patch('plant_store.onboarding.Cart.objects.create', side_effect=DatabaseError('disk full')):
+            response = client.post(
+                reverse('plant_store:user_register'),
+                {'username': 'halfway', 'email': 'halfway@example.com', 'password': 'pass-1234'}
+            )
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(User.objects.filter(username='halfway').exists())
+        self.assertFalse(UserProfile.objects.filter(user__username='halfway').exists())
+
+    def test_registration_normalizes_like_create_user(self):
+        response = APIClient().post(
+            reverse('plant_store:user_register'),
+            {'username': '\uff26ern', 'email': 'Fern@EXAMPLE.COM', 'password': 'pass-1234'}
+        )
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get()
+        self.assertEqual((user.username, user.email), ('Fern', 'Fern@example.com'))
+        self.assertTrue(user.check_password('pass-1234'))
+
+    def test_import_users_streams_batches_with_process_pool(self):
+        make_user('existing')
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as export:
+            export.write('username,email,password,first_name\n')
+            for index in range(7):
+                export.write(f'legacy{index},legacy{index}@example.com,pw{index},Fern\n')
+            export.write('legacy3,again@example.com,dup,\n')  # repeated in a later batch
+            export.write('existing,existing@example.com,pw,\n')
+            export.write('nopass,nopass@example.com,,\n')
+        self.addCleanup(os.unlink, export.name)
+
+        call_command('import_users', export.name, batch_size=3, workers=1, stdout=io.StringIO())
+
+        imported = User.objects.filter(username__startswith='legacy')
+        self.assertEqual(imported.count(), 7)
+        self.assertTrue(User.objects.get(username='legacy5').check_password('pw5'))
+        self.assertFalse(User.objects.get(username='nopass').has_usable_password())
+        self.assertEqual(UserProfile.objects.filter(user__in=imported).count(), 7)
+        self.assertEqual(Cart.objects.filter(user__in=imported).count(), 7)
+        self.assertEqual(User.objects.get(username='legacy3').email, 'legacy3@example.com')
+
+
+class PartialUpdateTests(TestCase):
+    """PATCH writes only the changed columns and answers with a diff"""
+
+    def setUp(self):
+        self.user = make_user('patcher')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.address = UserAddress.objects.create(
+            user=self.user, full_name='Pat', phone='123', address_line1='1 Fern Rd',
+            city='Pune', state='MH', zip_code='411001'
+        )
+
+    def writes(self, queries):
+        return [query['sql'] for query in queries if query['sql'].startswith(('UPDATE', 'INSERT', 'DELETE'))]
+
+    def test_profile_patch_updates_only_changed_columns(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.patch(
+                reverse('plant_store:profile_update'),
+                {'first_name': 'Pat', 'email': 'patcher@example.com', 'plant_experience': 'expert'},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'changed': {'user': {'first_name': 'Pat'}, 'profile': {'plant_experience': 'expert'}}})
+        writes = self.writes(queries.captured_queries)
+        self.assertEqual(len(writes), 2)
+        self.assertNotIn('"email"', writes[0])
+        self.assertEqual(UserProfile.objects.get(user=self.user).plant_experience, 'expert')
+
+    def test_unchanged_patch_issues_no_writes(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.patch(
+                reverse('plant_store:profile_update'), {'email': 'patcher@example.com'}, format='json'
+            )
+            self.client.patch(
+                reverse('plant_store:address_update', args=[self.address.id]), {'city': 'Pune'}, format='json'
+            )
+        self.assertEqual(response.data, {'changed': {}})
+        self.assertEqual(self.writes(queries.captured_queries), [])
+
+    def test_address_patch_and_soft_delete(self):
+        response = self.client.patch(
+            reverse('plant_store:address_update', args=[self.address.id]), {'city': 'Mumbai', 'state': 'MH'}, format='json'
+        )
+        self.assertEqual(response.data, {'id': self.address.id, 'changed': {'city': 'Mumbai'}})
+
+        response = self.client.patch(
+            reverse('plant_store:address_update', args=[self.address.id]), {'zip_code': ''}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        with CaptureQueriesContext(connections['default']) as queries:
+            self.client.delete(reverse('plant_store:address_delete', args=[self.address.id]))
+        self.assertIn('"is_active"', self.writes(queries.captured_queries)[0])
+        self.assertNotIn('"city"', self.writes(queries.captured_queries)[0])
+        self.assertFalse(UserAddress.objects.get(id=self.address.id).is_active)
+
+
+class AddressBookTests(TestCase):
+    """The address book costs one query whatever its size, then none until an address changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('booker')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('plant_store:address_book')
+        for city in ('Pune', 'Goa', 'Delhi'):
+            UserAddress.objects.create(
+                user=self.user, full_name='Book', phone='123', address_line1='1 Fern Rd',
+                city=city, state='X', zip_code='1', is_default=(city == 'Goa')
+            )
+
+    def test_one_query_then_cached_until_a_write(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['user']['username'], 'booker')
+        self.assertEqual([address['city'] for address in response.data['addresses']], ['Goa', 'Delhi', 'Pune'])
+        self.assertNotIn('user', response.data['addresses'][0])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('plant_store:address_delete', args=[response.data['addresses'][0]['id']]))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual([address['city'] for address in response.data['addresses']], ['Delhi', 'Pune'])
+
+
+class DefaultAddressTests(TransactionTestCase):
+    """A user never ends up with two default addresses, however the calls interleave"""
+
+    def setUp(self):
+        self.user = make_user('defaulter')
+        self.addresses = [
+            UserAddress.objects.create(
+                user=self.user, full_name='Def', phone='123', address_line1=f'{index} Fern Rd',
+                city='Pune', state='MH', zip_code='411001', is_default=(index == 0)
+            )
+            for index in range(6)
+        ]
+
+    def test_constraint_rejects_a_second_default(self):
+        with self.assertRaises(IntegrityError):
+            UserAddress.objects.filter(pk=self.addresses[1].pk).update(is_default=True)
+
+    def test_parallel_set_default_leaves_exactly_one(self):
+        for _ in range(3):
+            errors = run_in_parallel([
+                lambda address=address: set_default_address(self.user.id, address.id)
+                for address in self.addresses
+            ])
+            self.assertEqual(errors, [])
+            self.assertEqual(UserAddress.objects.filter(user=self.user, is_default=True).count(), 1)
+
+    def test_set_default_view(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.addresses[2].is_active = False
+        self.addresses[2].save()
+
+        response = client.post(reverse('plant_store:address_set_default', args=[self.addresses[2].id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(list(UserAddress.objects.filter(is_default=True).values_list('id', flat=True)), [self.addresses[0].id])
+
+        response = client.post(reverse('plant_store:address_set_default', args=[self.addresses[3].id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(UserAddress.objects.filter(is_default=True).values_list('id', flat=True)), [self.addresses[3].id])
+
+    def test_parallel_default_saves_leave_exactly_one(self):
+        # What the address create and update views do: save a new or changed address with is_default=True
+        new_addresses = [
+            UserAddress(
+                user=self.user, full_name='Def', phone='123', address_line1=f'New {index} Fern Rd',
+                city='Pune', state='MH', zip_code='411001', is_default=True
+            )
+            for index in range(3)
+        ]
+        for address in self.addresses[1:4]:
+            address.is_default = True
+        errors = run_in_parallel([address.save for address in new_addresses + self.addresses[1:4]])
+        self.assertEqual(errors, [])
+        self.assertEqual(UserAddress.objects.filter(user=self.user).count(), 9)
+        self.assertEqual(UserAddress.objects.filter(user=self.user, is_default=True).count(), 1)
+
+    def test_save_retries_when_another_default_slips_in(self):
+        address = UserAddress(
+            user=self.user, full_name='Def', phone='123', address_line1='Late Fern Rd',
+            city='Pune', state='MH', zip_code='411001', is_default=True
+        )
+        real_save = UserAddress._save_as_default
+        calls = []
+
+        def racing_save(instance, *args, **kwargs):
+            calls.append(instance)
+            if len(calls) == 1:
+                # A concurrent writer commits a new default right before our insert
+                UserAddress.objects.filter(is_default=True).update(is_default=False)
+                UserAddress.objects.filter(pk=self.addresses[5].pk).update(is_default=True)
+                raise IntegrityError('UNIQUE constraint failed: plant_store_useraddress.user_id')
+            return real_save(instance, *args, **kwargs)
+
+        with mock.patch.object(UserAddress, '_save_as_default', racing_save):
+            address.save()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(list(UserAddress.objects.filter(is_default=True).values_list('id', flat=True)), [address.id])
+
+
+class BootstrapTests(TestCase):
+    """One request returns the catalog (cached), cart summary and profile basics"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Succulents')
+        for index in range(3):
+            Product.objects.create(
+                name=f'Aloe {index}', description='Spiky', category=self.category, price='10.00',
+                sale_price='8.00' if index == 0 else None, sku=f'ALOE-{index}', is_featured=index < 2
+            )
+        self.user = make_user('shopper')
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=Product.objects.get(sku='ALOE-0'), quantity=2)
+        CartItem.objects.create(cart=cart, product=Product.objects.get(sku='ALOE-2'), quantity=1)
+        self.url = reverse('plant_store:bootstrap')
+
+    def test_anonymous_bootstrap_is_served_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual([category['name'] for category in response.json()['categories']], ['Succulents'])
+        self.assertEqual(sorted(product['sku'] for product in response.json()['featured_products']), ['ALOE-0', 'ALOE-1'])
+        self.assertIsNone(response.json()['cart'])
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.get(sku='ALOE-2').save()
+        with self.assertNumQueries(2):  # categories + featured products
+            self.client.get(self.url)
+
+    def test_authenticated_bootstrap_adds_cart_and_profile(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        client.get(self.url)
+        with self.assertNumQueries(1):  # the cart aggregate
+            data = client.get(self.url).json()
+        self.assertEqual(data['cart'], {'item_count': 2, 'total_quantity': 3, 'total_price': '26.00'})
+        self.assertEqual(data['profile']['username'], 'shopper')
+        self.assertEqual(data['profile']['plant_experience'], 'beginner')
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= and ?expand= shape the payload and the queries behind it"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Ferns')
+        for index in range(4):
+            Product.objects.create(
+                name=f'Fern {index}', description='Leafy', category=self.category, price='5.00', sku=f'FERN-{index}'
+            )
+        self.user = make_user('sparse')
+        for index in range(3):
+            order = Order.objects.create(
+                user=self.user, order_number=f'ORD-{index}', subtotal='10.00', total_amount='10.00',
+                shipping_address='1 Fern Rd', shipping_city='Pune', shipping_state='MH',
+                shipping_zip='411001', shipping_country='India', contact_phone='123'
+            )
+            for product in Product.objects.all()[:2]:
+                OrderItem.objects.create(
+                    order=order, product=product, product_name=product.name, quantity=1, unit_price='5.00', total_price='5.00'
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fields_and_collapsed_relations(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('plant_store:product_list'), {'fields': 'id,name,category', 'expand': ''})
+        self.assertEqual(response.data[0], {'id': response.data[0]['id'], 'name': 'Fern 0', 'category': self.category.id})
+
+        response = self.client.get(reverse('plant_store:product_list'), {'fields': 'sku,category.name'})
+        self.assertEqual(response.data[0], {'sku': 'FERN-0', 'category': {'name': 'Ferns'}})
+
+    def test_default_shape_is_unchanged_and_prefetched(self):
+        with self.assertNumQueries(5):  # count, orders, items, products, categories
+            response = self.client.get(reverse('plant_store:order_list'))
+        order = response.data['results'][0]
+        self.assertEqual(order['user']['profile']['plant_experience'], 'beginner')
+        self.assertEqual(order['items'][0]['product']['category']['name'], 'Ferns')
+
+        with self.assertNumQueries(2):  # count, orders
+            response = self.client.get(reverse('plant_store:order_list'), {'expand': '', 'fields': 'order_number,user'})
+        self.assertEqual(set(response.data['results'][0]), {'order_number', 'user'})
+        self.assertEqual(response.data['results'][0]['user'], self.user.id)
+
+        with self.assertNumQueries(5):  # count, orders, items, products, categories for product_category
+            response = self.client.get(reverse('plant_store:order_list'), {'expand': 'items.product', 'fields': 'id,items'})
+        self.assertEqual(response.data['results'][0]['items'][0]['product']['category'], self.category.id)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse('plant_store:product_list'), {'fields': 'id,nope'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('plant_store:product_list'), {'expand': 'name'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RenderingAndCompressionTests(TestCase):
+    """orjson renderer/parser match DRF's JSON, and large responses are compressed as negotiated"""
+
+    def test_orjson_renderer_matches_stdlib_renderer(self):
+        data = {
+            'price': Decimal('12.50'),
+            'at': timezone.now(),
+            'day': timezone.now().date(),
+            'name': 'Fern   Ficus é',
+            'items': [1, 2.5, None, True],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_orjson_parser(self):
+        parser = ORJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO(b'{"price": "9.99", "qty": 2}')), {'price': '9.99', 'qty': 2})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"price": '))
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_BYTES=1024)
+    def test_large_responses_are_compressed_small_ones_are_not(self):
+        category = Category.objects.create(name='Palms')
+        Product.objects.bulk_create([
+            Product(name=f'Palm {index}', description='Tall', category=category, price='9.00', sku=f'PALM-{index}')
+            for index in range(30)
+        ])
+        response = self.client.get(reverse('plant_store:product_list'), HTTP_ACCEPT_ENCODING='br;q=1.0, gzip;q=0.8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')  # brotli is optional
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(gzip.decompress(response.content)), len(self.client.get(reverse('plant_store:product_list')).content))
+
+        response = self.client.get(reverse('plant_store:product_list'), HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get(reverse('plant_store:category_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(DEBUG=True)  # adaptations are only logged in debug mode
+    def test_middleware_chain_stays_async_under_asgi(self):
+        with self.assertLogs('django.request', level='DEBUG') as logs:
+            ASGIHandler()  # loads MIDDLEWARE in async mode
+            logging.getLogger('django.request').debug('middleware loaded')
+        self.assertEqual([line for line in logs.output if 'adapted' in line], [])
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_BYTES=10)
+    async def test_async_request_is_compressed(self):
+        await Category.objects.acreate(name='Async Palms', description='x' * 200)
+        response = await self.async_client.get(reverse('plant_store:category_list'), headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+SHIPPING_PAYLOAD = {
+    'shipping_address': '12 Fern Lane',
+    'shipping_city': 'Pune',
+    'shipping_state': 'MH',
+    'shipping_zip': '411001',
+    'shipping_country': 'India',
+    'contact_phone': '9876543210',
+    'payment_method': 'cod',
+}
+
+
+def checkout(user, products):
+    """Fill the user's cart with {product: quantity} and place an order through OrderCreateView"""
+    cart, _ = Cart.objects.get_or_create(user=user)
+    for product, quantity in products.items():
+        CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+    client = APIClient()
+    client.force_authenticate(user)
+    with redirect_stdout(io.StringIO()):  # the view prints debug lines
+        return client.post(reverse('plant_store:order_create'), SHIPPING_PAYLOAD, format='json')
+
+
+class OrderConfirmationEmailTests(TestCase):
+    """The confirmation e-mail shows every amount with exactly one rupee sign"""
+
+    def test_amounts_are_rendered_once_prefixed(self):
+        category = Category.objects.create(name='Monsteras')
+        product = Product.objects.create(name='Monstera', description='Big', category=category, price='500.00', sku='MON-1')
+        response = checkout(make_user('receipt'), {product: 2})
+        self.assertEqual(response.status_code, 201)
+
+        email = OutboxEmail.objects.get()
+        self.assertIn('- Monstera x2 @ ₹500.00 = ₹1,000.00\n', email.body)
+        self.assertIn('Subtotal:     ₹1,000.00\n', email.body)
+        self.assertIn('GST (8%):     ₹80.00\n', email.body)
+        self.assertIn('Total Amount: ₹1,080.00\n', email.body)
+        self.assertIn('<td class="item-total">₹1,000.00</td>', email.html_body)
+        self.assertIn('₹1,080.00</span>', email.html_body)
+        self.assertNotIn('₹₹', email.body + email.html_body)
+
+    def test_storefront_preformatted_amounts_are_not_doubled(self):
+        # OrderEmailView receives the order page's item strings, which carry their own ₹
+        client = APIClient()
+        client.force_authenticate(make_user('storefront'))
+        with redirect_stdout(io.StringIO()):
+            client.post(reverse('plant_store:order_email'), {
+                'customer_email': 'storefront@example.com', 'customer_name': 'Store Front',
+                'order_number': 'ORD-9', 'total_amount': '1080.00',
+                'items': [{'name': 'Fern', 'quantity': 2, 'price': '₹500.00', 'total': '₹1,000.00'}],
+            }, format='json')
+        body = OutboxEmail.objects.get().body
+        self.assertIn('- Fern x2 @ ₹500.00 = ₹1,000.00\n', body)
+        self.assertIn('Total Amount: ₹1080.00\n', body)
+
+
+class OrderSnapshotTests(TestCase):
+    """Order details show the order as it was at checkout"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Cacti')
+        self.product = Product.objects.create(name='Saguaro', description='Tall', category=self.category, price='300.00', sku='SAG-1')
+        self.user = make_user('snapshot')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def detail(self, order_id):
+        return self.client.get(reverse('plant_store:order_detail', args=[order_id])).json()
+
+    def test_product_changes_after_checkout_do_not_rewrite_the_order(self):
+        order_id = checkout(self.user, {self.product: 2}).json()['id']
+        before = self.detail(order_id)
+
+        self.product.name = 'Renamed Saguaro'
+        self.product.price = '999.00'
+        self.product.save()
+        self.category.name = 'Renamed Cacti'
+        self.category.save()
+        Order.objects.filter(pk=order_id).update(status='shipped')
+
+        after = self.detail(order_id)
+        self.assertEqual(after['status'], 'shipped')
+        for data in (before, after):
+            data.pop('status'), data.pop('updated_at')
+        self.assertEqual(after, before)
+        item = after['items'][0]
+        self.assertEqual((item['product_name'], item['unit_price'], item['total_price']), ('Saguaro', '300.00', '600.00'))
+        self.assertEqual((item['product']['price'], item['product_category']), ('300.00', 'Cacti'))
+
+    def test_legacy_orders_are_frozen_by_the_backfill_command(self):
+        order_id = checkout(self.user, {self.product: 1}).json()['id']
+        Order.objects.filter(pk=order_id).update(snapshot=None)  # placed before snapshots existed
+
+        self.assertEqual(self.detail(order_id)['items'][0]['product']['name'], 'Saguaro')
+        self.assertIsNone(Order.objects.get(pk=order_id).snapshot)  # reads no longer freeze
+
+        call_command('backfill_order_snapshots', stdout=io.StringIO())
+        self.product.name = 'Renamed Saguaro'
+        self.product.save()
+        self.assertEqual(self.detail(order_id)['items'][0]['product']['name'], 'Saguaro')
+
+
+class FlakyConnection:
+    """
+    Email backend stand-in: fails messages whose subject or recipient is in `failing`,
+    crashes the worker on `crash_on`, and refuses to connect with refuse_open=True
+    """
+
+    def __init__(self, failing=(), crash_on=None, refuse_open=False):
+        self.failing, self.crash_on, self.refuse_open = set(failing), crash_on, refuse_open
+        self.sent, self.recipients = [], []  # subjects and addresses delivered
+
+    def open(self):
+        if self.refuse_open:
+            raise ConnectionRefusedError('connection refused')
+        return True
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        for message in messages:
+            targets = {message.subject, *message.to}
+            if self.crash_on in targets:
+                raise SystemExit('worker killed')
+            if self.failing & targets:
+                raise ConnectionError('421 try again later')
+            self.sent.append(message.subject)
+            self.recipients.extend(message.to)
+        return len(messages)
+
+
+class OutboxDeliveryTests(TestCase):
+    """drain_outbox leases, retries with backoff, gives up, and redelivers after a crash"""
+
+    def setUp(self):
+        self.now = timezone.now()
+        patcher = mock.patch('plant_store.email_service.timezone.now', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self, subject):
+        return OutboxEmail.objects.create(
+            subject=subject, body='Hello', from_email='shop@example.com', to=['fern@example.com'], next_attempt_at=self.now
+        )
+
+    def drain(self, connection, **kwargs):
+        return drain_outbox(connection=connection, backoff_seconds=30, **kwargs)
+
+    def test_sends_due_mail_once(self):
+        self.queue('Welcome')
+        connection = FlakyConnection()
+        self.assertEqual(self.drain(connection)['sent'], 1)
+        self.assertEqual(self.drain(connection)['sent'], 0)
+        self.assertEqual(connection.sent, ['Welcome'])
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('sent', 1))
+
+    def test_failures_back_off_exponentially_then_give_up(self):
+        email = self.queue('Receipt')
+        connection = FlakyConnection(failing={'Receipt'})
+
+        for attempt, delay in ((1, 30), (2, 60)):
+            self.assertEqual(self.drain(connection, max_attempts=3)['retried'], 1)
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', attempt))
+            self.assertEqual(email.next_attempt_at, self.now + timedelta(seconds=delay))
+            self.assertEqual(self.drain(connection, max_attempts=3)['retried'], 0)  # not due yet
+            self.now = email.next_attempt_at
+
+        self.assertEqual(self.drain(connection, max_attempts=3)['failed'], 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 3))
+        self.assertIn('421', email.last_error)
+
+    def test_crashed_worker_batch_is_redelivered_after_the_lease(self):
+        self.queue('First')
+        self.queue('Second')
+        with self.assertRaises(SystemExit):
+            self.drain(FlakyConnection(crash_on='Second'), lease_seconds=300)
+
+        # 'First' was delivered and recorded; 'Second' is still pending, but hidden by the dead worker's lease
+        self.assertEqual(OutboxEmail.objects.get(subject='First').status, 'sent')
+        self.assertEqual(OutboxEmail.objects.get(subject='Second').status, 'pending')
+        survivor = FlakyConnection()
+        self.assertEqual(self.drain(survivor)['sent'], 0)
+
+        self.now += timedelta(seconds=301)
+        self.assertEqual(self.drain(survivor)['sent'], 1)
+        self.assertEqual(survivor.sent, ['Second'])  # at-least-once: redelivered, not lost
+
+
+CONTACT_PAYLOAD = {'name': 'Asha Rao', 'email': 'asha@example.com', 'subject': 'plant_care', 'message': 'My fern is browning.'}
+
+
+class ContactFormTests(TransactionTestCase):
+    """Resubmitted contact forms are stored once and each client is rate limited"""
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, payload=CONTACT_PAYLOAD, ip='10.0.0.1'):
+        return APIClient().post(reverse('plant_store:contact_form'), payload, format='json', REMOTE_ADDR=ip)
+
+    def test_resubmission_reuses_the_first_message(self):
+        first = self.post()
+        self.assertEqual(first.status_code, 201)
+        # Case and spacing differences still count as the same submission
+        again = self.post(dict(CONTACT_PAYLOAD, name='  asha   RAO ', email='ASHA@example.com'))
+        self.assertEqual(again.status_code, 200)
+        self.assertTrue(again.data['duplicate'])
+        self.assertEqual(again.data['contact_id'], first.data['contact_id'])
+        self.assertEqual(ContactMessage.objects.count(), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+        other = self.post(dict(CONTACT_PAYLOAD, message='And my monstera.'))
+        self.assertEqual(other.status_code, 201)
+        self.assertEqual(ContactMessage.objects.count(), 2)
+
+    def test_parallel_resubmissions_store_one_message(self):
+        responses = []
+        errors = run_in_parallel([
+            lambda index=index: responses.append(self.post(ip=f'10.0.1.{index}')) for index in range(6)
+        ])
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(response.status_code for response in responses), [200] * 5 + [201])
+        self.assertEqual({response.data['contact_id'] for response in responses}, {ContactMessage.objects.get().id})
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+    def test_failed_outbox_insert_keeps_the_message(self):
+        queue_insert = OutboxEmail.objects.create
+
+        def broken_insert(**fields):
+            if fields['to'] == ['plantify.orders@gmail.com']:
+                fields['subject'] = None  # NOT NULL violation raised by the database
+            return queue_insert(**fields)
+
+        with mock.patch.object(OutboxEmail.objects, 'create', side_effect=broken_insert):
+            response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ContactMessage.objects.get().id, response.data['contact_id'])
+        # Only the admin notification is lost; the customer's confirmation is still queued
+        self.assertEqual(list(OutboxEmail.objects.values_list('to', flat=True)), [['asha@example.com']])
+
+    @override_settings(CONTACT_THROTTLE_BURST=2, CONTACT_THROTTLE_PER_MINUTE=6)
+    def test_throttle_allows_a_burst_then_refills(self):
+        now = [1000.0]
+        with mock.patch.object(ContactFormThrottle, 'timer', side_effect=lambda: now[0]):
+            self.assertEqual(self.post().status_code, 201)
+            self.assertEqual(self.post().status_code, 200)
+            refused = self.post()
+            self.assertEqual(refused.status_code, 429)
+            self.assertEqual(refused['Retry-After'], '10')
+            # Another client has its own bucket
+            self.assertEqual(self.post(ip='10.0.0.2').status_code, 200)
+
+            now[0] += 10  # one token back at 6 per minute
+            self.assertEqual(self.post().status_code, 200)
+            self.assertEqual(self.post().status_code, 429)
+
+    @override_settings(CONTACT_THROTTLE_BURST=3)
+    def test_parallel_requests_cannot_overspend_the_bucket(self):
+        request = APIClient().get('/', REMOTE_ADDR='10.0.0.3').wsgi_request
+        allowed = []
+        errors = run_in_parallel([
+            lambda: allowed.append(ContactFormThrottle().allow_request(request, None)) for _ in range(10)
+        ])
+        self.assertEqual(errors, [])
+        self.assertEqual(allowed.count(True), 3)
+
+
+class NewsletterResumeTests(TestCase):
+    """send_newsletter resumes from its checkpoint and retries failed recipients on the next run"""
+
+    def setUp(self):
+        self.subscribers = []
+        for index in range(5):
+            user = make_user(f'reader{index}')
+            UserProfile.objects.filter(user=user).update(newsletter_subscription=True)
+            self.subscribers.append(user)
+        self.campaign = NewsletterCampaign.objects.create(subject='Newsletter', body='Hi {{ name }}')
+
+    def send(self, connection, **options):
+        with mock.patch('plant_store.management.commands.send_newsletter.get_connection', return_value=connection):
+            call_command('send_newsletter', self.campaign.pk, batch_size=2, stdout=io.StringIO(), stderr=io.StringIO(), **options)
+        self.campaign.refresh_from_db()
+        return connection.recipients
+
+    def emails(self, *indexes):
+        return [self.subscribers[index].email for index in indexes]
+
+    def test_failed_recipients_are_retried_on_the_next_run(self):
+        self.assertEqual(self.send(FlakyConnection(failing=self.emails(2))), self.emails(0, 1, 3, 4))
+        self.assertEqual(self.campaign.status, 'completed')
+        self.assertEqual(self.campaign.failed_user_ids, [self.subscribers[2].id])
+        self.assertEqual((self.campaign.sent_count, self.campaign.failed_count), (4, 1))
+
+        self.assertEqual(self.send(FlakyConnection()), self.emails(2))
+        self.assertEqual(self.campaign.failed_user_ids, [])
+        self.assertEqual((self.campaign.sent_count, self.campaign.failed_count), (5, 0))
+
+        with self.assertRaises(CommandError):
+            self.send(FlakyConnection())
+
+    def test_crashed_run_resumes_after_the_last_checkpoint(self):
+        crashed = FlakyConnection(crash_on=self.emails(3)[0])
+        with self.assertRaises(SystemExit):
+            self.send(crashed)
+        self.assertEqual(crashed.recipients, self.emails(0, 1, 2))
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.status, self.campaign.last_user_id), ('sending', self.subscribers[1].id))
+
+        # The unfinished batch is sent again: at-least-once, as for the outbox
+        self.assertEqual(self.send(FlakyConnection()), self.emails(2, 3, 4))
+        self.assertEqual((self.campaign.status, self.campaign.sent_count), ('completed', 5))
+
+    def test_unreachable_server_leaves_the_campaign_untouched(self):
+        with self.assertRaisesMessage(CommandError, 'Could not connect to the mail server'):
+            self.send(FlakyConnection(refuse_open=True))
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.status, self.campaign.started_at), ('draft', None))
@@ -0,0 +1,85 @@
+"""
+Request throttles for PlantiFy API endpoints
+"""
+
+import math
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from rest_framework.throttling import BaseThrottle
+
+from .db_retry import retry_on_lock
+
+
+class BucketBusy(Exception):
+    """Another request is updating the same token bucket"""
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Per-client token bucket stored in the default cache
+
+    Each client (by IP, via DRF's get_ident) may burst `capacity` requests and
+    then earns `refill_rate` tokens per second back. Updates to a bucket are
+    serialized with a short lock taken through cache.add.
+    """
+    cache = default_cache
+    timer = time.time
+    scope = None
+    capacity = 5
+    refill_rate = 1.0
+    lock_timeout = 5  # seconds; frees the bucket if a worker dies holding the lock
+
+    def get_cache_key(self, request, view):
+        return f'throttle_bucket_{self.scope}_{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        try:
+            return retry_on_lock(partial(self.take_token_locked, key), retry_on=(BucketBusy,))
+        except BucketBusy:
+            # Still contended: this client is already sending requests in parallel
+            self.wait_seconds = 1 / self.refill_rate
+            return False
+
+    def take_token_locked(self, key):
+        """take_token under the bucket's lock; raises BucketBusy while another request holds it"""
+        # cache.add is atomic on every backend, so it serializes the read-modify-write
+        # of one client's bucket; without it parallel requests could all spend the same token
+        lock_key = f'{key}_lock'
+        if not self.cache.add(lock_key, True, self.lock_timeout):
+            raise BucketBusy(key)
+        try:
+            return self.take_token(key)
+        finally:
+            self.cache.delete(lock_key)
+
+    def take_token(self, key):
+        """Refill the bucket for the time elapsed and spend one token if there is one"""
+        now = self.timer()
+        tokens, updated_at = self.cache.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+
+        # Once the bucket has been full for this long the entry carries no information
+        timeout = math.ceil(self.capacity / self.refill_rate)
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / self.refill_rate
+            self.cache.set(key, (tokens, now), timeout)
+            return False
+
+        self.cache.set(key, (tokens - 1, now), timeout)
+        return True
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class ContactFormThrottle(TokenBucketThrottle):
+    """Token bucket for the public contact form"""
+    scope = 'contact'
+
+    def __init__(self):
+        self.capacity = getattr(settings, 'CONTACT_THROTTLE_BURST', 5)
+        self.refill_rate = getattr(settings, 'CONTACT_THROTTLE_PER_MINUTE', 2) / 60.0
@@ -9,6 +9,12 @@ urlpatterns = [
 	path('api/login/', views.UserLoginView.as_view(), name='user_login'),
 	path('api/logout/', views.UserLogoutView.as_view(), name='user_logout'),
 	path('api/token/refresh/', views.TokenRefreshView.as_view(), name='token_refresh'),
+	path('api/register/async/', views.async_user_register, name='user_register_async'),
+	path('api/login/async/', views.async_user_login, name='user_login_async'),
+	path('api/profile/change-password/async/', views.async_change_password, name='profile_change_password_async'),
+	
+	# Storefront bootstrap (categories, featured products, cart summary, profile)
+	path('api/bootstrap/', views.BootstrapView.as_view(), name='bootstrap'),
 	
 	# Product Catalog
 	path('api/categories/', views.CategoryListView.as_view(), name='category_list'),
@@ -29,15 +35,23 @@ urlpatterns = [
 	
 	# Customer Suggestions
 	path('api/suggestions/', views.CustomerSuggestionListCreateView.as_view(), name='suggestions_list_create'),
+	path('api/suggestions/feed/', views.CommunityFeedView.as_view(), name='suggestions_feed'),
+	path('api/suggestions/events/', views.suggestion_event_stream, name='suggestion_events'),
+	path('api/suggestions/<int:suggestion_id>/comments/page/', views.SuggestionCommentListView.as_view(), name='suggestion_comments_page'),
+	path('api/suggestions/<int:suggestion_id>/comments/tree/', views.SuggestionCommentTreeView.as_view(), name='suggestion_comment_tree'),
 	path('api/suggestions/<int:suggestion_id>/like/', views.SuggestionLikeDislikeView.as_view(), name='suggestion_like_dislike'),
 	path('api/suggestions/<int:suggestion_id>/comments/', views.CommentCreateView.as_view(), name='comment_create'),
 	
+	# Votes
+	path('api/votes/mine/', views.MyVotesView.as_view(), name='my_votes'),
+	
 	# Comments
 	path('api/comments/<int:comment_id>/like/', views.CommentLikeDislikeView.as_view(), name='comment_like_dislike'),
 	path('api/comments/<int:comment_id>/replies/', views.CommentCreateView.as_view(), name='comment_reply'),
 
 	# User Addresses
 	path('api/addresses/', views.UserAddressListView.as_view(), name='address_list'),
+	path('api/addresses/book/', views.AddressBookView.as_view(), name='address_book'),
 	path('api/addresses/create/', views.UserAddressCreateView.as_view(), name='address_create'),
 	path('api/addresses/<int:address_id>/', views.UserAddressUpdateView.as_view(), name='address_update'),
 	path('api/addresses/<int:address_id>/delete/', views.UserAddressDeleteView.as_view(), name='address_delete'),
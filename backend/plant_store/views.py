@@ -3,21 +3,48 @@ from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.contrib.auth import authenticate, login, logout
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.throttling import BaseThrottle
+from asgiref.sync import sync_to_async
+from django.contrib.auth import alogin, authenticate, login, logout
+from django.contrib.auth.signals import user_logged_in
+from django.contrib.auth.hashers import identify_hasher, make_password
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+import json
+from datetime import timedelta
 from decimal import Decimal
-from django.contrib.contenttypes.models import ContentType
-from .models import UserProfile, Category, Product, Cart, CartItem, Order, OrderItem, UserAddress, ContactMessage, CustomerSuggestion, Comment, UserVote
+from .models import UserProfile, Category, Product, Cart, CartItem, Order, OrderItem, UserAddress, ContactMessage, CustomerSuggestion, Comment
 from .serializers import (
     UserSerializer, UserProfileSerializer, CategorySerializer, ProductSerializer,
     CartSerializer, CartItemSerializer, OrderSerializer, OrderItemSerializer,
     UserRegistrationSerializer, LoginSerializer, UserAddressSerializer, ContactMessageSerializer,
-    CustomerSuggestionSerializer, CommentSerializer
+    CustomerSuggestionSerializer, CommentSerializer, CommunityFeedSerializer
 )
 from .email_service import send_order_confirmation, send_contact_notification_email, send_contact_confirmation_email
+from .comment_tree import build_comment_tree
+from .pagination import SuggestionFeedPagination
+from .throttling import ContactFormThrottle
+from .db_retry import retry_on_lock
+from .voting import VOTE_ACTIONS, buffer_interval, cast_vote, votes_for
+from .ranking import HOT_WINDOW, TOP_WINDOWS, refresh_ranking
+from .live import format_sse, get_backend as get_live_backend
+from .authentication import CachedJWTAuthentication
+from .password_hashing import HashingBusy, get_hasher_pool, hashing_slots
+from .onboarding import create_registered_user
+from .bootstrap import cart_summary, catalog_snapshot, profile_basics
+from .address_book import get_address_book, set_default_address
+from .sparse_fields import SparseFieldsetViewMixin, sparse_fieldset, sparse_queryset
+from .partial_updates import assign_changes, represent_changes, save_changes
 
 # Create your views here.
 
@@ -28,16 +55,9 @@ class UserRegistrationView(APIView):
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            
-            # Create user profile using Django ORM
-            UserProfile.objects.create(
-                user=user,
-                plant_experience='beginner'
-            )
-            
-            # Create shopping cart using Django ORM
-            Cart.objects.create(user=user)
+            # User, profile and cart are created in one transaction; hashing happens before it
+            password_hash = make_password(serializer.validated_data['password'])
+            user = create_registered_user(serializer.validated_data, password_hash)
             
             return Response({
                 'message': 'User registered successfully',
@@ -64,8 +84,12 @@ class UserLoginView(APIView):
                 access_token = str(refresh.access_token)
                 refresh_token = str(refresh)
                 
-                # Also do session login for compatibility
-                login(request, user)
+                # Also do session login for compatibility, unless the API is stateless
+                if settings.API_AUTH_MODE == 'session':
+                    login(request, user)
+                else:
+                    # What login() sends besides the session: updates last_login, among others
+                    user_logged_in.send(sender=user.__class__, request=request, user=user)
                 
                 return Response({
                     'message': 'Login successful',
@@ -110,14 +134,143 @@ class TokenRefreshView(APIView):
             return Response({'error': 'Invalid refresh token'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
-class CategoryListView(generics.ListAPIView):
+# Async authentication views
+# Same request and response bodies as the views above, but PBKDF2 runs in the
+# bounded pool from plant_store.password_hashing instead of the request thread.
+
+def _json_body(request):
+    """Parsed JSON (or form) body as a dict, or None if it is malformed"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+
+def _busy_response(error):
+    response = JsonResponse({'error': str(error)}, status=error.status_code)
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def _login_payload(user):
+    refresh = RefreshToken.for_user(user)
+    return {
+        'message': 'Login successful',
+        'user': UserSerializer(user).data,
+        'access_token': str(refresh.access_token),
+        'refresh_token': str(refresh)
+    }
+
+
+@csrf_exempt
+@require_POST
+async def async_user_register(request):
+    """Async UserRegistrationView"""
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Malformed request body'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = UserRegistrationSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        with hashing_slots(ip=BaseThrottle().get_ident(request)):
+            password_hash = await get_hasher_pool().make(serializer.validated_data['password'])
+    except HashingBusy as e:
+        return _busy_response(e)
+    
+    user = await sync_to_async(create_registered_user)(serializer.validated_data, password_hash)
+    user_data = await sync_to_async(lambda: UserSerializer(user).data)()
+    return JsonResponse({
+        'message': 'User registered successfully',
+        'user': user_data
+    }, status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_POST
+async def async_user_login(request):
+    """Async UserLoginView"""
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'Malformed request body'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = LoginSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    username = serializer.validated_data['username']
+    password = serializer.validated_data['password']
+    
+    pool = get_hasher_pool()
+    try:
+        with hashing_slots(account=username, ip=BaseThrottle().get_ident(request)):
+            user = await User.objects.select_related('profile').filter(username=username).afirst()
+            if user is None:
+                # Hash anyway so unknown usernames take as long as wrong passwords (like ModelBackend)
+                await pool.make(password)
+                valid = False
+            else:
+                valid = await pool.check(password, user.password)
+                if valid and identify_hasher(user.password).must_update(user.password):
+                    user.password = await pool.make(password)
+                    await user.asave(update_fields=['password'])
+    except HashingBusy as e:
+        return _busy_response(e)
+    
+    if not valid or not user.is_active:
+        return JsonResponse({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    # Also do session login for compatibility, unless the API is stateless
+    if settings.API_AUTH_MODE == 'session':
+        await alogin(request, user)
+    else:
+        await user_logged_in.asend(sender=user.__class__, request=request, user=user)
+    return JsonResponse(await sync_to_async(_login_payload)(user), status=status.HTTP_200_OK)
+
+
+@csrf_exempt
+@require_POST
+async def async_change_password(request):
+    """Async ProfileChangePasswordView (JWT bearer authentication)"""
+    try:
+        authenticated = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    if authenticated is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED)
+    user = authenticated[0]
+    
+    data = _json_body(request) or {}
+    current_password = data.get('current_password')
+    new_password = data.get('new_password')
+    if not current_password or not new_password:
+        return JsonResponse({'error': 'Current password and new password are required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    pool = get_hasher_pool()
+    try:
+        with hashing_slots(account=user.username, ip=BaseThrottle().get_ident(request)):
+            if not await pool.check(current_password, user.password):
+                return JsonResponse({'error': 'Current password is incorrect'}, status=status.HTTP_400_BAD_REQUEST)
+            user.password = await pool.make(new_password)
+    except HashingBusy as e:
+        return _busy_response(e)
+    
+    await user.asave(update_fields=['password'])
+    return JsonResponse({'message': 'Password changed successfully'})
+
+
+class CategoryListView(SparseFieldsetViewMixin, generics.ListAPIView):
     """List all product categories"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
 
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(SparseFieldsetViewMixin, generics.ListAPIView):
     """List all products with optional filtering"""
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
@@ -144,13 +297,28 @@ class ProductListView(generics.ListAPIView):
         return queryset
 
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductDetailView(SparseFieldsetViewMixin, generics.RetrieveAPIView):
     """Get detailed product information"""
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
 
 
+class BootstrapView(APIView):
+    """Everything the storefront needs on load, in one request"""
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        data = dict(catalog_snapshot())
+        if request.user.is_authenticated:
+            data['cart'] = cart_summary(request.user)
+            data['profile'] = profile_basics(request.user)
+        else:
+            data['cart'] = None
+            data['profile'] = None
+        return Response(data)
+
+
 class CartView(APIView):
     """Shopping cart operations"""
     permission_classes = [permissions.IsAuthenticated]
@@ -396,17 +564,17 @@ class OrderCreateView(APIView):
                 order_data = {
                     'order_number': order.order_number,
                     'order_date': order.created_at.strftime('%B %d, %Y'),
-                    'subtotal': f"₹{order.subtotal:,.2f}",
-                    'gst_amount': f"₹{order.tax:,.2f}",
-                    'total_amount': f"₹{order.total_amount:,.2f}",
+                    'subtotal': f"{order.subtotal:,.2f}",
+                    'gst_amount': f"{order.tax:,.2f}",
+                    'total_amount': f"{order.total_amount:,.2f}",
                     'payment_method': request.data.get('payment_method', 'Online Payment'),
                     'shipping_address': f"{order.shipping_address}, {order.shipping_city}, {order.shipping_state} {order.shipping_zip}, {order.shipping_country}",
                     'items': [
                         {
                             'name': item.product_name,
                             'quantity': item.quantity,
-                            'price': f"₹{item.unit_price:,.2f}",
-                            'total': f"₹{item.total_price:,.2f}"
+                            'price': f"{item.unit_price:,.2f}",
+                            'total': f"{item.total_price:,.2f}"
                         } for item in order.items.all()
                     ]
                 }
@@ -434,8 +602,9 @@ class OrderCreateView(APIView):
                 print(f"⚠️ Email error (non-critical): {str(email_error)}")
                 # Don't fail the order creation if email fails
             
-            serializer = OrderSerializer(order)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            # Freeze the order as served today so later product edits never rewrite history
+            snapshot = order.freeze_snapshot(OrderSerializer(order).data)
+            return Response(snapshot, status=status.HTTP_201_CREATED)
             
         except Cart.DoesNotExist:
             return Response({'error': 'Cart not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -447,7 +616,7 @@ class OrderCreateView(APIView):
             return Response({'error': f'Order creation failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(SparseFieldsetViewMixin, generics.ListAPIView):
     """List user's orders"""
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -457,12 +626,26 @@ class OrderListView(generics.ListAPIView):
 
 
 class OrderDetailView(generics.RetrieveAPIView):
-    """Get detailed order information"""
+    """Get detailed order information from its checkout snapshot"""
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user)
+    
+    def retrieve(self, request, *args, **kwargs):
+        # One row fetch: the frozen snapshot plus the columns that still change
+        row = self.get_queryset().filter(pk=kwargs['pk']).values('snapshot', *Order.SNAPSHOT_LIVE_FIELDS).first()
+        if row is None:
+            raise Http404
+        
+        snapshot = row.pop('snapshot')
+        if snapshot is None:
+            # Orders placed before snapshots existed: served live until backfill_order_snapshots freezes them
+            return Response(OrderSerializer(self.get_object()).data)
+        
+        snapshot.update(row)
+        return Response(snapshot)
 
 
 class OrderEmailView(APIView):
@@ -526,11 +709,29 @@ class UserAddressListView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        addresses = UserAddress.objects.filter(user=request.user, is_active=True)
-        serializer = UserAddressSerializer(addresses, many=True)
+        serializer = UserAddressSerializer(many=True, context={'sparse_fieldset': sparse_fieldset(request)})
+        serializer.instance = sparse_queryset(UserAddress.objects.filter(user=request.user, is_active=True), serializer)
         return Response(serializer.data)
 
 
+class AddressBookView(APIView):
+    """The user once plus a compact list of their active addresses, served from the cache"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        user = request.user
+        return Response({
+            'user': {
+                'id': user.id,
+                'username': user.username,
+                'first_name': user.first_name,
+                'last_name': user.last_name,
+                'email': user.email,
+            },
+            'addresses': get_address_book(user.id),
+        })
+
+
 class UserAddressCreateView(APIView):
     """Create a new address for the current user"""
     permission_classes = [IsAuthenticated]
@@ -557,6 +758,22 @@ class UserAddressUpdateView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except UserAddress.DoesNotExist:
             return Response({'error': 'Address not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    def patch(self, request, address_id):
+        """Write only the changed columns and answer with {'id', 'changed'}"""
+        try:
+            address = UserAddress.objects.get(id=address_id, user=request.user)
+        except UserAddress.DoesNotExist:
+            return Response({'error': 'Address not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = UserAddressSerializer(address, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        with transaction.atomic():
+            changed = assign_changes(address, serializer.validated_data)
+            save_changes(address, changed)
+        return Response({'id': address.id, 'changed': represent_changes(serializer, address, changed)})
 
 
 class UserAddressDeleteView(APIView):
@@ -566,8 +783,7 @@ class UserAddressDeleteView(APIView):
     def delete(self, request, address_id):
         try:
             address = UserAddress.objects.get(id=address_id, user=request.user)
-            address.is_active = False
-            address.save()
+            save_changes(address, assign_changes(address, {'is_active': False}))
             return Response({'message': 'Address deleted successfully'})
         except UserAddress.DoesNotExist:
             return Response({'error': 'Address not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -578,44 +794,68 @@ class UserAddressSetDefaultView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request, address_id):
-        try:
-            address = UserAddress.objects.get(id=address_id, user=request.user)
-            address.is_default = True
-            address.save()  # This will automatically unset other addresses as default
-            return Response({'message': 'Default address updated successfully'})
-        except UserAddress.DoesNotExist:
+        if not set_default_address(request.user.id, address_id):
             return Response({'error': 'Address not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Default address updated successfully'})
+
+
+def _store_contact_message(serializer, content_hash):
+    """
+    Save a contact message and queue its emails, unless it was already sent
+    
+    Identical resubmissions (double clicks, retries) within CONTACT_DEDUP_WINDOW_SECONDS
+    reuse the first message. Submissions racing past that check are caught by the
+    one_contact_message_per_window constraint.
+    
+    Returns:
+        tuple: (ContactMessage, duplicate)
+    """
+    window_seconds = getattr(settings, 'CONTACT_DEDUP_WINDOW_SECONDS', 600)
+    now = timezone.now()
+    dedup_window = int(now.timestamp()) // window_seconds
+    
+    def find_or_store():
+        contact_message = ContactMessage.objects.filter(
+            content_hash=content_hash, created_at__gte=now - timedelta(seconds=window_seconds)
+        ).first()
+        if contact_message is not None:
+            return contact_message, True
+        
+        try:
+            with transaction.atomic():
+                contact_message = serializer.save(content_hash=content_hash, dedup_window=dedup_window)
+                
+                # Both emails go through the outbox; nothing here waits on SMTP
+                admin_email = 'plantify.orders@gmail.com'  # Your email
+                send_contact_notification_email(contact_message, admin_email)
+                send_contact_confirmation_email(contact_message)
+        except IntegrityError:
+            # A concurrent identical submission was stored first
+            return ContactMessage.objects.get(content_hash=content_hash, dedup_window=dedup_window), True
+        return contact_message, False
+    
+    return retry_on_lock(find_or_store)
 
 
 class ContactFormView(APIView):
+    """Store contact messages and queue the admin/customer emails for the outbox worker"""
     permission_classes = []  # Allow anyone to submit contact form
+    throttle_classes = [ContactFormThrottle]
     
     def post(self, request):
         try:
             serializer = ContactMessageSerializer(data=request.data)
             if serializer.is_valid():
-                # Save contact message to database
-                contact_message = serializer.save()
-                
-                # Debug: Print contact message details
-                print(f"🔍 DEBUG: Contact message created with email: {contact_message.email}")
-                print(f"🔍 DEBUG: Contact message name: {contact_message.name}")
-                print(f"🔍 DEBUG: Contact message subject: {contact_message.subject}")
-                
-                # Send notification email to admin (you)
-                admin_email = 'plantify.orders@gmail.com'  # Your email
-                print(f"🔍 DEBUG: Sending admin notification to: {admin_email}")
-                send_contact_notification_email(contact_message, admin_email)
-                
-                # Send confirmation email to customer
-                print(f"🔍 DEBUG: About to send confirmation email to customer: {contact_message.email}")
-                send_contact_confirmation_email(contact_message)
+                data = serializer.validated_data
+                content_hash = ContactMessage.compute_content_hash(data['name'], data['email'], data['subject'], data['message'])
+                contact_message, duplicate = _store_contact_message(serializer, content_hash)
                 
                 return Response({
                     'success': True,
                     'message': 'Your message has been sent successfully! We will get back to you soon.',
-                    'contact_id': contact_message.id
-                }, status=status.HTTP_201_CREATED)
+                    'contact_id': contact_message.id,
+                    'duplicate': duplicate
+                }, status=status.HTTP_200_OK if duplicate else status.HTTP_201_CREATED)
             else:
                 return Response({
                     'success': False,
@@ -731,21 +971,21 @@ class UserOrderHistoryView(APIView):
 class ProfileUpdateView(APIView):
     """Update user profile information"""
     permission_classes = [IsAuthenticated]
+    user_fields = ['first_name', 'last_name', 'email']
+    profile_fields = ['phone', 'date_of_birth', 'plant_experience', 'preferred_plant_types', 'newsletter_subscription']
     
     def put(self, request):
         try:
             user = request.user
             profile, created = UserProfile.objects.get_or_create(user=user)
             
-            # Update user fields
-            if 'first_name' in request.data:
-                user.first_name = request.data['first_name']
-            if 'last_name' in request.data:
-                user.last_name = request.data['last_name']
-            if 'email' in request.data:
-                user.email = request.data['email']
-            
-            user.save()
+            # Update user fields; request.user may be a cached copy (CachedJWTAuthentication),
+            # so only the submitted columns are written back
+            user_changes = [name for name in self.user_fields if name in request.data]
+            for name in user_changes:
+                setattr(user, name, request.data[name])
+            if user_changes:
+                user.save(update_fields=user_changes)
             
             # Update profile fields
             if 'phone' in request.data:
@@ -775,6 +1015,44 @@ class ProfileUpdateView(APIView):
                 {'error': 'Failed to update profile'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def patch(self, request):
+        """
+        Partial update that writes only the changed user and profile columns
+        
+        Returns {'changed': {'user': {...}, 'profile': {...}}} with the new values of the
+        fields that actually changed; an unchanged request issues no writes.
+        """
+        user = request.user
+        profile, created = UserProfile.objects.get_or_create(user=user)
+        
+        user_serializer = UserSerializer(
+            user, partial=True,
+            data={name: request.data[name] for name in self.user_fields if name in request.data}
+        )
+        profile_serializer = UserProfileSerializer(
+            profile, partial=True,
+            data={name: request.data[name] for name in self.profile_fields if name in request.data}
+        )
+        user_valid, profile_valid = user_serializer.is_valid(), profile_serializer.is_valid()
+        if not (user_valid and profile_valid):
+            return Response(
+                {**user_serializer.errors, **profile_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        with transaction.atomic():
+            user_changed = assign_changes(user, user_serializer.validated_data)
+            profile_changed = assign_changes(profile, profile_serializer.validated_data)
+            save_changes(user, user_changed)
+            save_changes(profile, profile_changed)
+        
+        changed = {}
+        if user_changed:
+            changed['user'] = represent_changes(user_serializer, user, user_changed)
+        if profile_changed:
+            changed['profile'] = represent_changes(profile_serializer, profile, profile_changed)
+        return Response({'changed': changed})
 
 class ProfileChangePasswordView(APIView):
     """Change user password"""
@@ -799,9 +1077,9 @@ class ProfileChangePasswordView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Set new password
+            # Set new password; only that column, since request.user may be a cached copy
             user.set_password(new_password)
-            user.save()
+            user.save(update_fields=['password'])
             
             return Response({'message': 'Password changed successfully'})
             
@@ -842,8 +1120,16 @@ class CustomerSuggestionListCreateView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def get(self, request):
-        qs = CustomerSuggestion.objects.filter(is_public=True).select_related('user').order_by('-created_at')
-        serializer = CustomerSuggestionSerializer(qs, many=True)
+        qs = CustomerSuggestion.objects.filter(is_public=True).order_by('-created_at')
+        fieldset = sparse_fieldset(request)
+        if fieldset is None:
+            qs = qs.select_related('user__profile').prefetch_related(
+                Prefetch('comments', queryset=Comment.objects.select_related('user__profile'))
+            )
+            return Response(CustomerSuggestionSerializer(qs, many=True).data)
+        
+        serializer = CustomerSuggestionSerializer(many=True, context={'sparse_fieldset': fieldset})
+        serializer.instance = sparse_queryset(qs, serializer)
         return Response(serializer.data)
     
     def post(self, request):
@@ -863,73 +1149,240 @@ class CustomerSuggestionListCreateView(APIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class CommunityFeedView(generics.ListAPIView):
+    """
+    Cursor-paginated public suggestions with a capped number of inline comments
+    
+    Query params: cursor, page_size (max 50), comments (inline comments per suggestion, max 20),
+    sort (new, hot or top), window (top only: day, week, month or all; default week).
+    Each page costs two queries whatever the number of suggestions, comments or authors.
+    """
+    serializer_class = CommunityFeedSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = SuggestionFeedPagination
+    default_inline_comments = 3
+    max_inline_comments = 20
+    # The trailing id breaks ties; SuggestionFeedPagination puts it in the cursor
+    sort_orderings = {
+        'new': ('-created_at', '-id'),
+        'hot': ('-hot_score', '-id'),
+        'top': ('-top_score', '-id'),
+    }
+    
+    def get_sort(self):
+        sort = self.request.query_params.get('sort', 'new')
+        if sort not in self.sort_orderings:
+            raise ValidationError({'sort': f"Choose one of: {', '.join(self.sort_orderings)}"})
+        return sort
+    
+    def get_feed_ordering(self):
+        return self.sort_orderings[self.get_sort()]
+    
+    def get_since(self):
+        """Lower created_at bound for the hot and top feeds, or None"""
+        sort = self.get_sort()
+        if sort == 'hot':
+            return timezone.now() - HOT_WINDOW
+        if sort == 'top':
+            window = self.request.query_params.get('window', 'week')
+            if window not in TOP_WINDOWS:
+                raise ValidationError({'window': f"Choose one of: {', '.join(TOP_WINDOWS)}"})
+            if TOP_WINDOWS[window]:
+                return timezone.now() - TOP_WINDOWS[window]
+        return None
+    
+    def get_inline_comments(self):
+        try:
+            limit = int(self.request.query_params.get('comments', self.default_inline_comments))
+        except ValueError:
+            limit = self.default_inline_comments
+        return max(0, min(limit, self.max_inline_comments))
+    
+    def get_queryset(self):
+        # Sliced prefetch: one windowed query fetches limit + 1 comments per suggestion
+        inline_comments = Comment.objects.select_related('user__profile').order_by('id')[:self.get_inline_comments() + 1]
+        queryset = (
+            CustomerSuggestion.objects.filter(is_public=True)
+            .select_related('user__profile')
+            .prefetch_related(Prefetch('comments', queryset=inline_comments, to_attr='inline_comments'))
+        )
+        since = self.get_since()
+        if since:
+            queryset = queryset.filter(created_at__gte=since)
+        return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['inline_comments'] = self.get_inline_comments()
+        return context
+    
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        context = self.get_serializer_context()
+        
+        # ?include=my_votes adds the caller's vote on every item for one extra query
+        if 'my_votes' in request.query_params.get('include', '').split(',') and request.user.is_authenticated:
+            context['my_votes'] = votes_for(
+                request.user,
+                suggestion_ids=[suggestion.id for suggestion in page],
+                comment_ids=[comment.id for suggestion in page for comment in suggestion.inline_comments]
+            )
+        
+        serializer = self.get_serializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
+
+async def suggestion_event_stream(request):
+    """
+    Server-sent events for the community page: suggestion.created, suggestion.deleted,
+    comment.created, comment.deleted and vote (new like/dislike totals)
+    
+    Reconnecting clients send Last-Event-ID (browsers do this automatically) and get
+    the events they missed; a `reset` event means too many were missed and the feed
+    should be reloaded. Needs an ASGI server, e.g. `uvicorn plantify_backend.asgi:application`.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'The event stream is only available when served over ASGI'}, status=501)
+    
+    try:
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    subscription = get_live_backend().subscribe(last_event_id)
+    heartbeat = getattr(settings, 'LIVE_EVENTS_HEARTBEAT_SECONDS', 15)
+    
+    async def stream():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                event = await subscription.next(timeout=heartbeat)
+                # Comment lines keep idle connections open through proxies
+                yield format_sse(event) if event else ': keepalive\n\n'
+        finally:
+            subscription.close()
+    
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class SuggestionCommentListView(APIView):
+    """Keyset page of a suggestion's comments: ?after=<comment id>&limit=<n>"""
+    permission_classes = [permissions.AllowAny]
+    default_limit = 20
+    max_limit = 100
+    
+    def get(self, request, suggestion_id):
+        if not CustomerSuggestion.objects.filter(id=suggestion_id, is_public=True).exists():
+            return Response({'error': 'Suggestion not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), self.max_limit))
+        except ValueError:
+            return Response({'error': 'after and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        comments = list(
+            Comment.objects.filter(suggestion_id=suggestion_id, id__gt=after)
+            .select_related('user__profile')
+            .order_by('id')[:limit + 1]
+        )
+        has_more = len(comments) > limit
+        comments = comments[:limit]
+        return Response({
+            'results': CommentSerializer(comments, many=True).data,
+            'next_after': comments[-1].id if has_more else None
+        })
+
+
+class SuggestionCommentTreeView(APIView):
+    """
+    Threaded comments of a suggestion, loaded in a single query
+    
+    Query params: parent (start below this comment), after (keyset for the first level),
+    limit (nodes per level, max 100), depth (levels to expand, max 20).
+    """
+    permission_classes = [permissions.AllowAny]
+    default_limit = 20
+    max_limit = 100
+    default_depth = 5
+    max_depth = 20
+    
+    def get(self, request, suggestion_id):
+        try:
+            parent_id = int(request.query_params['parent']) if request.query_params.get('parent') else None
+            after = int(request.query_params.get('after', 0))
+            limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), self.max_limit))
+            depth = max(1, min(int(request.query_params.get('depth', self.default_depth)), self.max_depth))
+        except ValueError:
+            return Response({'error': 'parent, after, limit and depth must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Whole comment set with authors, profiles and vote counts in one query
+        comments = list(
+            Comment.objects.filter(suggestion_id=suggestion_id, suggestion__is_public=True)
+            .select_related('user__profile')
+            .order_by('id')
+        )
+        if not comments and not CustomerSuggestion.objects.filter(id=suggestion_id, is_public=True).exists():
+            return Response({'error': 'Suggestion not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        nodes, more_after = build_comment_tree(comments, parent_id=parent_id, after=after, limit=limit, max_depth=depth)
+        return Response({
+            'suggestion_id': suggestion_id,
+            'comment_count': len(comments),
+            'results': nodes,
+            'next_after': more_after
+        })
+
+
+class MyVotesView(APIView):
+    """
+    The current user's votes for a page of items
+    
+    GET ?suggestions=1,2,3&comments=4,5 returns {"suggestions": {"1": "like"}, "comments": {"5": "dislike"}};
+    items the user has not voted on are omitted.
+    """
+    permission_classes = [IsAuthenticated]
+    max_ids = 200
+    
+    def get(self, request):
+        try:
+            suggestion_ids = self.parse_ids(request.query_params.get('suggestions', ''))
+            comment_ids = self.parse_ids(request.query_params.get('comments', ''))
+        except ValueError:
+            return Response({'error': 'suggestions and comments must be comma-separated ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(suggestion_ids) + len(comment_ids) > self.max_ids:
+            return Response({'error': f'At most {self.max_ids} ids per request'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        votes = votes_for(request.user, suggestion_ids, comment_ids)
+        response = {'suggestions': {}, 'comments': {}}
+        for (kind, object_id), vote_type in votes.items():
+            response[f'{kind}s'][str(object_id)] = vote_type
+        return Response(response)
+    
+    @staticmethod
+    def parse_ids(raw):
+        return [int(value) for value in raw.split(',') if value.strip()]
+
+
 class SuggestionLikeDislikeView(APIView):
 	"""Like or dislike a suggestion with toggle functionality"""
 	permission_classes = [IsAuthenticated]
 	
 	def post(self, request, suggestion_id):
+		action = request.data.get('action')  # 'like' or 'dislike'
+		if action not in VOTE_ACTIONS:
+			return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
+		
 		try:
-			suggestion = CustomerSuggestion.objects.get(id=suggestion_id, is_public=True)
-			action = request.data.get('action')  # 'like' or 'dislike'
-			
-			if action not in ['like', 'dislike']:
-				return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
-			
-			# Check if user already voted
-			existing_vote = UserVote.objects.filter(
-				user=request.user,
-				content_type=ContentType.objects.get_for_model(CustomerSuggestion),
-				object_id=suggestion_id
-			).first()
-			
-			if existing_vote:
-				if existing_vote.vote_type == action:
-					# User is clicking the same button - remove the vote
-					if action == 'like':
-						suggestion.likes = max(0, suggestion.likes - 1)
-					else:
-						suggestion.dislikes = max(0, suggestion.dislikes - 1)
-					existing_vote.delete()
-					message = f'Removed {action}'
-				else:
-					# User is changing their vote - update counts
-					if existing_vote.vote_type == 'like':
-						suggestion.likes = max(0, suggestion.likes - 1)
-					else:
-						suggestion.dislikes = max(0, suggestion.dislikes - 1)
-					
-					if action == 'like':
-						suggestion.likes += 1
-					else:
-						suggestion.dislikes += 1
-					
-					existing_vote.vote_type = action
-					existing_vote.save()
-					message = f'Changed to {action}'
-			else:
-				# User is voting for the first time
-				if action == 'like':
-					suggestion.likes += 1
-				else:
-					suggestion.dislikes += 1
-				
-				UserVote.objects.create(
-					user=request.user,
-					content_type=ContentType.objects.get_for_model(CustomerSuggestion),
-					object_id=suggestion_id,
-					vote_type=action
-				)
-				message = f'{action.capitalize()}d successfully'
-			
-			suggestion.save()
-			
-			return Response({
-				'message': message,
-				'likes': suggestion.likes,
-				'dislikes': suggestion.dislikes,
-				'user_vote': action if existing_vote and existing_vote.vote_type == action else None
-			})
-				
+			result = cast_vote(CustomerSuggestion.objects.filter(is_public=True), suggestion_id, request.user, action)
+			if not buffer_interval():
+				# Buffered counters reach the row later; decay_hot_scores picks them up
+				refresh_ranking(suggestion_id)
+			return Response(result)
 		except CustomerSuggestion.DoesNotExist:
 			return Response({'error': 'Suggestion not found'}, status=status.HTTP_404_NOT_FOUND)
 		except Exception as e:
@@ -941,68 +1394,13 @@ class CommentLikeDislikeView(APIView):
 	permission_classes = [IsAuthenticated]
 	
 	def post(self, request, comment_id):
+		action = request.data.get('action')  # 'like' or 'dislike'
+		if action not in VOTE_ACTIONS:
+			return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
+		
 		try:
-			comment = Comment.objects.get(id=comment_id)
-			action = request.data.get('action')  # 'like' or 'dislike'
-			
-			if action not in ['like', 'dislike']:
-				return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
-			
-			# Check if user already voted
-			existing_vote = UserVote.objects.filter(
-				user=request.user,
-				content_type=ContentType.objects.get_for_model(Comment),
-				object_id=comment_id
-			).first()
-			
-			if existing_vote:
-				if existing_vote.vote_type == action:
-					# User is clicking the same button - remove the vote
-					if action == 'like':
-						comment.likes = max(0, comment.likes - 1)
-					else:
-						comment.dislikes = max(0, comment.dislikes - 1)
-					existing_vote.delete()
-					message = f'Removed {action}'
-				else:
-					# User is changing their vote - update counts
-					if existing_vote.vote_type == 'like':
-						comment.likes = max(0, comment.likes - 1)
-					else:
-						comment.dislikes = max(0, comment.dislikes - 1)
-					
-					if action == 'like':
-						comment.likes += 1
-					else:
-						comment.dislikes += 1
-					
-					existing_vote.vote_type = action
-					existing_vote.save()
-					message = f'Changed to {action}'
-			else:
-				# User is voting for the first time
-				if action == 'like':
-					comment.likes += 1
-				else:
-					comment.dislikes += 1
-				
-				UserVote.objects.create(
-					user=request.user,
-					content_type=ContentType.objects.get_for_model(Comment),
-					object_id=comment_id,
-					vote_type=action
-				)
-				message = f'{action.capitalize()}d successfully'
-			
-			comment.save()
-			
-			return Response({
-				'message': message,
-				'likes': comment.likes,
-				'dislikes': comment.dislikes,
-				'user_vote': action if existing_vote and existing_vote.vote_type == action else None
-			})
-				
+			result = cast_vote(Comment.objects.all(), comment_id, request.user, action)
+			return Response(result)
 		except Comment.DoesNotExist:
 			return Response({'error': 'Comment not found'}, status=status.HTTP_404_NOT_FOUND)
 		except Exception as e:
@@ -1038,12 +1436,15 @@ class CommentCreateView(APIView):
             else:
                 return Response({'error': 'Either suggestion_id or comment_id is required'}, status=status.HTTP_400_BAD_REQUEST)
             
-            comment = Comment.objects.create(
-                user=request.user,
-                suggestion=suggestion,
-                content=content.strip(),
-                parent_comment=parent_comment
-            )
+            # The comment and its counter updates (plant_store.signals) commit together
+            with transaction.atomic():
+                comment = Comment.objects.create(
+                    user=request.user,
+                    suggestion=suggestion,
+                    content=content.strip(),
+                    parent_comment=parent_comment
+                )
+            refresh_ranking(suggestion.id)
             
             # Return comment data
             return Response({
@@ -0,0 +1,254 @@
+"""
+Voting service for suggestions and comments
+Records a user's like/dislike and adjusts the denormalized counters in one
+transaction. Every step is a conditional write, so concurrent requests can
+neither lose updates nor apply the same change twice.
+
+With settings.VOTE_COUNTER_BUFFER_MS > 0 the UserVote row is still written per
+vote, but counter changes are collected in vote_buffer and applied to the
+voted rows every VOTE_COUNTER_BUFFER_MS with one UPDATE per object, so a burst
+of votes on one suggestion no longer queues on that row. Serialized counts
+include the not yet flushed deltas of this process.
+"""
+
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, OperationalError, connections, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+
+from .db_retry import LOCK_BACKOFF_SECONDS, retry_on_lock
+from .live import publish_event
+from .models import Comment, CustomerSuggestion, UserVote
+
+
+logger = logging.getLogger(__name__)
+
+VOTE_ACTIONS = ('like', 'dislike')
+COUNTER_FIELDS = {'like': 'likes', 'dislike': 'dislikes'}
+# Votes are only broadcast to the live stream for objects on a public suggestion
+PUBLIC_LOOKUPS = {CustomerSuggestion: 'is_public', Comment: 'suggestion__is_public'}
+
+
+def buffer_interval():
+    """Seconds between counter flushes, or 0 when votes update counters directly"""
+    return getattr(settings, 'VOTE_COUNTER_BUFFER_MS', 0) / 1000.0
+
+
+class VoteCounterBuffer:
+    """
+    Per-process like/dislike deltas waiting to be written to their rows
+
+    add() schedules a flush after the buffer interval; flush() can also be
+    called directly, e.g. by tests or on shutdown.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(Counter)
+        self._in_flight = {}  # batch being written; still counted until it commits
+        self._timer = None
+
+    def add(self, model, object_id, deltas, interval):
+        with self._lock:
+            self._pending[(model, object_id)].update(deltas)
+            self._schedule(interval)
+
+    def _schedule(self, interval):
+        """Start the flush timer unless one is already waiting; call with _lock held"""
+        if self._timer is None:
+            self._timer = threading.Timer(interval, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def pending(self, model, object_id):
+        """Unflushed deltas of one object, e.g. {'likes': 3, 'dislikes': -1}"""
+        key = (model, object_id)
+        with self._lock:
+            deltas = Counter(self._in_flight.get(key, {}))
+            deltas.update(self._pending.get(key, {}))
+            return dict(deltas)
+
+    def __bool__(self):
+        return bool(self._pending or self._in_flight)
+
+    def flush(self):
+        """Write all pending deltas, one UPDATE per object, and return the number of objects"""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                batch, self._pending = self._pending, defaultdict(Counter)
+                self._in_flight = batch
+            if not batch:
+                return 0
+
+            try:
+                with transaction.atomic():
+                    for (model, object_id), deltas in batch.items():
+                        updates = {
+                            field: Greatest(F(field) + delta, Value(0))
+                            for field, delta in deltas.items() if delta
+                        }
+                        if model is CustomerSuggestion:
+                            updates['top_score'] = F('top_score') + deltas['likes'] - deltas['dislikes']
+                        if updates:
+                            model.objects.filter(pk=object_id).update(**updates)
+            except Exception:
+                # Keep the deltas for the next flush rather than losing votes, and make sure one comes
+                with self._lock:
+                    for key, deltas in batch.items():
+                        self._pending[key].update(deltas)
+                    self._in_flight = {}
+                    self._schedule(buffer_interval() or LOCK_BACKOFF_SECONDS)
+                raise
+
+            # The rows now include the batch; stop adding it to what readers see
+            with self._lock:
+                self._in_flight = {}
+            return len(batch)
+
+    def _flush_in_background(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except OperationalError:
+            pass  # Database busy; flush() has scheduled a retry
+        except Exception:
+            logger.exception('Could not flush buffered vote counters; will retry')
+        finally:
+            connections.close_all()
+
+
+vote_buffer = VoteCounterBuffer()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        vote_buffer.flush()
+    except Exception:
+        logger.exception('Could not flush buffered vote counters on exit')
+
+
+def with_pending_votes(data, instance):
+    """Add this process's unflushed vote deltas to serialized likes/dislikes"""
+    if vote_buffer:
+        for field, delta in vote_buffer.pending(type(instance), instance.pk).items():
+            if field in data:
+                data[field] = max(data[field] + delta, 0)
+    return data
+
+
+def cast_vote(queryset, object_id, user, action):
+    """
+    Toggle, switch or add a user's vote on one object
+
+    Args:
+        queryset: Votable objects the target must belong to, e.g. public suggestions
+        object_id (int): Target primary key
+        user: Voting user
+        action (str): 'like' or 'dislike'
+
+    Returns:
+        dict: message, likes, dislikes and user_vote (the vote now in effect, or None)
+
+    Raises:
+        queryset.model.DoesNotExist: The target is not in queryset; nothing is written
+    """
+    if action not in VOTE_ACTIONS:
+        raise ValueError(f'Invalid vote action: {action}')
+
+    # IntegrityError: a concurrent request inserted this user's vote first; re-run against it
+    result = retry_on_lock(lambda: _apply_vote(queryset, object_id, user, action), retry_on=(IntegrityError,))
+
+    if result.pop('public'):
+        publish_event('vote', {
+            'kind': 'suggestion' if queryset.model is CustomerSuggestion else 'comment',
+            'id': object_id,
+            'likes': result['likes'],
+            'dislikes': result['dislikes'],
+        })
+    return result
+
+
+def _apply_vote(queryset, object_id, user, action):
+    content_type = ContentType.objects.get_for_model(queryset.model)  # cached per process
+    votes = UserVote.objects.filter(user=user, content_type=content_type, object_id=object_id)
+    other = 'dislike' if action == 'like' else 'like'
+
+    with transaction.atomic():
+        # Writes come first so SQLite takes the write lock up front
+        if votes.filter(vote_type=action).delete()[0]:
+            deltas, user_vote, message = {action: -1}, None, f'Removed {action}'
+        elif votes.filter(vote_type=other).update(vote_type=action):
+            deltas, user_vote, message = {other: -1, action: 1}, action, f'Changed to {action}'
+        else:
+            UserVote.objects.create(user=user, content_type=content_type, object_id=object_id, vote_type=action)
+            deltas, user_vote, message = {action: 1}, action, f'{action.capitalize()}d successfully'
+
+        target = queryset.filter(pk=object_id)
+        current = target.values('likes', 'dislikes', public=F(PUBLIC_LOOKUPS[queryset.model]))
+        interval = buffer_interval()
+        if interval:
+            counts = current.first()
+            if counts is None:
+                raise queryset.model.DoesNotExist(f'{queryset.model.__name__} {object_id} not found')
+            public = counts.pop('public')
+            field_deltas = {COUNTER_FIELDS[vote]: delta for vote, delta in deltas.items()}
+            # Report the counts as they will be once everything buffered so far is flushed
+            for pending in (vote_buffer.pending(queryset.model, object_id), field_deltas):
+                for field, delta in pending.items():
+                    counts[field] += delta
+            counts = {field: max(value, 0) for field, value in counts.items()}
+            transaction.on_commit(lambda: vote_buffer.add(queryset.model, object_id, field_deltas, interval))
+        else:
+            updated = target.update(**{
+                COUNTER_FIELDS[vote]: Greatest(F(COUNTER_FIELDS[vote]) + delta, Value(0))
+                for vote, delta in deltas.items()
+            })
+            if not updated:
+                raise queryset.model.DoesNotExist(f'{queryset.model.__name__} {object_id} not found')
+            counts = current.get()
+            public = counts.pop('public')
+
+    return {
+        'message': message,
+        'likes': counts['likes'],
+        'dislikes': counts['dislikes'],
+        'user_vote': user_vote,
+        'public': public,
+    }
+
+
+def votes_for(user, suggestion_ids=(), comment_ids=()):
+    """
+    A user's votes on a batch of suggestions and comments, in one indexed query
+
+    Returns:
+        dict: {('suggestion' | 'comment', object_id): 'like' | 'dislike'} for voted objects only
+    """
+    content_types = ContentType.objects.get_for_models(CustomerSuggestion, Comment)
+    wanted = {
+        content_types[CustomerSuggestion].id: ('suggestion', list(suggestion_ids)),
+        content_types[Comment].id: ('comment', list(comment_ids)),
+    }
+
+    condition = Q()
+    for content_type_id, (_, object_ids) in wanted.items():
+        if object_ids:
+            condition |= Q(content_type_id=content_type_id, object_id__in=object_ids)
+    if not condition:
+        return {}
+
+    # Served by the (user, content_type, object_id) unique index
+    rows = UserVote.objects.filter(condition, user=user).values_list('content_type_id', 'object_id', 'vote_type')
+    return {(wanted[content_type_id][0], object_id): vote_type for content_type_id, object_id, vote_type in rows}
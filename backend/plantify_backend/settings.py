@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,9 +48,10 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'plant_store.compression.CompressionMiddleware',
+    'plant_store.middleware.APISessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
+    'plant_store.middleware.APICsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -140,14 +142,30 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Django REST Framework Settings
+# API authentication mode:
+#   'session' - JWT plus Django sessions; login also writes a session (default)
+#   'jwt'     - stateless: JWT only, no session reads/writes and no CSRF checks
+#               for paths under STATELESS_API_PATH_PREFIXES
+API_AUTH_MODE = os.environ.get('PLANTIFY_API_AUTH_MODE', 'session')
+STATELESS_API_PATH_PREFIXES = ['/plant_store/api/', '/plant_ai/api/']
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'plant_store.authentication.CachedJWTAuthentication',
+        'plant_store.authentication.SessionModeAuthentication',  # checks API_AUTH_MODE per request
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'plant_store.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'plant_store.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -224,3 +242,51 @@ DEFAULT_FROM_EMAIL = 'PlantiFy Support <plantify.orders@gmail.com>'
 
 # For development/testing, you can comment out the above and uncomment this:
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Queue outgoing mail in the OutboxEmail table; deliver it with
+# `python manage.py send_queued_emails --loop`. Set to False to send inline.
+# NOTE: with the outbox on, no e-mail (order confirmations, contact replies) goes
+# out unless a send_queued_emails worker is running next to the web server.
+EMAIL_USE_OUTBOX = True
+
+# Contact form: per-IP token bucket and duplicate-submission window
+CONTACT_THROTTLE_BURST = 5
+CONTACT_THROTTLE_PER_MINUTE = 2
+CONTACT_DEDUP_WINDOW_SECONDS = 600
+
+# Live community events (server-sent events at /api/suggestions/events/, ASGI only).
+# The in-memory backend fans out within one process; swap it for a shared-broker
+# backend when running several ASGI workers.
+LIVE_EVENTS_BACKEND = 'plant_store.live.InMemoryBackend'
+LIVE_EVENTS_HEARTBEAT_SECONDS = 15
+
+# Vote counters: 0 writes likes/dislikes with every vote. A positive value buffers the
+# counter changes in memory and writes them every N milliseconds, one UPDATE per
+# suggestion/comment, for posts that receive bursts of votes.
+VOTE_COUNTER_BUFFER_MS = 0
+
+# Seconds a JWT-authenticated user (with profile) is served from the cache; user and
+# profile writes invalidate it immediately. Configure a shared CACHES backend when
+# running several workers.
+AUTH_PRINCIPAL_CACHE_SECONDS = 60
+
+# Seconds the compact address book (/api/addresses/book/) is cached per user;
+# address writes invalidate it immediately.
+ADDRESS_BOOK_CACHE_SECONDS = 300
+
+# /api/bootstrap/: number of featured products, and seconds the shared catalog part
+# (categories + featured products) is cached; category and product writes invalidate it.
+BOOTSTRAP_FEATURED_PRODUCTS = 8
+BOOTSTRAP_CATALOG_CACHE_SECONDS = 300
+
+# Responses of at least this many bytes are compressed (br if the optional brotli
+# package is installed and accepted, else gzip); see plant_store.compression.
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+
+# Async auth endpoints (/api/login/async/ etc.): password hashing thread pool.
+# Workers default to the CPU count and pending hashes to 16 per worker. Attempts
+# beyond the per-account / per-IP limits are refused with 429 instead of queued.
+PASSWORD_HASH_WORKERS = None
+PASSWORD_HASH_MAX_PENDING = None
+PASSWORD_HASH_MAX_PER_ACCOUNT = 2
+PASSWORD_HASH_MAX_PER_IP = 8